@@ -10,10 +10,16 @@ from sqlmodel import SQLModel
 
 # Ensure all models are imported so SQLModel.metadata is complete.
 from app.models.paper import Paper  # noqa: F401
+from app.models.paper_content import PaperContent  # noqa: F401
 from app.models.paper_image import PaperImage  # noqa: F401
 from app.models.app_setting import AppSetting  # noqa: F401
 from app.models.job import Job  # noqa: F401
 from app.models.paper_event import PaperEvent  # noqa: F401
+from app.models.paper_stage_state import PaperStageState  # noqa: F401
+from app.models.paper_event_rollup import PaperEventRollup  # noqa: F401
+from app.models.job_rollup import JobRollup  # noqa: F401
+from app.models.job_dependency import JobDependency  # noqa: F401
+from app.models.blob import Blob, BlobRef  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -92,6 +98,12 @@ def run_migrations_online() -> None:
         with context.begin_transaction():
             context.run_migrations()
 
+        if connection.dialect.name == "sqlite":
+            # Invalidate init_db()'s fast-path fingerprint after any manual
+            # upgrade/downgrade; the next init_db() re-verifies and re-stamps it.
+            connection.exec_driver_sql("PRAGMA user_version = 0")
+            connection.commit()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,88 @@
+"""paper_content side table
+
+Revision ID: 3f9a6c1d8e27
+Revises: e7f30a2b9c64
+Create Date: 2026-10-19 16:40:02.381950
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a6c1d8e27'
+down_revision: Union[str, None] = 'e7f30a2b9c64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Keep in sync with app.services.paper_content.CONTENT_FIELDS
+_FIELDS = (
+    "content_explain_cn",
+    "content_explain_en",
+    "image_captions_json",
+    "image_captions_en_json",
+    "meta_json",
+)
+
+
+def _paper_columns(bind) -> set[str]:
+    return {c["name"] for c in sa.inspect(bind).get_columns("papers")}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    bind = op.get_bind()
+
+    op.create_table(
+        "paper_content",
+        sa.Column("paper_id", sa.Integer(), sa.ForeignKey("papers.id"), primary_key=True),
+        sa.Column("content_explain_cn", sa.String(), nullable=True),
+        sa.Column("content_explain_en", sa.String(), nullable=True),
+        sa.Column("image_captions_json", sa.String(), nullable=True),
+        sa.Column("image_captions_en_json", sa.String(), nullable=True),
+        sa.Column("meta_json", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+    # Very old local DBs may miss some of these columns; copy what exists.
+    present = [f for f in _FIELDS if f in _paper_columns(bind)]
+    if present:
+        cols = ", ".join(present)
+        # '' -> NULL: presence checks on paper_content are plain IS NOT NULL.
+        vals = ", ".join(f"NULLIF({f}, '')" for f in present)
+        any_set = " OR ".join(f"NULLIF({f}, '') IS NOT NULL" for f in present)
+        bind.execute(
+            sa.text(
+                f"""
+                INSERT INTO paper_content (paper_id, {cols}, updated_at)
+                SELECT id, {vals}, updated_at FROM papers
+                WHERE {any_set}
+                """
+            )
+        )
+
+        # Batch mode rebuilds the table, so the narrow rows are also physically compacted.
+        with op.batch_alter_table("papers", schema=None) as batch_op:
+            for f in present:
+                batch_op.drop_column(f)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    bind = op.get_bind()
+
+    with op.batch_alter_table("papers", schema=None) as batch_op:
+        for f in _FIELDS:
+            batch_op.add_column(sa.Column(f, sa.String(), nullable=True))
+
+    sets = ", ".join(
+        f"{f} = (SELECT c.{f} FROM paper_content c WHERE c.paper_id = papers.id)" for f in _FIELDS
+    )
+    bind.execute(sa.text(f"UPDATE papers SET {sets} WHERE id IN (SELECT paper_id FROM paper_content)"))
+
+    op.drop_table("paper_content")
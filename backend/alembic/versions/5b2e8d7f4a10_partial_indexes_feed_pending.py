@@ -0,0 +1,78 @@
+"""partial indexes for feed gating / pending stages
+
+Revision ID: 5b2e8d7f4a10
+Revises: 3f9a6c1d8e27
+Create Date: 2026-10-19 18:05:47.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8d7f4a10'
+down_revision: Union[str, None] = '3f9a6c1d8e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Single-column indexes on low-cardinality columns. Without ANALYZE stats the
+# planner picks them over paper_id (e.g. the feed image EXISTS walked every
+# lang='zh' row per paper), so they are dropped in favour of the shaped ones below.
+_LOW_SELECTIVITY = (
+    "ix_paper_images_kind",
+    "ix_paper_images_lang",
+    "ix_paper_images_enabled",
+    "ix_paper_images_order_idx",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    bind = op.get_bind()
+
+    for name in _LOW_SELECTIVITY:
+        bind.execute(sa.text(f"DROP INDEX IF EXISTS {name}"))
+
+    # Feed gating EXISTS + feed/detail image preload (ordered by provider, order_idx).
+    op.create_index(
+        "idx_paper_images_generated_visible",
+        "paper_images",
+        ["paper_id", "lang", "provider", "order_idx"],
+        unique=False,
+        sqlite_where=sa.text("kind = 'generated' AND enabled = 1 AND url_path IS NOT NULL"),
+    )
+
+    # Feed id scan (all history or one day) when explain is required; covering for papers.id.
+    op.create_index(
+        "idx_papers_parsed_source_day",
+        "papers",
+        ["source", "day"],
+        unique=False,
+        sqlite_where=sa.text("raw_text_path IS NOT NULL"),
+    )
+
+    # MinerU pending set: downloaded but not parsed yet (usually a handful of rows).
+    op.create_index(
+        "idx_papers_pending_mineru_day",
+        "papers",
+        ["day"],
+        unique=False,
+        sqlite_where=sa.text("pdf_path IS NOT NULL AND raw_text_path IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.drop_index("idx_papers_pending_mineru_day", table_name="papers")
+    op.drop_index("idx_papers_parsed_source_day", table_name="papers")
+    op.drop_index("idx_paper_images_generated_visible", table_name="paper_images")
+
+    op.create_index("ix_paper_images_order_idx", "paper_images", ["order_idx"], unique=False)
+    op.create_index("ix_paper_images_enabled", "paper_images", ["enabled"], unique=False)
+    op.create_index("ix_paper_images_lang", "paper_images", ["lang"], unique=False)
+    op.create_index("ix_paper_images_kind", "paper_images", ["kind"], unique=False)
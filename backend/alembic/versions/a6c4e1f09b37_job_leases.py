@@ -0,0 +1,41 @@
+"""job leases
+
+Revision ID: a6c4e1f09b37
+Revises: 5b2e8d7f4a10
+Create Date: 2026-10-19 18:05:11.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c4e1f09b37'
+down_revision: Union[str, None] = '5b2e8d7f4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.add_column("jobs", sa.Column("lease_owner", sa.String(), nullable=True))
+    op.add_column("jobs", sa.Column("lease_expires_at", sa.DateTime(), nullable=True))
+    op.add_column("jobs", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+
+    # Jobs already running under the old worker get the old 12h staleness window.
+    op.execute(
+        "UPDATE jobs SET lease_expires_at = datetime(COALESCE(started_at, updated_at), '+12 hours'), attempts = 1 "
+        "WHERE status = 'running'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("attempts")
+        batch_op.drop_column("lease_expires_at")
+        batch_op.drop_column("lease_owner")
@@ -0,0 +1,38 @@
+"""job dependencies
+
+Revision ID: a9c2e5f7d314
+Revises: f1b3d5a7c902
+Create Date: 2026-10-19 23:11:42.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c2e5f7d314'
+down_revision: Union[str, None] = 'f1b3d5a7c902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.create_table(
+        "job_dependencies",
+        sa.Column("job_id", sa.Integer(), sa.ForeignKey("jobs.id"), primary_key=True),
+        sa.Column("depends_on_id", sa.Integer(), sa.ForeignKey("jobs.id"), primary_key=True),
+    )
+    op.create_index(
+        "ix_job_dependencies_depends_on_id", "job_dependencies", ["depends_on_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.drop_index("ix_job_dependencies_depends_on_id", table_name="job_dependencies")
+    op.drop_table("job_dependencies")
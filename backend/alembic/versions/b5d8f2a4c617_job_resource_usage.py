@@ -0,0 +1,41 @@
+"""job resource usage
+
+Revision ID: b5d8f2a4c617
+Revises: a9c2e5f7d314
+Create Date: 2026-10-20 00:02:37.914065
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d8f2a4c617'
+down_revision: Union[str, None] = 'a9c2e5f7d314'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.add_column("jobs", sa.Column("wall_s", sa.Float(), nullable=True))
+    op.add_column("jobs", sa.Column("cpu_user_s", sa.Float(), nullable=True))
+    op.add_column("jobs", sa.Column("cpu_sys_s", sa.Float(), nullable=True))
+    op.add_column("jobs", sa.Column("max_rss_mb", sa.Float(), nullable=True))
+    op.add_column("jobs", sa.Column("io_read_blocks", sa.Integer(), nullable=True))
+    op.add_column("jobs", sa.Column("io_write_blocks", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("io_write_blocks")
+        batch_op.drop_column("io_read_blocks")
+        batch_op.drop_column("max_rss_mb")
+        batch_op.drop_column("cpu_sys_s")
+        batch_op.drop_column("cpu_user_s")
+        batch_op.drop_column("wall_s")
@@ -0,0 +1,39 @@
+"""job priority
+
+Revision ID: c2d7b3e5f811
+Revises: a6c4e1f09b37
+Create Date: 2026-10-19 19:12:40.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7b3e5f811'
+down_revision: Union[str, None] = 'a6c4e1f09b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.add_column("jobs", sa.Column("priority", sa.Integer(), nullable=False, server_default="50"))
+
+    # Keep in sync with app.services.job_queue.default_priority (queued rows only matter).
+    op.execute("UPDATE jobs SET priority = 100 WHERE status = 'queued' AND job_type = 'paper_retry_stage'")
+    op.execute("UPDATE jobs SET priority = 30 WHERE status = 'queued' AND job_type LIKE '%regen_scoped'")
+    op.execute(
+        "UPDATE jobs SET priority = 10 WHERE status = 'queued' "
+        "AND job_type IN ('paper_images_glm_backfill', 'paper_events_backfill', 'db_retention')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("priority")
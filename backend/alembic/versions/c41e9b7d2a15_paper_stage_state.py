@@ -0,0 +1,143 @@
+"""paper_stage_state
+
+Revision ID: c41e9b7d2a15
+Revises: 8a3d2f6c1a0b
+Create Date: 2026-10-19 10:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e9b7d2a15'
+down_revision: Union[str, None] = '8a3d2f6c1a0b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Keep in sync with app.services.paper_events.LANG_STAGES
+_LANG_STAGES = ("explain", "caption", "paper_images", "one_liner")
+
+# (stage, lang, papers column) used to seed success rows for outputs produced
+# before events were recorded (e.g. legacy one-liners from daily_run).
+_COLUMN_SEEDS = (
+    ("one_liner", "zh", "one_liner"),
+    ("one_liner", "en", "one_liner_en"),
+    ("explain", "zh", "content_explain_cn"),
+    ("explain", "en", "content_explain_en"),
+    ("caption", "zh", "image_captions_json"),
+    ("caption", "en", "image_captions_en_json"),
+)
+
+
+def _backfill(bind) -> None:
+    lang_stages = ", ".join(f"'{s}'" for s in _LANG_STAGES)
+
+    # 1) Latest event per (paper_id, stage) -> current state.
+    bind.execute(
+        sa.text(
+            f"""
+            INSERT INTO paper_stage_state
+              (paper_id, stage, lang, status, attempts, last_error, duration_s, started_at, updated_at)
+            SELECT
+              e.paper_id,
+              CASE
+                WHEN substr(e.stage, -3) = '_en' AND substr(e.stage, 1, length(e.stage) - 3) IN ({lang_stages})
+                  THEN substr(e.stage, 1, length(e.stage) - 3)
+                ELSE e.stage
+              END,
+              CASE
+                WHEN substr(e.stage, -3) = '_en' AND substr(e.stage, 1, length(e.stage) - 3) IN ({lang_stages})
+                  THEN 'en'
+                WHEN e.stage IN ({lang_stages}) THEN 'zh'
+                ELSE ''
+              END,
+              e.status,
+              (
+                SELECT count(*) FROM paper_events s
+                WHERE s.paper_id = e.paper_id AND s.stage = e.stage AND s.status = 'started'
+              ),
+              CASE WHEN e.status IN ('failed', 'skipped') THEN e.error ELSE NULL END,
+              NULL,
+              NULL,
+              e.created_at
+            FROM paper_events e
+            WHERE e.id = (
+              SELECT max(x.id) FROM paper_events x
+              WHERE x.paper_id = e.paper_id AND x.stage = e.stage
+            )
+            """
+        )
+    )
+
+    # 2) Outputs that exist on papers but never had events.
+    for stage, lang, col in _COLUMN_SEEDS:
+        bind.execute(
+            sa.text(
+                f"""
+                INSERT INTO paper_stage_state
+                  (paper_id, stage, lang, status, attempts, last_error, duration_s, started_at, updated_at)
+                SELECT p.id, :stage, :lang, 'success', 0, NULL, NULL, NULL, p.updated_at
+                FROM papers p
+                WHERE p.{col} IS NOT NULL AND p.{col} != '' AND p.{col} != '{{}}'
+                  AND NOT EXISTS (
+                    SELECT 1 FROM paper_stage_state s
+                    WHERE s.paper_id = p.id AND s.stage = :stage AND s.lang = :lang
+                  )
+                """
+            ),
+            {"stage": stage, "lang": lang},
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    bind = op.get_bind()
+
+    op.create_table(
+        "paper_stage_state",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("paper_id", sa.Integer(), sa.ForeignKey("papers.id"), nullable=False),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("lang", sa.String(), nullable=False, server_default=""),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("duration_s", sa.Float(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_paper_stage_state_paper_id", "paper_stage_state", ["paper_id"], unique=False)
+    op.create_index("ix_paper_stage_state_stage", "paper_stage_state", ["stage"], unique=False)
+    op.create_index("ix_paper_stage_state_status", "paper_stage_state", ["status"], unique=False)
+    op.create_index("ix_paper_stage_state_updated_at", "paper_stage_state", ["updated_at"], unique=False)
+    op.create_index(
+        "idx_paper_stage_state_paper_stage_lang",
+        "paper_stage_state",
+        ["paper_id", "stage", "lang"],
+        unique=True,
+    )
+    op.create_index(
+        "idx_paper_stage_state_stage_lang_status",
+        "paper_stage_state",
+        ["stage", "lang", "status"],
+        unique=False,
+    )
+
+    _backfill(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.drop_index("idx_paper_stage_state_stage_lang_status", table_name="paper_stage_state")
+    op.drop_index("idx_paper_stage_state_paper_stage_lang", table_name="paper_stage_state")
+    op.drop_index("ix_paper_stage_state_updated_at", table_name="paper_stage_state")
+    op.drop_index("ix_paper_stage_state_status", table_name="paper_stage_state")
+    op.drop_index("ix_paper_stage_state_stage", table_name="paper_stage_state")
+    op.drop_index("ix_paper_stage_state_paper_id", table_name="paper_stage_state")
+    op.drop_table("paper_stage_state")
@@ -0,0 +1,47 @@
+"""blob store
+
+Revision ID: c7e4a1d9b352
+Revises: b5d8f2a4c617
+Create Date: 2026-10-20 10:42:17.331904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e4a1d9b352'
+down_revision: Union[str, None] = 'b5d8f2a4c617'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.create_table(
+        "blobs",
+        sa.Column("sha256", sa.String(), primary_key=True),
+        sa.Column("size", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("kind", sa.String(), nullable=False, server_default="file"),
+        sa.Column("refcount", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "blob_refs",
+        sa.Column("path", sa.String(), primary_key=True),
+        sa.Column("sha256", sa.String(), sa.ForeignKey("blobs.sha256"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_blob_refs_sha256", "blob_refs", ["sha256"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.drop_index("ix_blob_refs_sha256", table_name="blob_refs")
+    op.drop_table("blob_refs")
+    op.drop_table("blobs")
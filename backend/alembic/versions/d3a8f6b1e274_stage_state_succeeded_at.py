@@ -0,0 +1,84 @@
+"""stage state succeeded_at
+
+Revision ID: d3a8f6b1e274
+Revises: c7e4a1d9b352
+Create Date: 2026-10-20 14:05:51.204716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f6b1e274'
+down_revision: Union[str, None] = 'c7e4a1d9b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (stage, lang, paper_content column): outputs that are stored even if the latest
+# event of the stage is not a success (rerun in flight / failed, events pruned).
+_CONTENT_SEEDS = (
+    ("explain", "zh", "content_explain_cn"),
+    ("explain", "en", "content_explain_en"),
+    ("caption", "zh", "image_captions_json"),
+    ("caption", "en", "image_captions_en_json"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.add_column("paper_stage_state", sa.Column("succeeded_at", sa.DateTime(), nullable=True))
+
+    bind = op.get_bind()
+
+    # 1) Latest success event of the stage.
+    bind.execute(
+        sa.text(
+            """
+            UPDATE paper_stage_state
+            SET succeeded_at = (
+              SELECT max(e.created_at) FROM paper_events e
+              WHERE e.paper_id = paper_stage_state.paper_id
+                AND e.stage = CASE WHEN paper_stage_state.lang = 'en'
+                                   THEN paper_stage_state.stage || '_en'
+                                   ELSE paper_stage_state.stage END
+                AND e.status = 'success'
+            )
+            """
+        )
+    )
+    # 2) Current success without a (kept) event, e.g. seeded from columns.
+    bind.execute(
+        sa.text(
+            "UPDATE paper_stage_state SET succeeded_at = updated_at "
+            "WHERE succeeded_at IS NULL AND status = 'success'"
+        )
+    )
+    # 3) Stored explain/caption output whose latest event is not a success.
+    for stage, lang, col in _CONTENT_SEEDS:
+        bind.execute(
+            sa.text(
+                f"""
+                UPDATE paper_stage_state
+                SET succeeded_at = updated_at
+                WHERE succeeded_at IS NULL AND stage = :stage AND lang = :lang
+                  AND EXISTS (
+                    SELECT 1 FROM paper_content c
+                    WHERE c.paper_id = paper_stage_state.paper_id
+                      AND c.{col} IS NOT NULL AND c.{col} != '' AND c.{col} != '{{}}'
+                  )
+                """
+            ),
+            {"stage": stage, "lang": lang},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.batch_alter_table("paper_stage_state", schema=None) as batch_op:
+        batch_op.drop_column("succeeded_at")
@@ -0,0 +1,39 @@
+"""job progress
+
+Revision ID: d8e1f4a6b2c3
+Revises: c2d7b3e5f811
+Create Date: 2026-10-19 20:41:07.392615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e1f4a6b2c3'
+down_revision: Union[str, None] = 'c2d7b3e5f811'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.add_column("jobs", sa.Column("items_total", sa.Integer(), nullable=True))
+    op.add_column("jobs", sa.Column("items_done", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("jobs", sa.Column("items_failed", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("jobs", sa.Column("current_item", sa.String(), nullable=True))
+    op.add_column("jobs", sa.Column("progress_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("progress_at")
+        batch_op.drop_column("current_item")
+        batch_op.drop_column("items_failed")
+        batch_op.drop_column("items_done")
+        batch_op.drop_column("items_total")
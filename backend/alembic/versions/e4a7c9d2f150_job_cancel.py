@@ -0,0 +1,31 @@
+"""job cancel
+
+Revision ID: e4a7c9d2f150
+Revises: d8e1f4a6b2c3
+Create Date: 2026-10-19 21:26:44.108237
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c9d2f150'
+down_revision: Union[str, None] = 'd8e1f4a6b2c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.add_column("jobs", sa.Column("cancel_requested_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("cancel_requested_at")
@@ -0,0 +1,48 @@
+"""partial indexes for unscoped pending stages
+
+Revision ID: e5b9c2d7a416
+Revises: d3a8f6b1e274
+Create Date: 2026-10-20 16:42:13.518307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c2d7a416'
+down_revision: Union[str, None] = 'd3a8f6b1e274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    # MinerU pending set without a day scope, walked in id order.
+    op.create_index(
+        "idx_papers_pending_mineru",
+        "papers",
+        ["id"],
+        unique=False,
+        sqlite_where=sa.text("pdf_path IS NOT NULL AND raw_text_path IS NULL"),
+    )
+
+    # Pending explain without a day scope: walk parsed papers only, in id order,
+    # and probe paper_content by primary key.
+    op.create_index(
+        "idx_papers_parsed",
+        "papers",
+        ["id"],
+        unique=False,
+        sqlite_where=sa.text("raw_text_path IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.drop_index("idx_papers_parsed", table_name="papers")
+    op.drop_index("idx_papers_pending_mineru", table_name="papers")
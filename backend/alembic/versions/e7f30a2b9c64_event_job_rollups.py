@@ -0,0 +1,76 @@
+"""paper_events / jobs rollups
+
+Revision ID: e7f30a2b9c64
+Revises: c41e9b7d2a15
+Create Date: 2026-10-19 14:03:21.554120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f30a2b9c64'
+down_revision: Union[str, None] = 'c41e9b7d2a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.create_table(
+        "paper_event_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("day", sa.String(), nullable=False),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("n", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_paper_event_rollups_day", "paper_event_rollups", ["day"], unique=False)
+    op.create_index(
+        "idx_paper_event_rollups_day_stage_status",
+        "paper_event_rollups",
+        ["day", "stage", "status"],
+        unique=True,
+    )
+
+    op.create_table(
+        "job_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("day", sa.String(), nullable=False),
+        sa.Column("job_type", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("n", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_job_rollups_day", "job_rollups", ["day"], unique=False)
+    op.create_index(
+        "idx_job_rollups_day_type_status",
+        "job_rollups",
+        ["day", "job_type", "status"],
+        unique=True,
+    )
+
+    # Failure / skipped listings filter by status and order by created_at.
+    op.create_index(
+        "idx_paper_events_status_created",
+        "paper_events",
+        ["status", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.drop_index("idx_paper_events_status_created", table_name="paper_events")
+    op.drop_index("idx_job_rollups_day_type_status", table_name="job_rollups")
+    op.drop_index("ix_job_rollups_day", table_name="job_rollups")
+    op.drop_table("job_rollups")
+    op.drop_index("idx_paper_event_rollups_day_stage_status", table_name="paper_event_rollups")
+    op.drop_index("ix_paper_event_rollups_day", table_name="paper_event_rollups")
+    op.drop_table("paper_event_rollups")
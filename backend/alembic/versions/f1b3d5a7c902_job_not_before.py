@@ -0,0 +1,31 @@
+"""job not_before
+
+Revision ID: f1b3d5a7c902
+Revises: e4a7c9d2f150
+Create Date: 2026-10-19 22:03:15.664920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b3d5a7c902'
+down_revision: Union[str, None] = 'e4a7c9d2f150'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.add_column("jobs", sa.Column("not_before", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("not_before")
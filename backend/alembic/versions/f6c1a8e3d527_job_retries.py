@@ -0,0 +1,31 @@
+"""job retries
+
+Revision ID: f6c1a8e3d527
+Revises: e5b9c2d7a416
+Create Date: 2026-10-20 18:21:07.364815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c1a8e3d527'
+down_revision: Union[str, None] = 'e5b9c2d7a416'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.add_column("jobs", sa.Column("retries", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.batch_alter_table("jobs", schema=None) as batch_op:
+        batch_op.drop_column("retries")
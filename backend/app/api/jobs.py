@@ -5,13 +5,15 @@ import subprocess
 import sys
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlmodel import Session
 
 from app.core.config import settings
 from app.db.engine import engine
 from app.models.job import Job
-from app.services.job_queue import enqueue_job, get_job, list_jobs
+from app.services.job_logs import MAX_READ_BYTES, log_exists, read_log, tail_text
+from app.services.job_progress import progress_view
+from app.services.job_queue import enqueue_job_coalesced, get_job, job_dependencies, list_jobs, request_cancel
 
 router = APIRouter(prefix="/api/admin/jobs", tags=["admin-jobs"])
 
@@ -30,27 +32,34 @@ def get_session():
         yield session
 
 
+def _job_out(j: Job, depends_on: list[int] | None = None) -> dict:
+    return {**j.model_dump(), "progress": progress_view(j), "depends_on": depends_on or []}
+
+
 SUPPORTED_JOB_TYPES = {
     # one-liner
     "one_liner_scoped": "Generate one-liners for a scoped set (fill missing)",
-    "one_liner_regen_scoped": "Re-generate one-liners for a scoped set (wipe then run)",
+    "one_liner_regen_scoped": "Re-generate one-liners for a scoped set (wipe then run); payload fresh=true bypasses the LLM response cache",
 
     # explanation
     "content_analysis_scoped": "Generate explanations (zh/en) for a scoped set (fill missing)",
-    "content_analysis_regen_scoped": "Re-generate explanations (zh/en) for a scoped set (wipe then run)",
+    "content_analysis_regen_scoped": "Re-generate explanations (zh/en) for a scoped set (wipe then run); payload fresh=true bypasses the LLM response cache",
 
     # captions
     "image_caption_scoped": "Generate captions (zh/en) for a scoped set (fill missing)",
-    "image_caption_regen_scoped": "Re-generate captions (zh/en) for a scoped set (wipe then run)",
+    "image_caption_regen_scoped": "Re-generate captions (zh/en) for a scoped set (wipe then run); payload fresh=true bypasses the LLM response cache",
 
     # images
     "paper_images_scoped": "Generate paper images (zh/en) for a scoped set (fill missing)",
-    "paper_images_regen_scoped": "Re-generate paper images (zh/en) for a scoped set (wipe then run)",
+    "paper_images_regen_scoped": "Re-generate paper images (zh/en) for a scoped set (wipe then run); payload fresh=true bypasses the LLM response cache",
     "paper_images_glm_backfill": "Backfill GLM generated images for all papers",
 
     # paper_events
     "paper_events_backfill": "Backfill paper_events for current DB state (adds skipped/success markers)",
 
+    # db maintenance
+    "db_retention": "Roll up + prune old paper_events/jobs, then incremental VACUUM (payload: events_keep_days, jobs_keep_days, vacuum_pages, full_vacuum)",
+
     # epub
     "epub_build_scoped": "Build EPUB (pandoc) for a scoped set (fill missing)",
     "epub_build_regen_scoped": "Build EPUB (pandoc) for a scoped set (overwrite)",
@@ -60,7 +69,11 @@ SUPPORTED_JOB_TYPES = {
     "mineru_ocr_fix_regen_scoped": "Fix garbled symbols by reparsing with OCR and merging into txt output (force)",
 
     # per-paper retry
-    "paper_retry_stage": "Retry one pipeline stage for a specific paper (pdf/mineru/explain/caption/paper_images)",
+    "paper_retry_stage": "Retry one pipeline stage for a specific paper (pdf/mineru/explain/caption/paper_images/epub; optional lang zh|en)",
+
+    # per-paper DAG
+    "pipeline": "Run the per-paper pipeline DAG (pdf -> mineru -> explain/caption -> images -> epub) for a scoped set; each paper advances independently (payload: day|external_ids, langs, epub_langs, stages)",
+    "paper_stage": "One node of a pipeline DAG (payload: external_id, stage, lang); fails when the stage produced no output",
 }
 
 
@@ -70,11 +83,15 @@ def api_list_jobs(
     limit: int = 50,
     session: Session = Depends(get_session),
 ):
+    """Recent jobs; `progress` carries items done/total, throughput and ETA when the
+    handler reports progress (see app.services.job_progress)."""
+
     _require_admin(request)
     rows = list_jobs(session, limit=limit)
+    deps = job_dependencies(session, [int(j.id) for j in rows])
     return {
         "supported": SUPPORTED_JOB_TYPES,
-        "jobs": [j.model_dump() for j in rows],
+        "jobs": [_job_out(j, deps.get(int(j.id))) for j in rows],
     }
 
 
@@ -83,16 +100,41 @@ def api_enqueue_job(
     job_type: str,
     payload: dict | None,
     request: Request,
+    priority: int | None = None,
+    coalesce: bool = True,
+    depends_on: list[int] = Query(default=[]),
     session: Session = Depends(get_session),
 ):
+    """Enqueue a job. `?priority=` overrides the per-type default (higher runs first;
+    >= JOB_INTERACTIVE_PRIORITY may use a reserved extra slot).
+
+    An equivalent queued job (same type and options) absorbs the request instead
+    (external_ids unioned) and is returned with `coalesced: true`; `?coalesce=false`
+    always inserts.
+
+    `?depends_on=<job id>` (repeatable) holds the job until those jobs succeeded; it
+    is canceled if one of them fails or is canceled."""
+
     _require_admin(request)
 
     job_type = (job_type or "").strip()
     if job_type not in SUPPORTED_JOB_TYPES:
         raise HTTPException(status_code=400, detail=f"unsupported job_type: {job_type}")
-
-    j = enqueue_job(session, job_type=job_type, payload=payload or {})
-    return {"job": j.model_dump()}
+    if priority is not None and not (0 <= int(priority) <= 1000):
+        raise HTTPException(status_code=400, detail="priority must be within 0..1000")
+    for dep in depends_on:
+        if not get_job(session, dep):
+            raise HTTPException(status_code=400, detail=f"depends_on job not found: {dep}")
+
+    j, coalesced = enqueue_job_coalesced(
+        session,
+        job_type=job_type,
+        payload=payload or {},
+        priority=priority,
+        coalesce=coalesce,
+        depends_on=depends_on,
+    )
+    return {"job": j.model_dump(), "coalesced": coalesced}
 
 
 @router.get("/{job_id}")
@@ -105,16 +147,47 @@ def api_get_job(
     j = get_job(session, job_id)
     if not j:
         raise HTTPException(status_code=404, detail="job not found")
-    return {"job": j.model_dump()}
+    return {"job": _job_out(j, job_dependencies(session, [job_id]).get(job_id))}
+
+
+@router.post("/{job_id}/cancel")
+def api_cancel_job(
+    job_id: int,
+    request: Request,
+    session: Session = Depends(get_session),
+):
+    """Cancel a job. Queued jobs are canceled immediately; running ones are stopped by
+    their worker within a few seconds (process tree terminated) and end as `canceled`."""
+
+    _require_admin(request)
+    j = get_job(session, job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="job not found")
+
+    state = request_cancel(session, job_id)
+    if state is None:
+        raise HTTPException(status_code=409, detail=f"job is not active (status={j.status})")
+
+    session.refresh(j)
+    return {"job": _job_out(j, job_dependencies(session, [job_id]).get(job_id)), "cancel": state}
 
 
 @router.get("/{job_id}/log")
 def api_get_job_log(
     job_id: int,
     request: Request,
+    offset: int | None = None,
+    limit: int = 65536,
     tail_lines: int = 200,
     session: Session = Depends(get_session),
 ):
+    """Job log, plain or archived (gzip).
+
+    With `?offset=` returns `limit` bytes from that byte offset (negative: from the
+    end) plus `next_offset` / `size` / `eof`, so clients page through large logs or
+    follow a running job without downloading it whole. Without it, the last
+    `tail_lines` lines."""
+
     _require_admin(request)
     j = get_job(session, job_id)
     if not j:
@@ -123,24 +196,19 @@ def api_get_job_log(
     if not j.log_path:
         return {"log": "(no log yet)"}
 
-    p = Path(j.log_path)
-    if not p.exists() or not p.is_file():
+    if not log_exists(j.log_path):
         return {"log": f"(log missing on disk) {j.log_path}"}
 
-    tail_lines = max(20, min(int(tail_lines or 200), 2000))
-
-    # Read tail by lines (cheap enough for our log sizes)
     try:
-        txt = p.read_text(encoding="utf-8", errors="ignore")
+        if offset is not None:
+            r = read_log(j.log_path, offset=offset, limit=max(1, min(int(limit or 65536), MAX_READ_BYTES)))
+            return {"log": r.pop("text"), **r}
+
+        tail_lines = max(20, min(int(tail_lines or 200), 2000))
+        return {"log": tail_text(j.log_path, lines=tail_lines) + "\n"}
     except Exception as e:
         return {"log": f"(failed to read log) {e}"}
 
-    lines = txt.splitlines()
-    if len(lines) > tail_lines:
-        lines = lines[-tail_lines:]
-
-    return {"log": "\n".join(lines) + "\n"}
-
 
 @router.post("/worker/kick")
 def api_kick_worker_now(request: Request):
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 import random
 from pathlib import Path
 
@@ -13,6 +12,8 @@ from app.db.engine import engine
 from app.models.paper import Paper
 from app.models.paper_image import PaperImage
 from app.services.app_config import get_effective_app_config
+from app.services.paper_content import content_json, content_value, get_paper_content, load_paper_contents
+from app.services.paper_events import stage_succeeded
 
 router = APIRouter(prefix="/api/papers", tags=["papers"])
 
@@ -79,6 +80,59 @@ def _preferred_provider_order(display: str) -> list[str]:
     return out
 
 
+def feed_ids_query(app_cfg, *, lang: str, day: str | None):
+    """Candidate paper ids for the feed, gated by the app config.
+
+    Shapes are matched by partial indexes (idx_papers_parsed_source_day,
+    idx_paper_images_generated_visible); scripts/check_query_plans.py guards them.
+    """
+
+    q = select(Paper.id).where(Paper.source == "hf_daily")
+
+    # Readiness is read from paper_stage_state (indexed point lookups) instead of
+    # probing the large explain/caption text on every feed request.
+    if app_cfg.feed_require_explain:
+        q = q.where(Paper.raw_text_path.is_not(None)).where(
+            stage_succeeded(Paper.id, stage="explain", lang=lang)
+        )
+
+    if app_cfg.feed_require_image_captions:
+        q = q.where(stage_succeeded(Paper.id, stage="caption", lang=lang))
+
+    if app_cfg.feed_require_generated_images:
+        # We treat paper_images_display_provider as a *display ordering* hint.
+        # Feed gating should only require that at least one generated image exists.
+        img_subq = (
+            select(PaperImage.id)
+            .where(PaperImage.paper_id == Paper.id)
+            .where(PaperImage.kind == "generated")
+            .where(PaperImage.lang == lang)
+            .where(PaperImage.enabled == True)  # noqa: E712
+            .where(PaperImage.url_path.is_not(None))
+        )
+
+        q = q.where(exists(img_subq))
+
+    if day:
+        q = q.where(Paper.day == day)
+
+    return q
+
+
+def feed_images_query(paper_ids: list[int], *, lang: str):
+    """Visible generated images for a page of feed cards, in display order."""
+
+    return (
+        select(PaperImage)
+        .where(PaperImage.paper_id.in_(paper_ids))
+        .where(PaperImage.kind == "generated")
+        .where(PaperImage.lang == lang)
+        .where(PaperImage.enabled == True)  # noqa: E712
+        .where(PaperImage.url_path.is_not(None))
+        .order_by(PaperImage.paper_id.asc(), PaperImage.provider.asc(), PaperImage.order_idx.asc())
+    )
+
+
 @router.get("/random")
 def get_random_papers(
     limit: int = Query(20, ge=1, le=50),
@@ -117,7 +171,6 @@ def get_random_papers(
             else:
                 filter_day = day
 
-        q = select(Paper.id).where(Paper.source == "hf_daily")
         # Hide unprocessed papers by default (skip in feed until "done")
         app_cfg = get_effective_app_config(session)
 
@@ -126,37 +179,7 @@ def get_random_papers(
         if lang0 not in {"zh", "en"}:
             lang0 = "zh"
 
-        if app_cfg.feed_require_explain:
-            explain_col = Paper.content_explain_en if lang0 == "en" else Paper.content_explain_cn
-            q = q.where(explain_col.is_not(None)).where(Paper.raw_text_path.is_not(None))
-
-        if app_cfg.feed_require_image_captions:
-            cap_col = Paper.image_captions_en_json if lang0 == "en" else Paper.image_captions_json
-            q = (
-                q.where(cap_col.is_not(None))
-                .where(cap_col != "")
-                .where(cap_col != "{}")
-                .where(cap_col != "null")
-            )
-
-        if app_cfg.feed_require_generated_images:
-            # We treat paper_images_display_provider as a *display ordering* hint.
-            # Feed gating should only require that at least one generated image exists.
-            img_subq = (
-                select(PaperImage.id)
-                .where(PaperImage.paper_id == Paper.id)
-                .where(PaperImage.kind == "generated")
-                .where(PaperImage.lang == lang0)
-                .where(PaperImage.enabled == True)  # noqa: E712
-                .where(PaperImage.url_path.is_not(None))
-            )
-
-            q = q.where(exists(img_subq))
-
-        if filter_day:
-            q = q.where(Paper.day == filter_day)
-
-        ids = session.exec(q).all()
+        ids = session.exec(feed_ids_query(app_cfg, lang=lang0, day=filter_day)).all()
         if not ids:
             return []
 
@@ -167,6 +190,10 @@ def get_random_papers(
 
         rows = session.exec(select(Paper).where(Paper.id.in_(chosen_ids))).all()
 
+        # Raw HF meta is only needed as an abstract fallback for cards without a one-liner.
+        no_liner = [p.id for p in rows if not (p.one_liner_en if lang0 == "en" else p.one_liner)]
+        contents = load_paper_contents(session, no_liner)
+
     # Preload generated images for chosen papers (avoid N+1 queries)
     # We keep multiple providers (seedream/glm) in DB. The feed returns *both*
     # providers' images (if present), with the selected provider ordered first.
@@ -175,19 +202,8 @@ def get_random_papers(
     with Session(engine) as session:
         app_cfg = get_effective_app_config(session)
         display = (app_cfg.paper_images_display_provider or "seedream").strip().lower()
-        q_imgs = (
-            select(PaperImage)
-            .where(PaperImage.paper_id.in_([p.id for p in rows]))
-            .where(PaperImage.kind == "generated")
-            .where(PaperImage.lang == lang0)
-            .where(PaperImage.enabled == True)  # noqa: E712
-            .where(PaperImage.url_path.is_not(None))
-        )
-
         # Always fetch all providers. We'll order them later when building card thumbnails.
-        imgs = session.exec(
-            q_imgs.order_by(PaperImage.paper_id.asc(), PaperImage.provider.asc(), PaperImage.order_idx.asc())
-        ).all()
+        imgs = session.exec(feed_images_query([p.id for p in rows], lang=lang0)).all()
 
         for img in imgs:
             by_paper.setdefault(img.paper_id, []).append(img)
@@ -198,19 +214,16 @@ def get_random_papers(
         extract = p.one_liner_en if lang0 == "en" else p.one_liner
 
         # Fallback: show raw abstract/summary until LLM completes.
-        if not extract and p.meta_json:
-            try:
-                meta = json.loads(p.meta_json)
-                abstract = (
-                    meta.get("paper", {}).get("summary")
-                    or meta.get("paper", {}).get("abstract")
-                    or meta.get("summary")
-                    or meta.get("abstract")
-                )
-                if isinstance(abstract, str) and abstract.strip():
-                    extract = abstract.strip()
-            except Exception:
-                pass
+        if not extract:
+            meta = content_json(contents.get(p.id), "meta_json")
+            abstract = (
+                meta.get("paper", {}).get("summary")
+                or meta.get("paper", {}).get("abstract")
+                or meta.get("summary")
+                or meta.get("abstract")
+            )
+            if isinstance(abstract, str) and abstract.strip():
+                extract = abstract.strip()
 
         if not extract:
             continue
@@ -283,6 +296,7 @@ def get_paper_detail(
         paper = session.get(Paper, paper_id)
         if not paper:
             raise HTTPException(status_code=404, detail="paper not found")
+        content = get_paper_content(session, paper_id)
 
     pdf_local_url = None
     if paper.pdf_path:
@@ -307,21 +321,11 @@ def get_paper_detail(
         )
 
         # Load cached captions (if any)
-        if lang0 in {"zh", "both"} and paper.image_captions_json:
-            try:
-                image_captions = json.loads(paper.image_captions_json) or {}
-                if not isinstance(image_captions, dict):
-                    image_captions = {}
-            except Exception:
-                image_captions = {}
-
-        if lang0 in {"en", "both"} and paper.image_captions_en_json:
-            try:
-                image_captions_en = json.loads(paper.image_captions_en_json) or {}
-                if not isinstance(image_captions_en, dict):
-                    image_captions_en = {}
-            except Exception:
-                image_captions_en = {}
+        if lang0 in {"zh", "both"}:
+            image_captions = content_json(content, "image_captions_json")
+
+        if lang0 in {"en", "both"}:
+            image_captions_en = content_json(content, "image_captions_en_json")
 
         # Pick captions by requested language
         if lang0 == "en":
@@ -395,10 +399,10 @@ def get_paper_detail(
         "thumbnail_url": paper.thumbnail_url,
         "one_liner": paper.one_liner_en if lang0 == "en" else paper.one_liner,
         "one_liner_en": (paper.one_liner_en if lang0 == "both" else None),
-        "content_explain_cn": paper.content_explain_cn,
-        "content_explain_en": (paper.content_explain_en if lang0 in {"en", "both"} else None),
-        "content_explain": (
-            paper.content_explain_en if lang0 == "en" else paper.content_explain_cn
+        "content_explain_cn": content_value(content, "content_explain_cn"),
+        "content_explain_en": (content_value(content, "content_explain_en") if lang0 in {"en", "both"} else None),
+        "content_explain": content_value(
+            content, "content_explain_en" if lang0 == "en" else "content_explain_cn"
         ),
         "pdf_url": paper.pdf_url,
         "pdf_local_url": pdf_local_url,
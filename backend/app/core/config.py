@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
@@ -18,6 +20,29 @@ class Settings(BaseModel):
 
     openai_base_url: str = os.getenv("OPENAI_BASE_URL", "http://localhost:3003/v1")
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    # Shared client for the OpenAI-compatible endpoint (app.services.llm_client)
+    openai_timeout_s: float = float(os.getenv("OPENAI_TIMEOUT_S", "180"))
+    openai_connect_timeout_s: float = float(os.getenv("OPENAI_CONNECT_TIMEOUT_S", "10"))
+    openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "32"))
+    openai_max_keepalive: int = int(os.getenv("OPENAI_MAX_KEEPALIVE", "16"))
+    openai_keepalive_expiry_s: float = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_S", "60"))
+    openai_http2: bool = os.getenv("OPENAI_HTTP2", "1").lower() in {"1", "true", "yes"}
+
+    # Per provider/key request budgets shared across processes (app.services.rate_limiter):
+    # provider=requests per minute/max concurrent requests (0 = unlimited)
+    rate_limits: str = os.getenv("RATE_LIMITS", "openai=120/8,seedream=30/2,glm=30/2")
+    rate_limit_db: str = os.getenv("RATE_LIMIT_DB", str(_PAPERTOK_ROOT / "data" / "db" / "rate_limits.sqlite"))
+    rate_limit_max_backoff_s: float = float(os.getenv("RATE_LIMIT_MAX_BACKOFF_S", "120"))
+    # AIMD concurrency bounds per call class (app.services.adaptive_concurrency): name=min/max.
+    # CONTENT_ANALYSIS_CONCURRENCY / IMAGE_CAPTION_CONCURRENCY / PAPER_IMAGES_CONCURRENCY
+    # are the start values of llm / vlm / image.
+    adaptive_concurrency: str = os.getenv("ADAPTIVE_CONCURRENCY", "llm=1/16,vlm=1/8,image=1/4")
+    # Disk cache of chat completion responses by request content (app.services.llm_cache).
+    # LLM_CACHE_BYPASS=1 (or `fresh: true` in a regen job payload) skips lookups.
+    llm_cache: bool = os.getenv("LLM_CACHE", "1").lower() in {"1", "true", "yes"}
+    llm_cache_db: str = os.getenv("LLM_CACHE_DB", str(_PAPERTOK_ROOT / "data" / "cache" / "llm_cache.sqlite"))
+    llm_cache_max_mb: float = float(os.getenv("LLM_CACHE_MAX_MB", "512"))
+    llm_cache_bypass: bool = os.getenv("LLM_CACHE_BYPASS", "").lower() in {"1", "true", "yes"}
 
     # Text model used for lightweight generations (e.g. one-liner)
     llm_model_text: str = os.getenv("LLM_MODEL_TEXT", "glm-x-preview")
@@ -25,11 +50,30 @@ class Settings(BaseModel):
     # MVP helper: allow ingest-only runs.
     skip_llm: bool = os.getenv("SKIP_LLM", "").lower() in {"1", "true", "yes"}
 
+    # daily_run: `stream` passes each fetched paper through the stages on its own
+    # (per-stage worker threads + bounded queues); `barrier` runs stage after stage.
+    daily_pipeline: str = os.getenv("DAILY_PIPELINE", "stream")
+    daily_stage_concurrency: str = os.getenv(
+        "DAILY_STAGE_CONCURRENCY", "pdf=4,mineru=1,one_liner=2,explain=4,caption=2,paper_images=2"
+    )
+    daily_stage_queue_max: int = int(os.getenv("DAILY_STAGE_QUEUE_MAX", "4"))
+
     download_pdf: bool = os.getenv("DOWNLOAD_PDF", "").lower() in {"1", "true", "yes"}
     papers_pdf_dir: str = os.getenv(
         "PAPERS_PDF_DIR",
         str(_PAPERTOK_ROOT / "data" / "raw" / "pdfs"),
     )
+    # PDF source (a mirror or a local stand-in for tests) and download limits
+    arxiv_pdf_base_url: str = os.getenv("ARXIV_PDF_BASE_URL", "https://arxiv.org/pdf")
+    pdf_download_per_host: int = int(os.getenv("PDF_DOWNLOAD_PER_HOST", "2"))
+    pdf_download_timeout_s: float = float(os.getenv("PDF_DOWNLOAD_TIMEOUT_S", "120"))
+    pdf_download_attempts: int = int(os.getenv("PDF_DOWNLOAD_ATTEMPTS", "3"))
+
+    # Content-addressed blob store (app.services.blob_store): PDFs and images are kept
+    # once per sha256; data paths become hardlink/reflink views. Keep it on the same
+    # filesystem as data/ so views can be hardlinks.
+    blob_store: bool = os.getenv("BLOB_STORE", "1").lower() in {"1", "true", "yes"}
+    blob_store_dir: str = os.getenv("BLOB_STORE_DIR", str(_PAPERTOK_ROOT / "data" / "blobs"))
 
     # mineru (PDF -> markdown + images)
     run_mineru: bool = os.getenv("RUN_MINERU", "").lower() in {"1", "true", "yes"}
@@ -72,7 +116,7 @@ class Settings(BaseModel):
     }
     content_analysis_max: int = int(os.getenv("CONTENT_ANALYSIS_MAX", "2"))
     content_analysis_input_chars: int = int(os.getenv("CONTENT_ANALYSIS_INPUT_CHARS", "80000"))
-    # concurrency for explanation generation (threads)
+    # start value of the adaptive `llm` concurrency (explanations, one-liners, image plans)
     content_analysis_concurrency: int = int(os.getenv("CONTENT_ANALYSIS_CONCURRENCY", "1"))
     # Model used for long-form explanation
     llm_model_analysis: str = os.getenv("LLM_MODEL_ANALYSIS", llm_model_text)
@@ -89,6 +133,11 @@ class Settings(BaseModel):
         "yes",
     }
     one_liner_mineru_input_chars: int = int(os.getenv("ONE_LINER_MINERU_INPUT_CHARS", "20000"))
+    # Parallel one-liner requests (also bounded by the adaptive `llm` gate), papers per
+    # request (>1: one JSON-output request for several papers) and papers per DB write.
+    one_liner_concurrency: int = int(os.getenv("ONE_LINER_CONCURRENCY", "8"))
+    one_liner_batch: int = int(os.getenv("ONE_LINER_BATCH", "1"))
+    one_liner_write_batch: int = int(os.getenv("ONE_LINER_WRITE_BATCH", "20"))
     rewrite_one_liner_from_mineru: bool = os.getenv("REWRITE_ONE_LINER_FROM_MINERU", "").lower() in {
         "1",
         "true",
@@ -145,6 +194,49 @@ class Settings(BaseModel):
         str(_PAPERTOK_ROOT / "data" / "logs"),
     )
 
+    # Retention for history tables: raw paper_events / finished jobs older than N days
+    # are rolled into per-day aggregates (paper_event_rollups / job_rollups) and deleted.
+    run_db_retention: bool = os.getenv("RUN_DB_RETENTION", "").lower() in {"1", "true", "yes"}
+    paper_events_retention_days: int = int(os.getenv("PAPER_EVENTS_RETENTION_DAYS", "30"))
+    jobs_retention_days: int = int(os.getenv("JOBS_RETENTION_DAYS", "30"))
+    # Pages to release per run via PRAGMA incremental_vacuum (SQLite, auto_vacuum=INCREMENTAL)
+    db_incremental_vacuum_pages: int = int(os.getenv("DB_INCREMENTAL_VACUUM_PAGES", "2000"))
+
+    # Job worker concurrency: per-slot limits (job types map to slots in app.services.job_queue)
+    job_slots: str = os.getenv("JOB_SLOTS", "mineru=1,llm=4,image=2,misc=2")
+    # Global budget for starting *additional* concurrent jobs (0 = unlimited):
+    # - 1-min load average per CPU core
+    # - free/available memory in MB
+    job_worker_max_load: float = float(os.getenv("JOB_WORKER_MAX_LOAD", "0"))
+    job_worker_min_free_mem_mb: int = int(os.getenv("JOB_WORKER_MIN_FREE_MEM_MB", "0"))
+    job_worker_poll_s: float = float(os.getenv("JOB_WORKER_POLL_S", "2"))
+    # Scheduling: effective priority = priority + minutes queued / JOB_PRIORITY_AGING_MIN
+    # - JOB_FAIR_SHARE_PENALTY per job of the same type already running.
+    # Jobs at/above JOB_INTERACTIVE_PRIORITY (e.g. paper_retry_stage) may use one slot
+    # beyond the limit so they start even while bulk jobs fill the slot.
+    job_priority_aging_min: float = float(os.getenv("JOB_PRIORITY_AGING_MIN", "10"))
+    job_fair_share_penalty: int = int(os.getenv("JOB_FAIR_SHARE_PENALTY", "10"))
+    job_interactive_priority: int = int(os.getenv("JOB_INTERACTIVE_PRIORITY", "100"))
+    # Run Python job handlers inside the worker process (MinerU jobs are always isolated).
+    job_worker_in_process: bool = os.getenv("JOB_WORKER_IN_PROCESS", "1").lower() in {"1", "true", "yes"}
+    # Lease-based claiming: a running job holds a lease renewed by heartbeats; when a
+    # worker dies its jobs are reclaimed after the lease expires (up to N attempts).
+    job_lease_s: int = int(os.getenv("JOB_LEASE_S", "300"))
+    job_heartbeat_s: int = int(os.getenv("JOB_HEARTBEAT_S", "30"))
+    job_lease_max_attempts: int = int(os.getenv("JOB_LEASE_MAX_ATTEMPTS", "3"))
+    # Handler progress (items done/total) is written to the jobs row at most every N seconds.
+    job_progress_interval_s: float = float(os.getenv("JOB_PROGRESS_INTERVAL_S", "5"))
+    # Per-job timeouts in seconds (0 = none). Keys are job types or slot names; a job
+    # type entry wins over its slot's. On timeout/cancel the handler's process group
+    # gets SIGTERM, then SIGKILL after JOB_KILL_GRACE_S.
+    job_timeouts: str = os.getenv("JOB_TIMEOUTS", "mineru=14400,llm=21600,image=21600,misc=7200")
+    job_kill_grace_s: int = int(os.getenv("JOB_KILL_GRACE_S", "30"))
+    # Automatic retries with backoff for transient failures (app.services.retry_policy):
+    # failed jobs are requeued with not_before, failed paper stages get a paper_retry_stage job.
+    job_auto_retry: bool = os.getenv("JOB_AUTO_RETRY", "1").lower() in {"1", "true", "yes"}
+    # Move finished job logs into seekable gzip archives (app.services.job_logs).
+    job_log_archive: bool = os.getenv("JOB_LOG_ARCHIVE", "1").lower() in {"1", "true", "yes"}
+
     # Optional: serve built frontend from backend (single-process local deploy)
     frontend_dist_dir: str = os.getenv(
         "FRONTEND_DIST_DIR",
@@ -163,7 +255,7 @@ class Settings(BaseModel):
     image_caption_max: int = int(os.getenv("IMAGE_CAPTION_MAX", "100000"))
     image_caption_per_paper: int = int(os.getenv("IMAGE_CAPTION_PER_PAPER", "100000"))
 
-    # Parallelism inside the caption job (threads). Keep modest to avoid overloading the VLM endpoint.
+    # Start value of the adaptive `vlm` concurrency (captions); ADAPTIVE_CONCURRENCY bounds it.
     image_caption_concurrency: int = int(os.getenv("IMAGE_CAPTION_CONCURRENCY", "1"))
     # For each image, take context around the markdown reference (chars)
     image_caption_context_chars: int = int(os.getenv("IMAGE_CAPTION_CONTEXT_CHARS", "2000"))
@@ -187,7 +279,7 @@ class Settings(BaseModel):
     ).lower() in {"1", "true", "yes"}
     paper_images_per_paper: int = int(os.getenv("PAPER_IMAGES_PER_PAPER", "3"))
     paper_images_max_papers: int = int(os.getenv("PAPER_IMAGES_MAX_PAPERS", "1"))
-    # concurrency for paper image generation (threads across papers)
+    # start value of the adaptive `image` concurrency (image generation across papers)
     paper_images_concurrency: int = int(os.getenv("PAPER_IMAGES_CONCURRENCY", "1"))
 
     # Which providers to GENERATE for (comma-separated), e.g. "seedream,glm".
@@ -245,4 +337,34 @@ class Settings(BaseModel):
     )
 
 
-settings = Settings()
+_base_settings = Settings()
+_scoped_settings: ContextVar[Settings | None] = ContextVar("papertok_settings", default=None)
+
+
+class _SettingsProxy:
+    """Module-level `settings`, overridable per context.
+
+    Job handlers tweak settings from their payload (e.g. `settings.papertok_langs = ...`).
+    Inside `settings_scope()` those writes go to a private copy, so jobs running
+    in-process side by side (scripts.job_worker) do not see each other's overrides.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(_scoped_settings.get() or _base_settings, name)
+
+    def __setattr__(self, name, value):
+        setattr(_scoped_settings.get() or _base_settings, name, value)
+
+
+@contextmanager
+def settings_scope():
+    token = _scoped_settings.set((_scoped_settings.get() or _base_settings).model_copy(deep=True))
+    try:
+        yield
+    finally:
+        _scoped_settings.reset(token)
+
+
+settings = _SettingsProxy()
@@ -0,0 +1,316 @@
+"""Per-job execution context for handlers running inside the worker process.
+
+scripts.job_worker runs most job handlers in-process, several at a time. Each job
+gets its own context (contextvars), which carries:
+- the job log file that print()/tracebacks are routed to
+- the log path recorded on paper_events (PAPERTOK_LOG_PATH for subprocess handlers)
+- the job id that progress is reported against (PAPERTOK_JOB_ID for subprocess handlers)
+- a private copy of `settings` (see app.core.config.settings_scope)
+- a JobControl the worker uses to stop the handler (timeout / cancel) and that
+  accumulates the job's resource usage (CPU, peak RSS of children, block I/O)
+
+Thread pools inside handlers must use ContextThreadPoolExecutor so their tasks
+inherit the job's context. External tools must be started through run_child() so
+a stopped job takes its child processes down with it.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import io
+import os
+import resource
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TextIO
+
+from app.core.config import settings_scope
+
+
+_job_stream: contextvars.ContextVar[TextIO | None] = contextvars.ContextVar("papertok_job_stream", default=None)
+_job_log_path: contextvars.ContextVar[str | None] = contextvars.ContextVar("papertok_job_log_path", default=None)
+_job_id: contextvars.ContextVar[int | None] = contextvars.ContextVar("papertok_job_id", default=None)
+
+
+class JobCanceled(BaseException):
+    """Raised at handler checkpoints once the job was canceled or timed out.
+
+    A BaseException, so the per-item `except Exception` blocks in handlers do not
+    swallow it.
+    """
+
+
+def _maxrss_mb(ru) -> float:
+    # ru_maxrss is bytes on macOS, kilobytes on Linux.
+    return ru.ru_maxrss / (1024.0 * 1024.0) if sys.platform == "darwin" else ru.ru_maxrss / 1024.0
+
+
+def thread_usage() -> tuple[float, float, int, int]:
+    """(user s, sys s, blocks in, blocks out) of the calling thread.
+
+    Per-thread rusage is Linux-only; elsewhere only CPU time (as user) is known.
+    """
+
+    if hasattr(resource, "RUSAGE_THREAD"):
+        ru = resource.getrusage(resource.RUSAGE_THREAD)
+        return ru.ru_utime, ru.ru_stime, ru.ru_inblock, ru.ru_oublock
+    return time.thread_time(), 0.0, 0, 0
+
+
+class ResourceUsage:
+    """CPU, peak RSS and block I/O of one job, summed over its threads/processes.
+
+    Processes report through their wait4() rusage (which includes the descendants
+    they waited for); in-process handler threads through thread_usage() deltas.
+    Peak RSS is the largest child process (a thread has no RSS of its own).
+    """
+
+    def __init__(self) -> None:
+        self.cpu_user_s = 0.0
+        self.cpu_sys_s = 0.0
+        self.max_rss_mb: float | None = None
+        self.io_read_blocks = 0
+        self.io_write_blocks = 0
+        self._lock = threading.Lock()
+
+    def add_rusage(self, ru) -> None:
+        with self._lock:
+            self.cpu_user_s += ru.ru_utime
+            self.cpu_sys_s += ru.ru_stime
+            self.max_rss_mb = max(self.max_rss_mb or 0.0, _maxrss_mb(ru))
+            self.io_read_blocks += ru.ru_inblock
+            self.io_write_blocks += ru.ru_oublock
+
+    def add_thread(self, start: tuple[float, float, int, int]) -> None:
+        """Add the calling thread's usage since `start` (a thread_usage() snapshot)."""
+
+        end = thread_usage()
+        with self._lock:
+            self.cpu_user_s += max(0.0, end[0] - start[0])
+            self.cpu_sys_s += max(0.0, end[1] - start[1])
+            self.io_read_blocks += max(0, end[2] - start[2])
+            self.io_write_blocks += max(0, end[3] - start[3])
+
+    def columns(self, *, wall_s: float) -> dict:
+        """Values for the jobs usage columns."""
+
+        with self._lock:
+            return {
+                "wall_s": round(wall_s, 3),
+                "cpu_user_s": round(self.cpu_user_s, 3),
+                "cpu_sys_s": round(self.cpu_sys_s, 3),
+                "max_rss_mb": round(self.max_rss_mb, 1) if self.max_rss_mb is not None else None,
+                "io_read_blocks": int(self.io_read_blocks),
+                "io_write_blocks": int(self.io_write_blocks),
+            }
+
+
+def wait_rusage(p: subprocess.Popen):
+    """Wait for `p` like Popen.wait()/communicate(), but reap it with wait4() to get
+    its rusage. Returns (stdout, stderr, rusage); pipes are drained by helper threads."""
+
+    out: dict[str, object] = {}
+    readers = []
+    for name in ("stdout", "stderr"):
+        stream = getattr(p, name)
+        if stream is not None:
+            t = threading.Thread(target=lambda n=name, st=stream: out.__setitem__(n, st.read()), daemon=True)
+            t.start()
+            readers.append(t)
+    _pid, status, ru = os.wait4(p.pid, 0)
+    p.returncode = os.waitstatus_to_exitcode(status)
+    for t in readers:
+        t.join()
+    return out.get("stdout"), out.get("stderr"), ru
+
+
+class JobControl:
+    """Stop switch for one in-process job, shared by all of its threads."""
+
+    def __init__(self) -> None:
+        self.reason: str | None = None
+        self.usage = ResourceUsage()
+        self._children: set[int] = set()
+        self._lock = threading.Lock()
+
+    def stop(self, reason: str) -> None:
+        """Make the next checkpoint raise and terminate the job's child process groups."""
+
+        with self._lock:
+            self.reason = self.reason or reason
+            children = list(self._children)
+        for pid in children:
+            _killpg(pid, signal.SIGTERM)
+
+    def kill_children(self) -> None:
+        with self._lock:
+            children = list(self._children)
+        for pid in children:
+            _killpg(pid, signal.SIGKILL)
+
+    def checkpoint(self) -> None:
+        if self.reason:
+            raise JobCanceled(self.reason)
+
+    def _add_child(self, pid: int) -> None:
+        with self._lock:
+            self._children.add(pid)
+            stopped = self.reason is not None
+        if stopped:
+            _killpg(pid, signal.SIGTERM)
+
+    def _discard_child(self, pid: int) -> None:
+        with self._lock:
+            self._children.discard(pid)
+
+
+_job_control: contextvars.ContextVar[JobControl | None] = contextvars.ContextVar("papertok_job_control", default=None)
+
+
+def _killpg(pgid: int, sig: int) -> None:
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def check_canceled() -> None:
+    """Handler checkpoint: raise JobCanceled if the current job was stopped."""
+
+    ctl = _job_control.get()
+    if ctl is not None:
+        ctl.checkpoint()
+
+
+def run_child(cmd: list[str], **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run() for external tools (MinerU, pandoc) called by job handlers.
+
+    Inside an in-process job the child gets its own process group, registered with
+    the job's JobControl so a timeout/cancel terminates the whole tree. Elsewhere
+    (daily_run, subprocess handlers) it is plain subprocess.run(): a subprocess
+    handler's children share its process group, which the worker kills as a unit.
+    """
+
+    ctl = _job_control.get()
+    if ctl is None:
+        return subprocess.run(cmd, **kwargs)
+
+    ctl.checkpoint()
+    check = bool(kwargs.pop("check", False))
+    if kwargs.pop("capture_output", False):
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    with subprocess.Popen(cmd, start_new_session=True, **kwargs) as p:
+        ctl._add_child(p.pid)
+        try:
+            out, err, ru = wait_rusage(p)
+        finally:
+            ctl._discard_child(p.pid)
+    ctl.usage.add_rusage(ru)
+    ctl.checkpoint()
+    if check and p.returncode:
+        raise subprocess.CalledProcessError(p.returncode, cmd, out, err)
+    return subprocess.CompletedProcess(cmd, p.returncode, out, err)
+
+
+def current_log_path() -> str | None:
+    """Log file of the current job (in-process context first, then subprocess env)."""
+
+    return _job_log_path.get() or (os.getenv("PAPERTOK_LOG_PATH") or "").strip() or None
+
+
+def current_job_id() -> int | None:
+    """Id of the job being run (in-process context first, then subprocess env)."""
+
+    jid = _job_id.get()
+    if jid is not None:
+        return jid
+    try:
+        return int(os.getenv("PAPERTOK_JOB_ID") or "") or None
+    except ValueError:
+        return None
+
+
+class _RoutedStream(io.TextIOBase):
+    """sys.stdout/sys.stderr replacement: writes go to the current job's log if any."""
+
+    def __init__(self, fallback: TextIO):
+        self._fallback = fallback
+
+    def _target(self) -> TextIO:
+        t = _job_stream.get()
+        # An abandoned (timed-out) handler may outlive its job's log file.
+        return t if t is not None and not t.closed else self._fallback
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return False
+
+    def fileno(self) -> int:
+        # Child processes started by handlers inherit the worker's real fds.
+        return self._fallback.fileno()
+
+
+def install_output_routing() -> None:
+    """Route process-wide stdout/stderr through the job context (idempotent)."""
+
+    if not isinstance(sys.stdout, _RoutedStream):
+        sys.stdout = _RoutedStream(sys.stdout)
+    if not isinstance(sys.stderr, _RoutedStream):
+        sys.stderr = _RoutedStream(sys.stderr)
+
+
+@contextmanager
+def job_context(
+    *,
+    log: TextIO,
+    log_path: str,
+    job_id: int | None = None,
+    control: JobControl | None = None,
+):
+    """Run a handler with its own settings copy and output routed to `log`."""
+
+    t1 = _job_stream.set(log)
+    t2 = _job_log_path.set(log_path)
+    t3 = _job_id.set(job_id)
+    t4 = _job_control.set(control)
+    try:
+        with settings_scope():
+            yield
+    finally:
+        _job_control.reset(t4)
+        _job_id.reset(t3)
+        _job_log_path.reset(t2)
+        _job_stream.reset(t1)
+
+
+def _accounted(fn, /, *args, **kwargs):
+    ctl = _job_control.get()
+    if ctl is None:
+        return fn(*args, **kwargs)
+    start = thread_usage()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        ctl.usage.add_thread(start)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitter's context (and
+    count towards the job's CPU usage)."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        ctx = contextvars.copy_context()
+        return super().submit(ctx.run, _accounted, fn, *args, **kwargs)
@@ -1,15 +1,24 @@
+import hashlib
+import os
+from pathlib import Path
+
 from sqlmodel import SQLModel
 from sqlalchemy import text
 
 from app.db.engine import engine
-from app.db.migrate import migrate_db
 
 # Ensure models are registered in SQLModel metadata
 from app.models.paper import Paper  # noqa: F401
+from app.models.paper_content import PaperContent  # noqa: F401
 from app.models.paper_image import PaperImage  # noqa: F401
 from app.models.app_setting import AppSetting  # noqa: F401
 from app.models.job import Job  # noqa: F401
 from app.models.paper_event import PaperEvent  # noqa: F401
+from app.models.paper_stage_state import PaperStageState  # noqa: F401
+from app.models.paper_event_rollup import PaperEventRollup  # noqa: F401
+from app.models.job_rollup import JobRollup  # noqa: F401
+from app.models.job_dependency import JobDependency  # noqa: F401
+from app.models.blob import Blob, BlobRef  # noqa: F401
 
 
 def _ensure_sqlite_columns() -> None:
@@ -33,8 +42,6 @@ def _ensure_sqlite_columns() -> None:
             "pdf_path": "VARCHAR",
             "pdf_sha256": "VARCHAR",
             "thumbnail_url": "VARCHAR",
-            "content_explain_cn": "TEXT",
-            "image_captions_json": "TEXT",
             # EPUB
             "epub_path_en": "VARCHAR",
             "epub_url_en": "VARCHAR",
@@ -74,8 +81,8 @@ def _ensure_sqlite_indexes() -> None:
             )
         )
 
-        # Helpful non-unique index
-        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_paper_images_lang ON paper_images (lang)"))
+        # NOTE: no single-column ix_paper_images_lang here any more; it misleads the
+        # planner (see alembic 5b2e8d7f4a10).
 
         conn.commit()
 
@@ -118,10 +125,61 @@ def _ensure_schema_version() -> None:
         conn.commit()
 
 
-def init_db() -> None:
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+
+# Bump when the _ensure_sqlite_* helpers change, so existing DBs re-run them once.
+_HELPERS_VERSION = 1
+
+
+def _schema_fingerprint() -> int:
+    """Cheap fingerprint of the expected schema: migration file contents + helper version.
+
+    Hashes the bytes (not just names/sizes) so a same-size edit to a migration still
+    forces a full pass. The migrations are a few KB each, so this stays well under 1 ms.
+    Stored in SQLite `PRAGMA user_version` (signed 32-bit) after a full init_db pass.
+    """
+
+    h = hashlib.sha256(f"helpers={_HELPERS_VERSION}".encode())
+    for e in sorted(os.scandir(MIGRATIONS_DIR), key=lambda e: e.name):
+        if e.name.endswith(".py") and e.is_file():
+            h.update(f"|{e.name}:".encode())
+            with open(e.path, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+    # Non-zero positive int so a fresh DB (user_version=0) never matches.
+    return int.from_bytes(h.digest()[:4], "big") & 0x7FFFFFFF or 1
+
+
+def _sqlite_user_version() -> int | None:
+    if engine.url.get_backend_name() != "sqlite":
+        return None
+    with engine.connect() as conn:
+        return int(conn.execute(text("PRAGMA user_version")).scalar() or 0)
+
+
+def _set_sqlite_user_version(v: int) -> None:
+    with engine.connect() as conn:
+        conn.execute(text(f"PRAGMA user_version = {int(v)}"))
+        conn.commit()
+
+
+def init_db(*, force: bool = False) -> None:
+    """Bring the DB to the current schema.
+
+    Called by the server, every job handler and daily_run. When the stored
+    fingerprint matches (the common case) this is a single PRAGMA read: no Alembic
+    import, no migration lock, no PRAGMA table_info probes.
+    """
+
+    fingerprint = _schema_fingerprint()
+    if not force and _sqlite_user_version() == fingerprint:
+        return
+
     # Alembic migrations (authoritative going forward)
     migrated = False
     try:
+        # Imported lazily: loading Alembic dominates cold start when nothing needs migrating.
+        from app.db.migrate import migrate_db
+
         migrate_db()
         migrated = True
     except Exception as e:
@@ -137,3 +195,8 @@ def init_db() -> None:
     _ensure_sqlite_columns()
     _ensure_sqlite_indexes()
     _ensure_schema_version()
+
+    # Only record the fingerprint after a clean migration; a create_all fallback
+    # should retry Alembic on the next start.
+    if migrated and engine.url.get_backend_name() == "sqlite":
+        _set_sqlite_user_version(fingerprint)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlmodel import SQLModel, Field
+
+
+class Blob(SQLModel, table=True):
+    """One stored file content in the blob store (app.services.blob_store).
+
+    `refcount` is the number of BlobRef rows (named views) pointing at it; blobs at
+    zero are removed by gc_blobs().
+    """
+
+    __tablename__ = "blobs"
+
+    sha256: str = Field(primary_key=True)
+    size: int = Field(default=0)
+    # pdf | pdf_repaired | mineru_image | generated_image
+    kind: str = Field(default="file")
+    refcount: int = Field(default=0)
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class BlobRef(SQLModel, table=True):
+    """A named view: a path under data/ that is a hardlink/reflink of a blob."""
+
+    __tablename__ = "blob_refs"
+
+    path: str = Field(primary_key=True)
+    sha256: str = Field(foreign_key="blobs.sha256", index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
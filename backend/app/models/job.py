@@ -14,12 +14,45 @@ class Job(SQLModel, table=True):
     job_type: str = Field(index=True)
     status: str = Field(default="queued", index=True)  # queued|running|success|failed|canceled
 
+    # Higher runs first; aged by queue wait time (see app.services.job_queue.claim_candidates).
+    priority: int = Field(default=50)
+    # Not claimable before this time (scheduled retries with backoff).
+    not_before: Optional[datetime] = None
+
     payload_json: Optional[str] = None
     result_json: Optional[str] = None
 
     log_path: Optional[str] = None
     error: Optional[str] = None
 
+    # Lease held by the worker running this job; extended by heartbeats. An expired
+    # lease means the worker died and the job may be reclaimed.
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    # Claims (attempts) and retry-policy requeues (retries) are separate budgets: lease
+    # reclaims count attempts - retries (JOB_LEASE_MAX_ATTEMPTS), the retry policy
+    # counts retries (app.services.retry_policy).
+    attempts: int = Field(default=0)
+    retries: int = Field(default=0)
+    # Set by the admin cancel endpoint; the worker running the job stops it.
+    cancel_requested_at: Optional[datetime] = None
+
+    # Progress reported by handlers (app.services.job_progress); written throttled.
+    items_total: Optional[int] = None
+    items_done: int = Field(default=0)
+    items_failed: int = Field(default=0)
+    current_item: Optional[str] = None
+    progress_at: Optional[datetime] = None
+
+    # Resources used by the latest run (recorded by the worker; see
+    # app.core.job_context.ResourceUsage). max_rss_mb is the largest child process.
+    wall_s: Optional[float] = None
+    cpu_user_s: Optional[float] = None
+    cpu_sys_s: Optional[float] = None
+    max_rss_mb: Optional[float] = None
+    io_read_blocks: Optional[int] = None
+    io_write_blocks: Optional[int] = None
+
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     started_at: Optional[datetime] = Field(default=None, index=True)
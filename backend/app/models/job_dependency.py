@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from sqlmodel import SQLModel, Field
+
+
+class JobDependency(SQLModel, table=True):
+    """Edge of a job DAG: `job_id` is not claimable until `depends_on_id` succeeded.
+
+    If the upstream job ends failed/canceled, the dependent is canceled
+    (app.services.job_queue.cancel_blocked_jobs).
+    """
+
+    __tablename__ = "job_dependencies"
+
+    job_id: int = Field(primary_key=True, foreign_key="jobs.id")
+    depends_on_id: int = Field(primary_key=True, foreign_key="jobs.id", index=True)
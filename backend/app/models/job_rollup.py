@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import SQLModel, Field, Index
+
+
+class JobRollup(SQLModel, table=True):
+    """Per-day, per-type aggregate of finished jobs that aged out of retention."""
+
+    __tablename__ = "job_rollups"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    # YYYY-MM-DD (UTC, from jobs.created_at)
+    day: str = Field(index=True)
+    job_type: str
+    status: str
+
+    n: int = Field(default=0)
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+Index(
+    "idx_job_rollups_day_type_status",
+    JobRollup.day,
+    JobRollup.job_type,
+    JobRollup.status,
+    unique=True,
+)
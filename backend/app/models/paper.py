@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import text
 from sqlmodel import SQLModel, Field, Index
 
 
@@ -40,13 +41,7 @@ class Paper(SQLModel, table=True):
 
     raw_text_path: Optional[str] = None  # mineru/md output path etc.
 
-    # LLM-generated longform explanation based on parsed paper content (optional)
-    content_explain_cn: Optional[str] = None  # zh
-    content_explain_en: Optional[str] = None  # en
-
-    # Optional: image -> caption mapping (JSON). Keys are relative URLs from /api/papers/{id} images[].
-    image_captions_json: Optional[str] = None  # zh
-    image_captions_en_json: Optional[str] = None  # en
+    # Heavy text (explanations, caption maps, raw HF meta) lives in `paper_content`.
 
     # EPUB artifacts (stored under EPUB_OUT_ROOT and served via /static/epub)
     epub_path_en: Optional[str] = None
@@ -57,8 +52,6 @@ class Paper(SQLModel, table=True):
     epub_path_bilingual: Optional[str] = None
     epub_url_bilingual: Optional[str] = None
 
-    meta_json: Optional[str] = None
-
     content_sha256: Optional[str] = Field(default=None, index=True)
 
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -66,3 +59,26 @@ class Paper(SQLModel, table=True):
 
 
 Index("idx_papers_source_external", Paper.source, Paper.external_id, unique=True)
+
+# Partial indexes (see scripts/check_query_plans.py for the queries they serve)
+Index(
+    "idx_papers_parsed_source_day",
+    Paper.source,
+    Paper.day,
+    sqlite_where=text("raw_text_path IS NOT NULL"),
+)
+Index(
+    "idx_papers_pending_mineru_day",
+    Paper.day,
+    sqlite_where=text("pdf_path IS NOT NULL AND raw_text_path IS NULL"),
+)
+Index(
+    "idx_papers_pending_mineru",
+    Paper.id,
+    sqlite_where=text("pdf_path IS NOT NULL AND raw_text_path IS NULL"),
+)
+Index(
+    "idx_papers_parsed",
+    Paper.id,
+    sqlite_where=text("raw_text_path IS NOT NULL"),
+)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import SQLModel, Field
+
+
+class PaperContent(SQLModel, table=True):
+    """Large per-paper text (LLM outputs, caption maps, raw HF payload).
+
+    Kept out of `papers` so feed/status/pipeline scans only touch narrow rows;
+    read it explicitly via app.services.paper_content when the text is needed.
+    """
+
+    __tablename__ = "paper_content"
+
+    paper_id: int = Field(primary_key=True, foreign_key="papers.id")
+
+    # LLM-generated longform explanation based on parsed paper content (optional)
+    content_explain_cn: Optional[str] = None  # zh
+    content_explain_en: Optional[str] = None  # en
+
+    # Optional: image -> caption mapping (JSON). Keys are relative URLs from /api/papers/{id} images[].
+    image_captions_json: Optional[str] = None  # zh
+    image_captions_en_json: Optional[str] = None  # en
+
+    # Raw HF daily_papers item
+    meta_json: Optional[str] = None
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -29,3 +29,4 @@ class PaperEvent(SQLModel, table=True):
 
 
 Index("idx_paper_events_paper_stage_created", PaperEvent.paper_id, PaperEvent.stage, PaperEvent.created_at)
+Index("idx_paper_events_status_created", PaperEvent.status, PaperEvent.created_at)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import SQLModel, Field, Index
+
+
+class PaperEventRollup(SQLModel, table=True):
+    """Per-day, per-stage aggregate of paper_events that aged out of retention."""
+
+    __tablename__ = "paper_event_rollups"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    # YYYY-MM-DD (UTC, from paper_events.created_at)
+    day: str = Field(index=True)
+    stage: str
+    status: str
+
+    n: int = Field(default=0)
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+Index(
+    "idx_paper_event_rollups_day_stage_status",
+    PaperEventRollup.day,
+    PaperEventRollup.stage,
+    PaperEventRollup.status,
+    unique=True,
+)
@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import text
 from sqlmodel import SQLModel, Field, Index
 
 
@@ -14,17 +15,17 @@ class PaperImage(SQLModel, table=True):
     paper_id: int = Field(index=True, foreign_key="papers.id")
 
     # e.g. "generated" | "mineru_extracted" (we only use generated for now)
-    kind: str = Field(default="generated", index=True)
+    kind: str = Field(default="generated")
 
     # language variant for the generated asset: zh|en
-    lang: str = Field(default="zh", index=True)
+    lang: str = Field(default="zh")
 
     provider: str = Field(default="seedream", index=True)
 
-    order_idx: int = Field(default=0, index=True)
+    order_idx: int = Field(default=0)
 
     status: str = Field(default="planned", index=True)  # planned|generated|failed
-    enabled: bool = Field(default=True, index=True)
+    enabled: bool = Field(default=True)
 
     prompt: Optional[str] = None
     negative_prompt: Optional[str] = None
@@ -52,3 +53,15 @@ Index(
     PaperImage.order_idx,
     unique=True,
 )
+
+# Visible generated images per paper (feed gating EXISTS + feed/detail preload order).
+# kind/lang/enabled are deliberately not indexed on their own: without ANALYZE stats
+# SQLite would pick those low-cardinality indexes over paper_id.
+Index(
+    "idx_paper_images_generated_visible",
+    PaperImage.paper_id,
+    PaperImage.lang,
+    PaperImage.provider,
+    PaperImage.order_idx,
+    sqlite_where=text("kind = 'generated' AND enabled = 1 AND url_path IS NOT NULL"),
+)
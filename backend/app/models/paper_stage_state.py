@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import SQLModel, Field, Index
+
+
+class PaperStageState(SQLModel, table=True):
+    """Current pipeline state per (paper, stage, lang).
+
+    `paper_events` is the append-only history; this table holds only the latest
+    outcome so status pages / monitors / feed gating can do point lookups.
+    Upserted by `record_paper_event`.
+    """
+
+    __tablename__ = "paper_stage_state"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    paper_id: int = Field(index=True, foreign_key="papers.id")
+
+    # Base stage without language suffix: pdf|mineru|explain|caption|paper_images|one_liner|...
+    stage: str = Field(index=True)
+
+    # zh|en for language-aware stages; "" for language-agnostic ones (pdf, mineru, ...)
+    lang: str = Field(default="")
+
+    # started|success|failed|skipped (latest event)
+    status: str = Field(index=True)
+
+    # Number of `started` events seen for this stage
+    attempts: int = Field(default=0)
+
+    last_error: Optional[str] = None
+
+    # Seconds between the latest `started` and the terminal event (if both were seen)
+    duration_s: Optional[float] = None
+
+    started_at: Optional[datetime] = None
+    # Latest `success`; unlike `status` it survives later started/failed/skipped events
+    # (a rerun in flight or failing does not hide stored output). Feed gating reads it.
+    succeeded_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+Index(
+    "idx_paper_stage_state_paper_stage_lang",
+    PaperStageState.paper_id,
+    PaperStageState.stage,
+    PaperStageState.lang,
+    unique=True,
+)
+Index(
+    "idx_paper_stage_state_stage_lang_status",
+    PaperStageState.stage,
+    PaperStageState.lang,
+    PaperStageState.status,
+)
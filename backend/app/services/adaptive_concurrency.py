@@ -0,0 +1,267 @@
+"""Adaptive (AIMD) concurrency for LLM, VLM and image provider calls.
+
+Instead of a fixed thread count per stage, each call class (`llm`: text chat,
+`vlm`: vision captions, `image`: Seedream/GLM-Image) passes through a gate whose
+limit adapts to how the provider copes:
+
+- additive increase: +1 after `limit` consecutive successes (about one round of
+  calls at the current level)
+- multiplicative decrease: halve on overload (429, timeout, 5xx; classified like
+  retries in app.services.retry_policy) or when a call takes more than
+  LATENCY_FACTOR times the gate's latency baseline, at most once per
+  DECREASE_COOLDOWN_S so one burst of failures counts once
+
+The latency baseline is an EWMA of successful call durations, rate-limiter waits
+excluded. Calls that report their size (`call.per(n, "token")`, e.g. completion
+tokens) are compared per unit, against a baseline of their own, so a long
+explanation is not "slow" next to a one-liner.
+
+Bounds are ADAPTIVE_CONCURRENCY (`name=min/max`); the start value is the old static
+setting (CONTENT_ANALYSIS_CONCURRENCY, IMAGE_CAPTION_CONCURRENCY,
+PAPER_IMAGES_CONCURRENCY) or, if newer, the limit the previous process ended with.
+Thread pools are sized to the max; the gate decides how many calls actually run.
+The state of every process is published to RATE_LIMIT_DB for /api/admin/status.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import settings
+from app.core.job_context import check_canceled
+from app.services.rate_limiter import limiter_db, thread_wait_s
+from app.services.retry_policy import classify_error
+
+
+OVERLOAD = frozenset({"rate_limit", "timeout", "server_error"})
+DECREASE_COOLDOWN_S = 5.0
+# A call slower than LATENCY_FACTOR x baseline counts as overload ("latency"), once
+# the baseline has seen _LATENCY_WARMUP calls; _LATENCY_ALPHA is the EWMA weight.
+LATENCY_FACTOR = 3.0
+_LATENCY_ALPHA = 0.1
+_LATENCY_WARMUP = 10
+_PUBLISH_EVERY_S = 5.0
+# A published limit older than this is not used as a start value.
+_RESUME_MAX_AGE_S = 24 * 3600
+
+
+def _initial(name: str) -> int:
+    return int(
+        {
+            "llm": settings.content_analysis_concurrency,
+            "vlm": settings.image_caption_concurrency,
+            "image": settings.paper_images_concurrency,
+        }.get(name, 1)
+        or 1
+    )
+
+
+def adaptive_bounds() -> dict[str, tuple[int, int]]:
+    """Parse ADAPTIVE_CONCURRENCY into {name: (min, max)}."""
+
+    out = {"llm": (1, 16), "vlm": (1, 8), "image": (1, 4)}
+    for part in (settings.adaptive_concurrency or "").split(","):
+        name, _, spec = part.partition("=")
+        name = name.strip().lower()
+        lo, _, hi = spec.partition("/")
+        try:
+            lo_i = max(1, int(lo))
+            out[name] = (lo_i, max(lo_i, int(hi or lo_i)))
+        except ValueError:
+            continue
+    return out
+
+
+class AdaptiveLimit:
+    def __init__(self, name: str, *, min_limit: int, max_limit: int, initial: float):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max_limit, max(min_limit, initial)))
+        self.inflight = 0
+        self.successes = 0
+        self.overloads = 0
+        self._streak = 0
+        self._last_decrease = 0.0
+        # unit ("call", "token", ...) -> (EWMA seconds per unit, samples)
+        self._latency: dict[str, tuple[float, int]] = {}
+        self._published = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait(timeout=1.0)
+                check_canceled()
+            self.inflight += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self.inflight -= 1
+                self._cond.notify_all()
+
+    def success(self, latency_s: float | None = None, *, unit: str = "call") -> None:
+        """A call succeeded; `latency_s` (per `unit`) feeds the latency baseline."""
+
+        if latency_s is not None and self._slow(max(0.0, latency_s), unit):
+            self.overload("latency")
+            return
+        with self._cond:
+            self.successes += 1
+            self._streak += 1
+            changed = False
+            if self._streak >= int(self.limit) and self.limit < self.max_limit:
+                self.limit += 1
+                self._streak = 0
+                changed = True
+                self._cond.notify_all()
+        if changed:
+            print(f"AIMD[{self.name}]: limit -> {int(self.limit)}")
+        self._publish(force=changed)
+
+    def _slow(self, latency_s: float, unit: str) -> bool:
+        with self._cond:
+            base, n = self._latency.get(unit, (latency_s, 0))
+            slow = n >= _LATENCY_WARMUP and latency_s > LATENCY_FACTOR * base
+            # Slow samples still move the baseline: a lasting shift becomes the new normal.
+            self._latency[unit] = (base + _LATENCY_ALPHA * (latency_s - base), n + 1)
+        return slow
+
+    def overload(self, reason: str) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self.overloads += 1
+            self._streak = 0
+            changed = False
+            if now - self._last_decrease >= DECREASE_COOLDOWN_S and self.limit > self.min_limit:
+                self.limit = float(max(self.min_limit, math.floor(self.limit / 2)))
+                self._last_decrease = now
+                changed = True
+        if changed:
+            print(f"AIMD[{self.name}]: {reason} -> limit {int(self.limit)}")
+        self._publish(force=changed)
+
+    def state(self) -> dict:
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "min": self.min_limit,
+                "max": self.max_limit,
+                "inflight": self.inflight,
+                "successes": self.successes,
+                "overloads": self.overloads,
+            }
+
+    def _publish(self, *, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._published < _PUBLISH_EVERY_S:
+            return
+        self._published = now
+        st = self.state()
+        try:
+            limiter_db().execute(
+                "INSERT OR REPLACE INTO adaptive (name, pid, lim, inflight, successes, overloads, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.name, os.getpid(), st["limit"], st["inflight"], st["successes"], st["overloads"], time.time()),
+            )
+        except Exception as e:
+            print(f"WARN: AIMD[{self.name}] state not published: {e}")
+
+
+_limits: dict[str, AdaptiveLimit] = {}
+_lock = threading.Lock()
+
+
+def _resume_limit(name: str) -> float | None:
+    try:
+        row = limiter_db().execute(
+            "SELECT lim FROM adaptive WHERE name = ? AND updated > ? ORDER BY updated DESC LIMIT 1",
+            (name, time.time() - _RESUME_MAX_AGE_S),
+        ).fetchone()
+    except Exception:
+        return None
+    return float(row[0]) if row else None
+
+
+def adaptive_limit(name: str) -> AdaptiveLimit:
+    """The process-wide gate for a call class (`llm`, `vlm`, `image`)."""
+
+    with _lock:
+        lim = _limits.get(name)
+        if lim is None:
+            lo, hi = adaptive_bounds().get(name, (1, 4))
+            start = _resume_limit(name)
+            lim = _limits[name] = AdaptiveLimit(
+                name, min_limit=lo, max_limit=hi, initial=start if start is not None else _initial(name)
+            )
+        return lim
+
+
+class AdaptiveCall:
+    """One call under a gate; the caller may report its size for the latency check."""
+
+    def __init__(self) -> None:
+        self.units = 1.0
+        self.unit = "call"
+
+    def per(self, units, unit: str) -> None:
+        try:
+            n = float(units or 0)
+        except (TypeError, ValueError):
+            return
+        if n > 0:
+            self.units = n
+            self.unit = unit
+
+
+@contextmanager
+def adaptive_call(name: str):
+    """Run one provider call under the `name` gate and feed its outcome (error class
+    or duration) back."""
+
+    lim = adaptive_limit(name)
+    with lim.slot():
+        call = AdaptiveCall()
+        waited0 = thread_wait_s()
+        t0 = time.perf_counter()
+        try:
+            yield call
+        except Exception as e:
+            cls = classify_error(f"{type(e).__name__}: {e}")
+            if cls in OVERLOAD:
+                lim.overload(cls)
+            raise
+        else:
+            busy = time.perf_counter() - t0 - (thread_wait_s() - waited0)
+            lim.success(busy / call.units, unit=call.unit)
+
+
+def adaptive_stats(*, max_age_s: float = 3600) -> dict[str, list[dict]]:
+    """Published gate states of recently active processes, by name."""
+
+    if not os.path.exists(str(settings.rate_limit_db)):
+        return {}
+    out: dict[str, list[dict]] = {}
+    rows = limiter_db().execute(
+        "SELECT name, pid, lim, inflight, successes, overloads, updated FROM adaptive "
+        "WHERE updated > ? ORDER BY name, updated DESC",
+        (time.time() - max_age_s,),
+    ).fetchall()
+    for name, pid, lim, inflight, ok, bad, updated in rows:
+        out.setdefault(name, []).append(
+            {
+                "pid": int(pid),
+                "limit": int(lim),
+                "inflight": int(inflight),
+                "successes": int(ok),
+                "overloads": int(bad),
+                "age_s": round(time.time() - float(updated), 1),
+            }
+        )
+    return out
@@ -0,0 +1,252 @@
+"""Content-addressed store for binary assets (PDFs, repaired PDFs, MinerU images,
+generated images).
+
+Each distinct content is kept once, at BLOB_STORE_DIR/<sha[:2]>/<sha[2:4]>/<sha>.
+The paths the app reads and serves (data/raw/pdfs/<id>.pdf, MinerU `images/`,
+static/gen/...) stay where they are but become named views of the blob: a hardlink
+where possible, else a reflink (copy-on-write clone), else a plain copy. Views are
+read-only by convention; writers replace a path (write + rename) instead of editing
+it in place.
+
+blobs.refcount counts the blob_refs rows (views) of a blob. gc_blobs() drops refs
+whose view disappeared or was replaced (e.g. by a regen job) and deletes blobs
+nobody references any more.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.blob import Blob, BlobRef
+
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# FICLONE ioctl (Linux: btrfs, xfs, bcachefs, ...)
+_FICLONE = 0x40049409
+
+
+def blob_path(sha256: str) -> Path:
+    return Path(settings.blob_store_dir) / sha256[:2] / sha256[2:4] / sha256
+
+
+def _file_sha256(path: Path) -> str:
+    from app.services.pdf_downloader import file_sha256
+
+    return file_sha256(path)
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import fcntl
+
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def link_file(src: str | Path, dst: str | Path) -> None:
+    """Make `dst` a view of `src` (hardlink > reflink > copy), replacing it atomically."""
+
+    src, dst = Path(src), Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        if not _reflink(src, tmp):
+            shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def _ensure_blob(session: Session, sha256: str, *, size: int, kind: str) -> None:
+    now = datetime.utcnow()
+    session.execute(
+        sqlite_insert(Blob)
+        .values(sha256=sha256, size=size, kind=kind, refcount=0, created_at=now, updated_at=now)
+        .on_conflict_do_nothing(index_elements=["sha256"])
+    )
+
+
+def _add_ref(session: Session, sha256: str, delta: int) -> None:
+    session.execute(
+        update(Blob)
+        .where(Blob.sha256 == sha256)
+        .values(refcount=Blob.refcount + delta, updated_at=datetime.utcnow())
+    )
+
+
+def _set_ref(session: Session, path: str, sha256: str) -> None:
+    ref = session.get(BlobRef, path)
+    if ref is not None and ref.sha256 == sha256:
+        return
+    if ref is not None:
+        _add_ref(session, ref.sha256, -1)
+        ref.sha256 = sha256
+        session.add(ref)
+    else:
+        session.add(BlobRef(path=path, sha256=sha256))
+    _add_ref(session, sha256, +1)
+
+
+def put_file(
+    session: Session,
+    path: str | Path,
+    *,
+    kind: str,
+    sha256: str | None = None,
+    commit: bool = True,
+) -> str | None:
+    """Adopt an existing file into the store and record it as a view.
+
+    A new content is stored as a link to the file itself; a content that is already
+    stored replaces the file with a view of the stored copy (deduplication). `sha256`
+    (e.g. papers.pdf_sha256 / paper_images.sha256) saves hashing the file again only
+    when the file already is a view of that stored blob; otherwise (no such blob, or a
+    different file) the file is hashed, so a stale recorded hash never files content
+    under the wrong address. Returns the sha256, or None when the store is disabled or
+    the file does not exist.
+    """
+
+    if not settings.blob_store:
+        return None
+    p = Path(path)
+    if not p.is_file():
+        return None
+
+    size = p.stat().st_size
+    blob = session.get(Blob, sha256) if sha256 else None
+    if not (blob is not None and blob.size == size and _same_file(p, blob_path(sha256))):
+        sha256 = _file_sha256(p)
+
+    bp = blob_path(sha256)
+    if not bp.is_file():
+        link_file(p, bp)
+    elif not _same_file(p, bp):
+        link_file(bp, p)
+
+    _ensure_blob(session, sha256, size=size, kind=kind)
+    _set_ref(session, str(p), sha256)
+    if commit:
+        session.commit()
+    return sha256
+
+
+def put_tree(session: Session, root: str | Path, *, kind: str, exts: set[str] = IMAGE_EXTS) -> int:
+    """put_file() for the files directly under `root` with one of `exts`; returns the count."""
+
+    if not settings.blob_store:
+        return 0
+    d = Path(root)
+    if not d.is_dir():
+        return 0
+    n = 0
+    for fp in sorted(d.iterdir()):
+        if fp.is_file() and fp.suffix.lower() in exts and not fp.name.startswith("."):
+            try:
+                if put_file(session, fp, kind=kind, commit=False):
+                    n += 1
+            except OSError as e:
+                print(f"WARN: blob store: {fp}: {e}")
+    session.commit()
+    return n
+
+
+def restore_view(session: Session, sha256: str | None, path: str | Path, *, kind: str) -> bool:
+    """Recreate `path` from the stored blob `sha256` (instead of downloading or
+    regenerating it). False when the store is disabled or does not have the content."""
+
+    if not (settings.blob_store and sha256):
+        return False
+    bp = blob_path(sha256)
+    if not bp.is_file():
+        return False
+    link_file(bp, path)
+    _ensure_blob(session, sha256, size=bp.stat().st_size, kind=kind)
+    _set_ref(session, str(Path(path)), sha256)
+    session.commit()
+    return True
+
+
+def _view_current(path: Path, sha256: str, size: int | None) -> bool:
+    """Whether `path` still shows blob `sha256`: the same file (hardlink), else, for
+    reflink/copy views, the same content."""
+
+    bp = blob_path(sha256)
+    if _same_file(path, bp):
+        return True
+    try:
+        if not path.is_file() or path.stat().st_size != size:
+            return False
+        return _file_sha256(path) == sha256
+    except OSError:
+        return False
+
+
+def gc_blobs(session: Session) -> dict[str, int]:
+    """Drop refs whose view is gone or was replaced, then delete unreferenced blobs."""
+
+    if not settings.blob_store:
+        return {"refs_dropped": 0, "blobs_deleted": 0, "bytes_freed": 0}
+
+    dropped = 0
+    rows = session.exec(
+        select(BlobRef.path, BlobRef.sha256, Blob.size).join(Blob, Blob.sha256 == BlobRef.sha256)
+    ).all()
+    for path, sha, size in rows:
+        stale = not _view_current(Path(path), sha, size)
+        if stale:
+            session.execute(delete(BlobRef).where(BlobRef.path == path))
+            _add_ref(session, sha, -1)
+            dropped += 1
+    session.commit()
+
+    deleted = freed = 0
+    for b in session.exec(select(Blob).where(Blob.refcount <= 0)).all():
+        # A view may have been added since the count was read.
+        live = session.exec(select(func.count()).select_from(BlobRef).where(BlobRef.sha256 == b.sha256)).one()
+        if live:
+            b.refcount = int(live)
+            session.add(b)
+            continue
+        blob_path(b.sha256).unlink(missing_ok=True)
+        freed += int(b.size or 0)
+        deleted += 1
+        session.delete(b)
+    session.commit()
+    return {"refs_dropped": dropped, "blobs_deleted": deleted, "bytes_freed": freed}
+
+
+def blob_stats(session: Session) -> dict[str, int]:
+    """Stored blobs/bytes vs. the bytes their views would take as separate files."""
+
+    blobs, stored = session.exec(select(func.count(), func.coalesce(func.sum(Blob.size), 0))).one()
+    refs, logical = session.exec(
+        select(func.count(), func.coalesce(func.sum(Blob.size), 0))
+        .select_from(BlobRef)
+        .join(Blob, Blob.sha256 == BlobRef.sha256)
+    ).one()
+    return {"blobs": int(blobs), "bytes": int(stored), "views": int(refs), "view_bytes": int(logical)}
@@ -1,9 +1,7 @@
 from __future__ import annotations
 
-import json
 import re
 import shutil
-import subprocess
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -11,9 +9,12 @@ from pathlib import Path
 from sqlmodel import Session, select
 
 from app.core.config import settings
+from app.core.job_context import run_child
 from app.models.paper import Paper
 from app.models.paper_image import PaperImage
 from app.services.app_config import get_effective_app_config
+from app.services.job_progress import job_progress
+from app.services.paper_content import captions_field, content_json, get_paper_content
 
 
 _MD_IMG_RE = re.compile(r"!\[[^\]]*\]\(([^)]+)\)")
@@ -33,25 +34,14 @@ def _lang_to_epub_lang(lang: str) -> str:
     return "en"
 
 
-def _load_caption_by_basename(p: Paper, *, lang: str) -> dict[str, str]:
+def _load_caption_by_basename(session: Session, p: Paper, *, lang: str) -> dict[str, str]:
     """Return mapping: image filename -> caption text.
 
     Captions in DB are stored as a JSON mapping from image URL to caption.
     We normalize by basename so we can match after copying assets into the EPUB build dir.
     """
 
-    lang0 = (lang or "en").strip().lower()
-    raw = p.image_captions_en_json if lang0 == "en" else p.image_captions_json
-    if not raw:
-        return {}
-
-    try:
-        obj = json.loads(raw) or {}
-    except Exception:
-        return {}
-
-    if not isinstance(obj, dict):
-        return {}
+    obj = content_json(get_paper_content(session, p.id), captions_field(lang or "en"))
 
     out: dict[str, str] = {}
     for k, v in obj.items():
@@ -290,7 +280,7 @@ def build_epub_for_paper(
 
     # Rewrite markdown
     md_text = md_path.read_text(encoding="utf-8", errors="ignore")
-    caption_by_basename = _load_caption_by_basename(paper, lang=lang0)
+    caption_by_basename = _load_caption_by_basename(session, paper, lang=lang0)
     rewritten = _rewrite_markdown_for_epub(md_text, caption_by_basename=caption_by_basename)
 
     rewritten_path = build_dir / "book.md"
@@ -330,7 +320,7 @@ def build_epub_for_paper(
 
     cmd += [str(rewritten_path)]
 
-    r = subprocess.run(cmd, capture_output=True, text=True)
+    r = run_child(cmd, capture_output=True, text=True)
     if r.returncode != 0 or not out_tmp.exists():
         stderr = (r.stderr or "").strip()
         stdout = (r.stdout or "").strip()
@@ -396,21 +386,33 @@ def build_epubs_for_pending(
 
     import time
 
+    # Progress unit: one paper in one language.
+    prog = job_progress()
+    prog.add_total(len(rows) * len(langs0))
+
     out: list[BuildResult] = []
     for p in rows:
         for lang in langs0:
             # If we are not overwriting, only fill missing.
             if not overwrite:
                 if lang == "en" and p.epub_path_en:
+                    prog.done()
                     continue
                 if lang == "zh" and p.epub_path_zh:
+                    prog.done()
                     continue
 
             eid = (p.external_id or "").strip() or str(p.id)
+            prog.item(f"{eid} [{lang}]")
             t0 = time.perf_counter()
             print(f"EPUB_BUILD_START[{lang}]: {eid}")
-            r = build_epub_for_paper(session, paper=p, lang=lang, overwrite=overwrite)
+            try:
+                r = build_epub_for_paper(session, paper=p, lang=lang, overwrite=overwrite)
+            except Exception:
+                prog.failed()
+                raise
             dt = time.perf_counter() - t0
+            prog.done()
             if r:
                 out.append(r)
                 print(f"EPUB_BUILD_DONE[{lang}]: {eid} seconds={dt:.2f} url={r.url_path}")
@@ -10,6 +10,7 @@ from typing import Optional
 import httpx
 
 from app.core.config import settings
+from app.services.rate_limiter import RateLimit
 
 
 def _load_glm_keys() -> list[str]:
@@ -146,7 +147,10 @@ def glm_image_generate(
 
         try:
             with httpx.Client(timeout=timeout_s, trust_env=False) as client:
-                r = client.post(url, headers=headers, json=body)
+                with RateLimit("glm", api_key) as rl:
+                    r = client.post(url, headers=headers, json=body)
+                    if r.status_code == 429:
+                        rl.throttled(r.headers.get("retry-after"))
                 # parse json early
                 try:
                     j = r.json()
@@ -154,12 +158,8 @@ def glm_image_generate(
                     j = {}
 
                 if not r.is_success:
-                    # retryable auth/rate
+                    # retryable auth/rate (a 429 backs this key off in the rate limiter)
                     if r.status_code in (401, 403, 429):
-                        if r.status_code == 429:
-                            import time
-
-                            time.sleep(1.2)
                         last_err = RuntimeError(
                             f"GLM-Image key failed: HTTP {r.status_code}: {str(j)[:2000] or r.text[:2000]}"
                         )
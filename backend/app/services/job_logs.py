@@ -0,0 +1,219 @@
+"""Job log storage: byte-range reads and seekable gzip archives.
+
+A job logs to `data/logs/job_<id>_<type>.log` (plain, appended). Once the job has
+finished, the worker moves the text into `<log>.gz`, written as a series of
+independent gzip members of LOG_CHUNK_BYTES uncompressed each (still a valid gzip
+file: `zcat` works), with a sidecar index `<log>.gz.idx` mapping uncompressed
+offsets to member offsets. A range read therefore decompresses one or two members
+instead of the whole file.
+
+The logical log is `<log>.gz` followed by `<log>` (a retried job appends to a fresh
+plain file; archiving it again appends members), so offsets stay stable across
+archiving and reruns.
+"""
+
+from __future__ import annotations
+
+import bisect
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.job import Job
+
+
+LOG_CHUNK_BYTES = 1 << 20
+
+# Upper bound for one range read.
+MAX_READ_BYTES = 1 << 20
+
+
+def _gz_path(log_path: Path) -> Path:
+    return log_path.with_name(log_path.name + ".gz")
+
+
+def _idx_path(log_path: Path) -> Path:
+    return log_path.with_name(log_path.name + ".gz.idx")
+
+
+def _load_index(log_path: Path) -> dict[str, Any]:
+    """{"size": uncompressed bytes, "members": [[uncompressed_off, compressed_off], ...]}"""
+
+    try:
+        idx = json.loads(_idx_path(log_path).read_text(encoding="utf-8")) or {}
+        members = [(int(u), int(c)) for u, c in idx.get("members") or []]
+        return {"size": int(idx.get("size") or 0), "compressed": int(idx.get("compressed") or 0), "members": members}
+    except (OSError, ValueError, TypeError):
+        return {"size": 0, "compressed": 0, "members": []}
+
+
+def _plain_size(log_path: Path) -> int:
+    try:
+        return log_path.stat().st_size
+    except OSError:
+        return 0
+
+
+def log_exists(log_path: str | Path) -> bool:
+    p = Path(log_path)
+    return p.is_file() or _gz_path(p).is_file()
+
+
+def _read_archived(log_path: Path, idx: dict[str, Any], offset: int, limit: int) -> bytes:
+    members = idx["members"]
+    starts = [u for u, _c in members]
+    i = max(0, bisect.bisect_right(starts, offset) - 1)
+    out = bytearray()
+    with _gz_path(log_path).open("rb") as f:
+        while i < len(members) and len(out) < limit:
+            u_off, c_off = members[i]
+            c_end = members[i + 1][1] if i + 1 < len(members) else idx["compressed"]
+            f.seek(c_off)
+            data = gzip.decompress(f.read(c_end - c_off))
+            skip = max(0, offset + len(out) - u_off)
+            out += data[skip : skip + (limit - len(out))]
+            i += 1
+    return bytes(out)
+
+
+def _read_plain(log_path: Path, offset: int, limit: int) -> bytes:
+    try:
+        with log_path.open("rb") as f:
+            f.seek(offset)
+            return f.read(limit)
+    except OSError:
+        return b""
+
+
+def _utf8_cut(data: bytes) -> int:
+    """Length of `data` without a trailing incomplete UTF-8 sequence."""
+
+    for back in range(1, min(4, len(data)) + 1):
+        b = data[-back]
+        if b & 0xC0 == 0x80:  # continuation byte
+            continue
+        if b < 0x80:
+            return len(data)
+        need = 2 if b < 0xE0 else 3 if b < 0xF0 else 4
+        return len(data) if back >= need else len(data) - back
+    return len(data)
+
+
+def read_log(log_path: str | Path, *, offset: int = 0, limit: int = 65536) -> dict[str, Any]:
+    """Read `limit` bytes of a job log from `offset` (negative: from the end).
+
+    Returns {"text", "offset", "next_offset", "size", "eof", "archived"}; poll with
+    offset=next_offset to follow a running job. A multi-byte character cut by the
+    range is left for the next read.
+    """
+
+    p = Path(log_path)
+    idx = _load_index(p)
+    gz_size = idx["size"]
+    size = gz_size + _plain_size(p)
+
+    offset = int(offset)
+    if offset < 0:
+        offset = max(0, size + offset)
+    offset = min(offset, size)
+    limit = max(1, min(int(limit or 65536), MAX_READ_BYTES))
+
+    data = b""
+    if offset < gz_size:
+        data = _read_archived(p, idx, offset, min(limit, gz_size - offset))
+    if len(data) < limit and offset + len(data) >= gz_size:
+        data += _read_plain(p, offset + len(data) - gz_size, limit - len(data))
+
+    end = offset + len(data)
+    if end < size:
+        data = data[: _utf8_cut(data)]
+        end = offset + len(data)
+
+    return {
+        "text": data.decode("utf-8", errors="replace"),
+        "offset": offset,
+        "next_offset": end,
+        "size": size,
+        "eof": end >= size,
+        "archived": gz_size > 0,
+    }
+
+
+def tail_text(log_path: str | Path, *, lines: int = 200, max_bytes: int = MAX_READ_BYTES) -> str:
+    """Last `lines` lines of a job log (plain or archived), reading at most `max_bytes`."""
+
+    want = max(4096, min(int(max_bytes), lines * 400))
+    r = read_log(log_path, offset=-want, limit=want)
+    out = r["text"].splitlines()
+    if r["offset"] > 0 and out:
+        out = out[1:]  # first line is most likely partial
+    return "\n".join(out[-lines:])
+
+
+def archive_log(log_path: str | Path) -> dict[str, int] | None:
+    """Append the plain log to its seekable gzip archive and remove it.
+
+    Only call once nothing writes to the log any more (job finished). Returns
+    {"bytes", "compressed"} for the archived part, or None when there was nothing.
+    """
+
+    p = Path(log_path)
+    n = _plain_size(p)
+    if n <= 0:
+        return None
+
+    idx = _load_index(p)
+    gz = _gz_path(p)
+    # Drop a partial tail from an interrupted earlier run before appending.
+    with gz.open("ab") as out:
+        out.truncate(idx["compressed"])
+        u = idx["size"]
+        c = idx["compressed"]
+        with p.open("rb") as f:
+            while True:
+                chunk = f.read(LOG_CHUNK_BYTES)
+                if not chunk:
+                    break
+                blob = gzip.compress(chunk, compresslevel=6)
+                out.write(blob)
+                idx["members"].append((u, c))
+                u += len(chunk)
+                c += len(blob)
+        out.flush()
+        os.fsync(out.fileno())
+
+    before = idx["compressed"]
+    idx.update(size=u, compressed=c)
+    tmp = _idx_path(p).with_suffix(".idx.tmp")
+    tmp.write_text(json.dumps({**idx, "chunk": LOG_CHUNK_BYTES}), encoding="utf-8")
+    os.replace(tmp, _idx_path(p))
+    p.unlink()
+    return {"bytes": n, "compressed": c - before}
+
+
+def archive_finished_job_logs(session: Session, *, limit: int = 500) -> int:
+    """Archive plain logs of finished jobs (e.g. left behind by a crashed worker)."""
+
+    if not settings.job_log_archive:
+        return 0
+    n = 0
+    rows = session.exec(
+        select(Job.log_path)
+        .where(Job.status.in_(("success", "failed", "canceled")))
+        .where(Job.log_path.is_not(None))
+        .order_by(Job.id.desc())
+        .limit(limit)
+    ).all()
+    for lp in rows:
+        if lp and Path(lp).is_file():
+            try:
+                if archive_log(lp):
+                    n += 1
+            except OSError as e:
+                print(f"WARN: archive log failed {lp}: {e}")
+    return n
@@ -0,0 +1,187 @@
+"""Structured progress for long-running job handlers.
+
+Handlers report through the tracker of the job they run in:
+
+    prog = job_progress()
+    prog.add_total(len(rows))
+    for p in rows:
+        prog.item(p.external_id)
+        ...
+        prog.done()  # or prog.failed()
+
+Counts live in memory and are written to the `jobs` row at most every
+JOB_PROGRESS_INTERVAL_S (plus once when the job ends), so per-item reporting costs
+nothing noticeable. Outside a job (daily_run, ad-hoc scripts) the tracker only counts.
+
+Every report is also a cancellation checkpoint: once the worker stops the job
+(timeout / admin cancel) the next call raises JobCanceled.
+"""
+
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.job_context import check_canceled, current_job_id
+from app.db.engine import engine
+from app.models.job import Job
+
+
+_CURRENT_ITEM_MAX = 200
+
+
+class JobProgress:
+    """Thread-safe counters for one job; persisted throttled (job_id=None: never)."""
+
+    def __init__(self, job_id: int | None):
+        self.job_id = job_id
+        self.total: int | None = None
+        self.done_n = 0
+        self.failed_n = 0
+        self.current: str | None = None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_write = 0.0
+
+    def add_total(self, n: int) -> None:
+        """Announce `n` more items (stages may add their share as they discover work)."""
+
+        with self._lock:
+            self.total = max(0, int(self.total or 0) + int(n))
+            self._dirty = True
+        self._tick()
+
+    def item(self, name: Any) -> None:
+        """Mark the item currently being worked on."""
+
+        with self._lock:
+            self.current = str(name)[:_CURRENT_ITEM_MAX] if name is not None else None
+            self._dirty = True
+        self._tick()
+
+    def done(self, n: int = 1) -> None:
+        with self._lock:
+            self.done_n += int(n)
+            self._dirty = True
+        self._tick()
+
+    def failed(self, n: int = 1) -> None:
+        with self._lock:
+            self.failed_n += int(n)
+            self._dirty = True
+        self._tick()
+
+    def settle(self) -> None:
+        """A stage stopped early (quota reached): drop announced items it will not process."""
+
+        with self._lock:
+            if self.total is not None:
+                self.total = min(self.total, self.done_n + self.failed_n)
+            self._dirty = True
+        self._tick()
+
+    def _tick(self) -> None:
+        check_canceled()
+        interval = max(0.0, float(settings.job_progress_interval_s or 0))
+        if time.monotonic() - self._last_write >= interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.job_id is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            values = {
+                "items_total": self.total,
+                "items_done": self.done_n,
+                "items_failed": self.failed_n,
+                "current_item": self.current,
+                "progress_at": datetime.utcnow(),
+            }
+            self._dirty = False
+            self._last_write = time.monotonic()
+
+        # Best-effort: progress must never fail the job. Only the running row is touched,
+        # so a late write cannot resurrect a finished/reclaimed job.
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(Job).where(Job.id == self.job_id).where(Job.status == "running").values(**values)
+                )
+        except Exception as e:
+            print(f"WARN: job progress write failed job={self.job_id}: {e}")
+
+
+_trackers: dict[int, JobProgress] = {}
+_trackers_lock = threading.Lock()
+
+
+def job_progress() -> JobProgress:
+    """Tracker of the current job (shared by all threads of that job)."""
+
+    job_id = current_job_id()
+    if job_id is None:
+        return JobProgress(None)
+    with _trackers_lock:
+        prog = _trackers.get(job_id)
+        if prog is None:
+            prog = _trackers[job_id] = JobProgress(job_id)
+        return prog
+
+
+def close_job_progress(job_id: int) -> None:
+    """Write the final counts of a job and forget its tracker (called before finishing it)."""
+
+    with _trackers_lock:
+        prog = _trackers.pop(job_id, None)
+    if prog is not None:
+        prog.flush()
+
+
+@atexit.register
+def _flush_all() -> None:
+    # Subprocess handlers: persist the last counts on exit.
+    for job_id in list(_trackers):
+        close_job_progress(job_id)
+
+
+def progress_view(job: Job, *, now: datetime | None = None) -> dict[str, Any] | None:
+    """Progress of a job with throughput (items/min) and ETA; None when nothing was reported."""
+
+    if job.progress_at is None:
+        return None
+
+    total = job.items_total
+    processed = int(job.items_done or 0) + int(job.items_failed or 0)
+    out: dict[str, Any] = {
+        "total": total,
+        "done": int(job.items_done or 0),
+        "failed": int(job.items_failed or 0),
+        "current": job.current_item,
+        "percent": round(100.0 * processed / total, 1) if total else None,
+        "per_min": None,
+        "eta_s": None,
+        "eta_at": None,
+    }
+
+    elapsed = (job.progress_at - job.started_at).total_seconds() if job.started_at else 0.0
+    if processed <= 0 or elapsed <= 0:
+        return out
+
+    rate = processed / elapsed
+    out["per_min"] = round(rate * 60.0, 2)
+    if job.status == "running" and total is not None:
+        remaining = max(0, total - processed)
+        # Measured up to the last progress write; discount the time since then.
+        now = now or datetime.utcnow()
+        eta_s = max(0.0, remaining / rate - max(0.0, (now - job.progress_at).total_seconds()))
+        out["eta_s"] = round(eta_s)
+        out["eta_at"] = (now + timedelta(seconds=eta_s)).isoformat(timespec="seconds")
+    return out
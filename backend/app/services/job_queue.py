@@ -1,25 +1,670 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Optional
 
+from sqlalchemy import String, case, cast, exists, func, insert, or_, update
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select
 
+from app.core.config import settings
 from app.models.job import Job
+from app.models.job_dependency import JobDependency
 
 
-def enqueue_job(session: Session, *, job_type: str, payload: dict[str, Any] | None = None) -> Job:
+# Worker concurrency slots. Each job type occupies one slot of its class while running;
+# per-class limits come from JOB_SLOTS (e.g. "mineru=1,llm=4,image=2,misc=2").
+JOB_SLOT_CLASSES: dict[str, str] = {
+    "one_liner_scoped": "llm",
+    "one_liner_regen_scoped": "llm",
+    "content_analysis_scoped": "llm",
+    "content_analysis_regen_scoped": "llm",
+    "image_caption_scoped": "llm",
+    "image_caption_regen_scoped": "llm",
+    "paper_images_scoped": "image",
+    "paper_images_regen_scoped": "image",
+    "paper_images_glm_backfill": "image",
+    "mineru_ocr_fix_scoped": "mineru",
+    "mineru_ocr_fix_regen_scoped": "mineru",
+    "pipeline": "misc",
+}
+
+# Per-paper stage jobs (paper_retry_stage, pipeline nodes) are classified by their stage.
+STAGE_JOB_TYPES = ("paper_retry_stage", "paper_stage")
+
+_RETRY_STAGE_SLOTS = {
+    "mineru": "mineru",
+    "explain": "llm",
+    "caption": "llm",
+    "paper_images": "image",
+}
+
+DEFAULT_SLOT = "misc"
+
+
+def job_slot(job_type: str, payload_json: str | None = None) -> str:
+    if job_type in STAGE_JOB_TYPES:
+        try:
+            stage = str((json.loads(payload_json or "{}") or {}).get("stage") or "")
+        except Exception:
+            stage = ""
+        return _RETRY_STAGE_SLOTS.get(stage.strip().lower(), DEFAULT_SLOT)
+    return JOB_SLOT_CLASSES.get(job_type, DEFAULT_SLOT)
+
+
+def slot_limits() -> dict[str, int]:
+    """Parse JOB_SLOTS; every known slot gets at least one worker."""
+
+    limits = {"mineru": 1, "llm": 1, "image": 1, DEFAULT_SLOT: 1}
+    for part in (settings.job_slots or "").split(","):
+        name, _, n = part.partition("=")
+        name = name.strip().lower()
+        if not name:
+            continue
+        try:
+            limits[name] = max(1, int(n))
+        except ValueError:
+            continue
+    return limits
+
+
+def job_timeout_s(job_type: str, slot: str) -> float | None:
+    """Timeout from JOB_TIMEOUTS (job type entry, else slot entry); None = no limit."""
+
+    table: dict[str, float] = {}
+    for part in (settings.job_timeouts or "").split(","):
+        name, _, n = part.partition("=")
+        name = name.strip().lower()
+        if not name:
+            continue
+        try:
+            table[name] = float(n)
+        except ValueError:
+            continue
+    t = table.get(job_type, table.get(slot, 0.0))
+    return t if t > 0 else None
+
+
+def job_slot_sql(job_type_col, payload_col):
+    """SQL twin of job_slot(): slot name as a CASE expression over jobs columns."""
+
+    stage = func.lower(
+        func.trim(case((func.json_valid(payload_col) == 1, func.json_extract(payload_col, "$.stage")), else_=""))
+    )
+    retry_slot = case(*[(stage == k, v) for k, v in _RETRY_STAGE_SLOTS.items()], else_=DEFAULT_SLOT)
+    return case(
+        (job_type_col.in_(STAGE_JOB_TYPES), retry_slot),
+        else_=case(JOB_SLOT_CLASSES, value=job_type_col, else_=DEFAULT_SLOT),
+    )
+
+
+def slot_occupancy(session: Session) -> dict[str, dict[str, int]]:
+    """Running jobs per slot vs configured limit (status snapshot / worker pre-check)."""
+
+    limits = slot_limits()
+    res = {name: {"running": 0, "limit": n} for name, n in limits.items()}
+    slot = job_slot_sql(Job.job_type, Job.payload_json)
+    rows = session.exec(select(slot, func.count()).where(Job.status == "running").group_by(slot)).all()
+    for name, n in rows:
+        res.setdefault(str(name), {"running": 0, "limit": limits.get(str(name), 1)})
+        res[str(name)]["running"] = int(n or 0)
+    return res
+
+
+# Default priorities (higher runs first): interactive single-paper fixes, then scoped
+# fill-missing runs, then regens, then bulk backfills/maintenance.
+PRIORITY_INTERACTIVE = 100
+PRIORITY_DEFAULT = 50
+PRIORITY_REGEN = 30
+PRIORITY_BULK = 10
+
+_BULK_JOB_TYPES = {"paper_images_glm_backfill", "paper_events_backfill", "db_retention"}
+
+
+def default_priority(job_type: str) -> int:
+    if job_type == "paper_retry_stage":
+        return PRIORITY_INTERACTIVE
+    if job_type in _BULK_JOB_TYPES:
+        return PRIORITY_BULK
+    if job_type.endswith("_regen_scoped"):
+        return PRIORITY_REGEN
+    return PRIORITY_DEFAULT
+
+
+def slot_limit_for(limits: dict[str, int], slot: str, priority: int) -> int:
+    """Interactive jobs may use one slot beyond the limit, so they never wait behind bulk work."""
+
+    n = int(limits.get(slot, 1))
+    return n + 1 if int(priority) >= int(settings.job_interactive_priority) else n
+
+
+def effective_priority_sql(now: datetime):
+    """priority + minutes queued / JOB_PRIORITY_AGING_MIN (aging: nothing starves).
+
+    Scheduled retries age from their not_before time, not from the original enqueue."""
+
+    aging = max(0.1, float(settings.job_priority_aging_min or 10))
+    waited_min = (func.julianday(now) - func.julianday(func.coalesce(Job.not_before, Job.created_at))) * 1440.0
+    return Job.priority + waited_min / aging
+
+
+def _unmet_dependency(job_id_col, *, statuses: tuple[str, ...] | None = None):
+    """EXISTS clause: the job has an upstream dependency that has not succeeded
+    (restricted to upstream `statuses` when given)."""
+
+    up = aliased(Job)
+    q = (
+        select(JobDependency.depends_on_id)
+        .join(up, up.id == JobDependency.depends_on_id)
+        .where(JobDependency.job_id == job_id_col)
+    )
+    q = q.where(up.status.in_(statuses)) if statuses else q.where(up.status != "success")
+    return exists(q)
+
+
+def claim_candidates(session: Session, *, limit: int = 200) -> list[tuple[int, str, str | None, int]]:
+    """Due queued jobs (not_before passed, all dependencies succeeded) in claim order:
+    aged priority minus a fair-share penalty per job of the same type already running
+    (so one bulk type cannot monopolise the workers).
+
+    Returns [(job_id, job_type, payload_json, priority)].
+    """
+
+    now = datetime.utcnow()
+    eff = effective_priority_sql(now)
+    rows = session.exec(
+        select(Job.id, Job.job_type, Job.payload_json, Job.priority, eff)
+        .where(Job.status == "queued")
+        .where(or_(Job.not_before.is_(None), Job.not_before <= now))
+        .where(~_unmet_dependency(Job.id))
+        .order_by(eff.desc(), Job.id.asc())
+        .limit(limit)
+    ).all()
+    if not rows:
+        return []
+
+    running_by_type = dict(
+        session.exec(select(Job.job_type, func.count()).where(Job.status == "running").group_by(Job.job_type)).all()
+    )
+    penalty = max(0, int(settings.job_fair_share_penalty or 0))
+
+    def _score(r) -> float:
+        return float(r[4] or 0) - penalty * int(running_by_type.get(r[1], 0))
+
+    ranked = sorted(rows, key=lambda r: (-_score(r), int(r[0])))
+    return [(int(r[0]), str(r[1]), r[2], int(r[3] or 0)) for r in ranked]
+
+
+def _lease_until(now: datetime) -> datetime:
+    return now + timedelta(seconds=max(30, int(settings.job_lease_s or 300)))
+
+
+def claim_job(
+    session: Session,
+    *,
+    job_id: int,
+    slot: str,
+    limit: int,
+    owner: str,
+    log_path: str,
+) -> bool:
+    """Atomically move one queued job to running under a lease.
+
+    A single UPDATE ... WHERE status='queued' AND <slot has room> RETURNING, so
+    concurrent workers (threads or processes) can never claim the same job or
+    overfill a slot: SQLite serializes the writers.
+    """
+
+    now = datetime.utcnow()
+    r = aliased(Job)
+    running_in_slot = (
+        select(func.count())
+        .select_from(r)
+        .where(r.status == "running")
+        .where(job_slot_sql(r.job_type, r.payload_json) == slot)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id == job_id)
+        .where(Job.status == "queued")
+        .where(running_in_slot < int(limit))
+        .values(
+            status="running",
+            lease_owner=owner,
+            lease_expires_at=_lease_until(now),
+            attempts=Job.attempts + 1,
+            log_path=log_path,
+            started_at=now,
+            updated_at=now,
+            # A reclaimed job starts counting again.
+            items_total=None,
+            items_done=0,
+            items_failed=0,
+            current_item=None,
+            progress_at=None,
+            **{c: None for c in USAGE_COLUMNS},
+        )
+        .returning(Job.id)
+    )
+    got = session.execute(stmt).first()
+    session.commit()
+    return got is not None
+
+
+def renew_lease(session: Session, *, job_id: int, owner: str) -> bool:
+    """Heartbeat: extend the lease. False means the lease was lost (job reclaimed)."""
+
+    now = datetime.utcnow()
+    res = session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .where(Job.status == "running")
+        .where(Job.lease_owner == owner)
+        .values(lease_expires_at=_lease_until(now), updated_at=now)
+    )
+    session.commit()
+    return int(res.rowcount or 0) > 0
+
+
+def finish_job(session: Session, *, job_id: int, owner: str, status: str, error: str | None = None) -> bool:
+    """Record the outcome, but only if this worker still holds the lease."""
+
+    now = datetime.utcnow()
+    res = session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .where(Job.status == "running")
+        .where(Job.lease_owner == owner)
+        .values(
+            status=status,
+            error=error,
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=now,
+            updated_at=now,
+        )
+    )
+    session.commit()
+    return int(res.rowcount or 0) > 0
+
+
+USAGE_COLUMNS = ("wall_s", "cpu_user_s", "cpu_sys_s", "max_rss_mb", "io_read_blocks", "io_write_blocks")
+
+
+def record_job_usage(session: Session, *, job_id: int, usage: dict[str, Any]) -> None:
+    """Store the resource usage of a job's latest run (see ResourceUsage.columns())."""
+
+    values = {k: usage.get(k) for k in USAGE_COLUMNS}
+    session.execute(update(Job).where(Job.id == job_id).values(**values))
+    session.commit()
+
+
+def job_usage_by_type(session: Session, *, days: int = 7) -> dict[str, dict[str, Any]]:
+    """Per job type resource usage of runs finished in the last `days` days: run count,
+    wall time (avg/max), CPU seconds (avg), peak RSS of child processes (avg/max) and
+    block I/O (totals). Used to size slots and spot memory regressions."""
+
+    since = datetime.utcnow() - timedelta(days=max(1, int(days)))
+    cpu = func.coalesce(Job.cpu_user_s, 0.0) + func.coalesce(Job.cpu_sys_s, 0.0)
+    rows = session.exec(
+        select(
+            Job.job_type,
+            func.count(),
+            func.avg(Job.wall_s),
+            func.max(Job.wall_s),
+            func.avg(cpu),
+            func.avg(Job.max_rss_mb),
+            func.max(Job.max_rss_mb),
+            func.sum(Job.io_read_blocks),
+            func.sum(Job.io_write_blocks),
+        )
+        .where(Job.finished_at >= since)
+        .where(Job.wall_s.is_not(None))
+        .group_by(Job.job_type)
+    ).all()
+
+    def _r(v, nd: int = 1):
+        return round(float(v), nd) if v is not None else None
+
+    return {
+        str(jt): {
+            "runs": int(n or 0),
+            "wall_avg_s": _r(wall_avg),
+            "wall_max_s": _r(wall_max),
+            "cpu_avg_s": _r(cpu_avg),
+            "rss_avg_mb": _r(rss_avg),
+            "rss_max_mb": _r(rss_max),
+            "io_read_blocks": int(io_r or 0),
+            "io_write_blocks": int(io_w or 0),
+        }
+        for jt, n, wall_avg, wall_max, cpu_avg, rss_avg, rss_max, io_r, io_w in rows
+    }
+
+
+def retry_job(session: Session, *, job_id: int, owner: str, error: str, not_before: datetime) -> bool:
+    """Requeue a failed run for another attempt at `not_before` (only if this worker
+    still holds the lease, as in finish_job). Counted in `jobs.retries`, apart from
+    the claims that lease reclaims are limited by."""
+
+    now = datetime.utcnow()
+    res = session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .where(Job.status == "running")
+        .where(Job.lease_owner == owner)
+        .values(
+            status="queued",
+            error=error,
+            not_before=not_before,
+            retries=Job.retries + 1,
+            lease_owner=None,
+            lease_expires_at=None,
+            updated_at=now,
+        )
+    )
+    session.commit()
+    return int(res.rowcount or 0) > 0
+
+
+def reclaim_expired_jobs(session: Session) -> dict[str, int]:
+    """Requeue running jobs whose lease expired (worker crashed); fail them after N attempts.
+
+    Jobs that were asked to cancel are recorded as canceled instead."""
+
+    now = datetime.utcnow()
+    max_attempts = max(1, int(settings.job_lease_max_attempts or 3))
+    expired = [Job.status == "running", Job.lease_expires_at.is_not(None), Job.lease_expires_at < now]
+    note = func.coalesce(Job.error + "\n", "") + "lease expired (owner=" + func.coalesce(Job.lease_owner, "?") + ")"
+
+    canceled = session.execute(
+        update(Job)
+        .where(*expired)
+        .where(Job.cancel_requested_at.is_not(None))
+        .values(
+            status="canceled",
+            error=note,
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=now,
+            updated_at=now,
+        )
+    ).rowcount
+    # Runs started by retry_job are the retry policy's budget, not the lease's.
+    requeued = session.execute(
+        update(Job)
+        .where(*expired)
+        .where(Job.attempts - Job.retries < max_attempts)
+        .values(status="queued", error=note, lease_owner=None, lease_expires_at=None, updated_at=now)
+    ).rowcount
+    failed = session.execute(
+        update(Job)
+        .where(*expired)
+        .values(
+            status="failed",
+            error=note + "; giving up after " + str(max_attempts) + " attempts",
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=now,
+            updated_at=now,
+        )
+    ).rowcount
+    session.commit()
+    return {"requeued": int(requeued or 0), "failed": int(failed or 0), "canceled": int(canceled or 0)}
+
+
+def cancel_blocked_jobs(session: Session) -> int:
+    """Cancel queued jobs whose upstream dependency failed or was canceled; repeated
+    until nothing changes, so the cancellation propagates down the whole DAG."""
+
+    now = datetime.utcnow()
+    dead = ("failed", "canceled")
+    up = aliased(Job)
+    first_dead = (
+        select(func.min(up.id))
+        .select_from(JobDependency)
+        .join(up, up.id == JobDependency.depends_on_id)
+        .where(JobDependency.job_id == Job.id)
+        .where(up.status.in_(dead))
+        .scalar_subquery()
+    )
+    total = 0
+    while True:
+        n = session.execute(
+            update(Job)
+            .where(Job.status == "queued")
+            .where(_unmet_dependency(Job.id, statuses=dead))
+            .values(
+                status="canceled",
+                error="upstream job " + cast(first_dead, String) + " did not succeed",
+                finished_at=now,
+                updated_at=now,
+            )
+        ).rowcount
+        session.commit()
+        if not n:
+            return total
+        total += int(n)
+
+
+def job_dependencies(session: Session, job_ids: list[int]) -> dict[int, list[int]]:
+    """{job_id: [upstream job ids]} for the given jobs (jobs without edges omitted)."""
+
+    if not job_ids:
+        return {}
+    out: dict[int, list[int]] = {}
+    rows = session.exec(
+        select(JobDependency.job_id, JobDependency.depends_on_id)
+        .where(JobDependency.job_id.in_(job_ids))
+        .order_by(JobDependency.depends_on_id.asc())
+    ).all()
+    for jid, dep in rows:
+        out.setdefault(int(jid), []).append(int(dep))
+    return out
+
+
+def request_cancel(session: Session, job_id: int) -> str | None:
+    """Cancel a job: queued jobs are canceled at once, running ones are flagged for
+    their worker to stop. Returns "canceled", "cancel_requested" or None (not active)."""
+
+    now = datetime.utcnow()
+    res = session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .where(Job.status == "queued")
+        .values(status="canceled", error="canceled by admin", cancel_requested_at=now, finished_at=now, updated_at=now)
+    )
+    if int(res.rowcount or 0) > 0:
+        session.commit()
+        return "canceled"
+
+    res = session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .where(Job.status == "running")
+        .values(cancel_requested_at=func.coalesce(Job.cancel_requested_at, now), updated_at=now)
+    )
+    session.commit()
+    return "cancel_requested" if int(res.rowcount or 0) > 0 else None
+
+
+def cancel_requested(session: Session, job_id: int) -> bool:
+    return session.exec(select(Job.cancel_requested_at).where(Job.id == job_id)).first() is not None
+
+
+def _payload_ids(v: Any) -> list[str] | None:
+    """external_ids as the handlers accept them (list or comma/newline string)."""
+
+    if isinstance(v, str):
+        v = v.replace("\n", ",").split(",")
+    if not isinstance(v, list):
+        return None
+    out: list[str] = []
+    for x in v:
+        s = str(x).strip()
+        if s and s not in out:
+            out.append(s)
+    return out or None
+
+
+def job_scope(payload: dict[str, Any] | None) -> tuple[str, list[str] | None]:
+    """Split a payload into (normalised non-id options, external_ids).
+
+    Two jobs of the same type with equal options do the same work, except that
+    external_id scopes can be unioned.
+    """
+
+    rest: dict[str, Any] = {}
+    for k, v in (payload or {}).items():
+        if k == "external_ids" or v is None or v == "" or v == []:
+            continue
+        if k in {"lang", "stage", "day", "provider"} and isinstance(v, str):
+            v = v.strip().lower() if k != "day" else v.strip()
+        rest[k] = v
+    return json.dumps(rest, sort_keys=True, ensure_ascii=False), _payload_ids((payload or {}).get("external_ids"))
+
+
+def _coalesce_into_queued(
+    session: Session,
+    *,
+    job_type: str,
+    payload: dict[str, Any],
+    priority: int,
+    not_before: datetime | None,
+) -> Job | None:
+    """Merge into an equivalent queued job (same type + options; external_ids unioned;
+    the earlier of the two not_before times wins). Jobs waiting on dependencies are
+    left alone: merging into them would delay our work behind their upstream."""
+
+    key, ids = job_scope(payload)
+    queued = session.exec(
+        select(Job)
+        .where(Job.job_type == job_type)
+        .where(Job.status == "queued")
+        .where(~exists(select(JobDependency.job_id).where(JobDependency.job_id == Job.id)))
+        .order_by(Job.id.asc())
+    ).all()
+
+    for j in queued:
+        try:
+            other = json.loads(j.payload_json or "{}") or {}
+        except Exception:
+            continue
+        okey, oids = job_scope(other if isinstance(other, dict) else {})
+        if okey != key or (ids is None) != (oids is None):
+            continue
+
+        values: dict[str, Any] = {"updated_at": datetime.utcnow()}
+        if ids is not None:
+            merged = list(oids or [])
+            merged += [x for x in ids if x not in merged]
+            if merged != oids:
+                values["payload_json"] = json.dumps({**other, "external_ids": merged}, ensure_ascii=False)
+        if priority > int(j.priority or 0):
+            values["priority"] = priority
+        if j.not_before is not None and (not_before is None or not_before < j.not_before):
+            values["not_before"] = not_before
+
+        # Only while still queued: a worker may have claimed it in the meantime.
+        res = session.execute(update(Job).where(Job.id == j.id).where(Job.status == "queued").values(**values))
+        session.commit()
+        if int(res.rowcount or 0) > 0:
+            session.refresh(j)
+            return j
+
+    return None
+
+
+def drop_scheduled_jobs(session: Session, *, job_type: str, payload: dict[str, Any], reason: str) -> int:
+    """Cancel still-queued, delayed (`not_before`) jobs equivalent to `payload`, i.e.
+    scheduled retries whose work is no longer needed. Returns how many were dropped."""
+
+    key, ids = job_scope(payload)
+    queued = session.exec(
+        select(Job.id, Job.payload_json)
+        .where(Job.job_type == job_type)
+        .where(Job.status == "queued")
+        .where(Job.not_before.is_not(None))
+    ).all()
+
+    drop: list[int] = []
+    for jid, payload_json in queued:
+        try:
+            other = json.loads(payload_json or "{}") or {}
+        except Exception:
+            continue
+        okey, oids = job_scope(other if isinstance(other, dict) else {})
+        if okey == key and oids == ids:
+            drop.append(int(jid))
+    if not drop:
+        return 0
+
+    now = datetime.utcnow()
+    # Only while still queued: a worker may have claimed it in the meantime.
+    res = session.execute(
+        update(Job)
+        .where(Job.id.in_(drop))
+        .where(Job.status == "queued")
+        .values(status="canceled", error=reason, finished_at=now, updated_at=now)
+    )
+    session.commit()
+    return int(res.rowcount or 0)
+
+
+def enqueue_job_coalesced(
+    session: Session,
+    *,
+    job_type: str,
+    payload: dict[str, Any] | None = None,
+    priority: int | None = None,
+    coalesce: bool = True,
+    not_before: datetime | None = None,
+    depends_on: list[int] | None = None,
+) -> tuple[Job, bool]:
+    """Queue a job unless an equivalent one is already queued.
+
+    Returns (job, coalesced); when coalesced, `job` is the existing queued job (its
+    external_ids now include ours, priority raised to ours if higher).
+    `not_before` delays the job (scheduled retries). `depends_on` job ids must all
+    succeed before it is claimable; such jobs are never coalesced.
+    """
+
+    deps = sorted({int(x) for x in depends_on or []})
+    prio = int(priority) if priority is not None else default_priority(job_type)
+    if coalesce and not deps:
+        existing = _coalesce_into_queued(
+            session, job_type=job_type, payload=payload or {}, priority=prio, not_before=not_before
+        )
+        if existing:
+            return existing, True
+
     j = Job(
         job_type=job_type,
         status="queued",
+        priority=prio,
+        not_before=not_before,
         payload_json=json.dumps(payload or {}, ensure_ascii=False),
         updated_at=datetime.utcnow(),
     )
     session.add(j)
+    if deps:
+        # Same transaction as the job row: a worker must never see it without its edges.
+        session.flush()
+        session.execute(insert(JobDependency), [{"job_id": j.id, "depends_on_id": d} for d in deps])
     session.commit()
     session.refresh(j)
-    return j
+    return j, False
+
+
+def enqueue_job(
+    session: Session,
+    *,
+    job_type: str,
+    payload: dict[str, Any] | None = None,
+    priority: int | None = None,
+) -> Job:
+    return enqueue_job_coalesced(session, job_type=job_type, payload=payload, priority=priority)[0]
 
 
 def list_jobs(session: Session, *, limit: int = 50) -> list[Job]:
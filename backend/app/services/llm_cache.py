@@ -0,0 +1,208 @@
+"""Disk-backed cache of chat completion responses (LLM and VLM).
+
+Regen jobs, paper_retry_stage and reruns after a crash send the exact prompts they
+sent before. app.services.llm_client looks every request up here first, so an
+identical request costs no API call.
+
+- key: sha256 over the endpoint URL and the request payload (model, messages,
+  temperature, ...), with inline images (`data:` URLs) replaced by the sha256 of
+  their bytes
+- store: one SQLite file (LLM_CACHE_DB, WAL) shared by every process on the host
+- eviction: least recently used entries go once the stored responses exceed
+  LLM_CACHE_MAX_MB (down to 90% of it)
+- bypass: LLM_CACHE_BYPASS=1, or `fresh: true` in a regen job's payload (apply_fresh),
+  skips the lookup for a true regeneration; the fresh response replaces the cached one
+
+Hits, misses, bypasses and evictions are counted for /api/admin/status.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    model TEXT NOT NULL,
+    body TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+-- Covers the LRU scan and SUM(size) without reading response bodies.
+CREATE INDEX IF NOT EXISTS ix_responses_lru ON responses (last_used, size);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Eviction trims the store to this fraction of LLM_CACHE_MAX_MB.
+_EVICT_TO = 0.9
+_EVICT_BATCH = 200
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized: set[str] = set()
+
+
+def _db() -> sqlite3.Connection:
+    path = str(settings.llm_cache_db)
+    conn = getattr(_local, "conns", {}).get(path)
+    if conn is not None:
+        return conn
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    with _init_lock:
+        if path not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            _initialized.add(path)
+    if not hasattr(_local, "conns"):
+        _local.conns = {}
+    _local.conns[path] = conn
+    return conn
+
+
+def _count(conn: sqlite3.Connection, name: str, n: int = 1) -> None:
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, n),
+    )
+
+
+def _image_digest(url: str) -> str:
+    """`data:<mime>;base64,<bytes>` -> `sha256:<hex of the bytes>` (other URLs unchanged)."""
+
+    if not url.startswith("data:"):
+        return url
+    _, _, data = url.partition(",")
+    try:
+        raw = base64.b64decode(data, validate=False)
+    except (binascii.Error, ValueError):
+        raw = data.encode("utf-8")
+    return "sha256:" + hashlib.sha256(raw).hexdigest()
+
+
+def _canonical(v: Any) -> Any:
+    if isinstance(v, dict):
+        out = {k: _canonical(x) for k, x in v.items()}
+        img = out.get("image_url")
+        if isinstance(img, dict) and isinstance(img.get("url"), str):
+            out["image_url"] = {**img, "url": _image_digest(img["url"])}
+        return out
+    if isinstance(v, list):
+        return [_canonical(x) for x in v]
+    return v
+
+
+def cache_key(endpoint: str, payload: dict[str, Any]) -> str:
+    """Content address of a request: endpoint + payload, images by their sha256."""
+
+    doc = {"endpoint": endpoint, "payload": _canonical(payload)}
+    raw = json.dumps(doc, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> dict[str, Any] | None:
+    """The cached response for `key`, or None (miss, cache disabled or bypassed)."""
+
+    if not settings.llm_cache:
+        return None
+    try:
+        conn = _db()
+        if settings.llm_cache_bypass:
+            _count(conn, "bypassed")
+            return None
+        row = conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _count(conn, "misses")
+            return None
+        conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        _count(conn, "hits")
+        return json.loads(row[0])
+    except (sqlite3.Error, ValueError) as e:
+        print(f"WARN: llm cache lookup failed: {e}")
+        return None
+
+
+def put(key: str, *, endpoint: str, model: str, response: dict[str, Any]) -> None:
+    """Store (or replace) the response for `key`, then evict down to the size cap."""
+
+    if not settings.llm_cache:
+        return
+    body = json.dumps(response, ensure_ascii=False, separators=(",", ":"))
+    now = time.time()
+    try:
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, endpoint, model, body, size, created, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, endpoint, model or "", body, len(body.encode("utf-8")), now, now),
+        )
+        _evict(conn)
+    except sqlite3.Error as e:
+        print(f"WARN: llm cache store failed: {e}")
+
+
+def _evict(conn: sqlite3.Connection) -> None:
+    cap = int(float(settings.llm_cache_max_mb) * 1024 * 1024)
+    if cap <= 0:
+        return
+    (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+    if total <= cap:
+        return
+    target = int(cap * _EVICT_TO)
+    evicted = 0
+    while total > target:
+        rows = conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_used LIMIT ?", (_EVICT_BATCH,)
+        ).fetchall()
+        if not rows:
+            break
+        drop = []
+        for key, size in rows:
+            if total <= target:
+                break
+            drop.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", drop)
+        evicted += len(drop)
+    if evicted:
+        _count(conn, "evicted", evicted)
+
+
+def apply_fresh(job_type: str, payload: dict[str, Any]) -> None:
+    """`fresh: true` in a *_regen_scoped job's payload: a true regeneration, so skip
+    cache lookups for this job (its fresh responses replace the cached ones)."""
+
+    if job_type.endswith("_regen_scoped") and payload.get("fresh"):
+        settings.llm_cache_bypass = True
+
+
+def llm_cache_stats() -> dict[str, int]:
+    """Entries, stored bytes and hit/miss/bypass/eviction counters."""
+
+    if not os.path.exists(str(settings.llm_cache_db)):
+        return {}
+    conn = _db()
+    entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+    out = {"entries": int(entries), "bytes": int(size), "hits": 0, "misses": 0, "bypassed": 0, "evicted": 0}
+    for name, value in conn.execute("SELECT name, value FROM counters"):
+        out[name] = int(value)
+    return out
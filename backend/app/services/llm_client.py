@@ -0,0 +1,135 @@
+"""Shared HTTP client for the OpenAI-compatible endpoint (chat, vision, image plans).
+
+All LLM/VLM calls of a process go through one httpx.Client: connections are pooled
+and kept alive across calls and threads (ContextThreadPoolExecutor workers, stream
+stages, in-process jobs) instead of a TCP/TLS handshake per request, and HTTP/2
+multiplexes concurrent requests over one connection when `h2` is installed.
+
+Timeouts and pool limits: OPENAI_TIMEOUT_S, OPENAI_CONNECT_TIMEOUT_S,
+OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE, OPENAI_KEEPALIVE_EXPIRY_S, OPENAI_HTTP2.
+Responses are cached on disk by request content (app.services.llm_cache).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+from app.services import llm_cache
+from app.services.adaptive_concurrency import adaptive_call
+from app.services.rate_limiter import RateLimit
+
+
+_client: httpx.Client | None = None
+_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def openai_http() -> httpx.Client:
+    """The process-wide client (created on first use; thread-safe)."""
+
+    global _client
+    with _lock:
+        if _client is None:
+            http2 = bool(settings.openai_http2)
+            if http2 and not _http2_available():
+                print("WARN: OPENAI_HTTP2=1 but the h2 package is not installed -> HTTP/1.1")
+                http2 = False
+            _client = httpx.Client(
+                http2=http2,
+                timeout=httpx.Timeout(
+                    float(settings.openai_timeout_s), connect=float(settings.openai_connect_timeout_s)
+                ),
+                limits=httpx.Limits(
+                    max_connections=max(1, int(settings.openai_max_connections)),
+                    max_keepalive_connections=max(0, int(settings.openai_max_keepalive)),
+                    keepalive_expiry=float(settings.openai_keepalive_expiry_s),
+                ),
+                trust_env=False,
+            )
+        return _client
+
+
+def close_openai_http() -> None:
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def chat_completions(
+    payload: dict[str, Any], *, attempts: int = 3, kind: str = "llm", cache: bool = True
+) -> dict[str, Any]:
+    """POST /chat/completions and return the JSON body (retries transport/HTTP errors).
+
+    An identical earlier request is answered from app.services.llm_cache without a
+    call (`cache=False` skips the cache entirely). Rate limited per key
+    (app.services.rate_limiter, provider `openai`) and run under the adaptive
+    concurrency gate `kind` (`llm` or `vlm`).
+    """
+
+    url = settings.openai_base_url.rstrip("/") + "/chat/completions"
+    key = llm_cache.cache_key(url, payload) if cache and settings.llm_cache else None
+    if key:
+        hit = llm_cache.get(key)
+        if hit is not None:
+            return hit
+
+    headers = {"Authorization": f"Bearer {settings.openai_api_key}"}
+    for attempt in range(attempts):
+        try:
+            with adaptive_call(kind) as call, RateLimit("openai", settings.openai_api_key) as rl:
+                r = openai_http().post(url, headers=headers, json=payload)
+                if r.status_code == 429:
+                    rl.throttled(r.headers.get("retry-after"))
+                r.raise_for_status()
+                j = r.json()
+                # Latency is judged per generated token when the server reports usage.
+                usage = j.get("usage") if isinstance(j, dict) else None
+                call.per(usage.get("completion_tokens") if isinstance(usage, dict) else None, "token")
+            if key and _cacheable(j):
+                llm_cache.put(key, endpoint=url, model=str(payload.get("model") or ""), response=j)
+            return j
+        except Exception as e:
+            if attempt + 1 >= attempts:
+                raise
+            # After a 429 the next RateLimit() waits out the key's backoff.
+            if not (isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429):
+                time.sleep(1.5 * (attempt + 1))
+    raise AssertionError("unreachable")
+
+
+def _cacheable(j: dict[str, Any]) -> bool:
+    try:
+        return bool(completion_text(j))
+    except (ValueError, AttributeError, TypeError):
+        return False
+
+
+def completion_text(j: dict[str, Any]) -> str:
+    """Message text of a chat completion (tolerates compat servers' schemas)."""
+
+    choice0 = (j.get("choices") or [{}])[0] or {}
+
+    # Standard OpenAI schema
+    msg = choice0.get("message")
+    if isinstance(msg, dict) and isinstance(msg.get("content"), str):
+        return msg["content"].strip()
+
+    # Some compat servers return `text` on choices
+    if isinstance(choice0.get("text"), str):
+        return choice0["text"].strip()
+
+    raise ValueError(f"Unexpected LLM response schema: {list(j.keys())}")
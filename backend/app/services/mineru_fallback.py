@@ -4,6 +4,7 @@ import shutil
 from datetime import datetime
 from pathlib import Path
 
+from app.services.blob_store import link_file
 from app.services.mineru_runner import MineruResult
 
 
@@ -22,7 +23,8 @@ def merge_mineru_outputs(
 
     Behavior:
     - Overwrite dst markdown content with src markdown content.
-    - Optionally copy extracted images from src/images into dst/images (no deletions).
+    - Optionally link extracted images from src/images into dst/images (no deletions);
+      hardlinks/reflinks where the filesystem allows, so OCR images are not stored twice.
 
     Returns a small summary dict for logging.
     """
@@ -54,7 +56,7 @@ def merge_mineru_outputs(
             if out.exists():
                 continue
             try:
-                shutil.copy2(fp, out)
+                link_file(fp, out)
                 copied += 1
             except Exception:
                 continue
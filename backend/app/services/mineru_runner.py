@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import os
-import subprocess
 import sys
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
 
+from app.core.job_context import run_child
+
 
 @dataclass
 class MineruResult:
@@ -66,7 +67,7 @@ def run_mineru_pdf_to_md(
     # Avoid inheriting proxy envs etc.
     env = os.environ.copy()
 
-    subprocess.run(cmd, check=True, env=env)
+    run_child(cmd, check=True, env=env)
 
     stem = pdf_path.stem
     out_dir = out_root / stem / method
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Iterable
+
+from sqlalchemy import exists
+from sqlmodel import Session, select
+
+from app.models.paper import Paper
+from app.models.paper_content import PaperContent
+
+
+CONTENT_FIELDS = (
+    "content_explain_cn",
+    "content_explain_en",
+    "image_captions_json",
+    "image_captions_en_json",
+    "meta_json",
+)
+
+
+def explain_field(lang: str) -> str:
+    return "content_explain_en" if (lang or "").strip().lower() == "en" else "content_explain_cn"
+
+
+def captions_field(lang: str) -> str:
+    return "image_captions_en_json" if (lang or "").strip().lower() == "en" else "image_captions_json"
+
+
+def get_paper_content(session: Session, paper_id: int) -> PaperContent | None:
+    return session.get(PaperContent, paper_id)
+
+
+def load_paper_contents(session: Session, paper_ids: Iterable[int]) -> dict[int, PaperContent]:
+    """Batch-load content rows (avoid N+1 when iterating papers)."""
+
+    ids = sorted({int(x) for x in paper_ids})
+    if not ids:
+        return {}
+    rows = session.exec(select(PaperContent).where(PaperContent.paper_id.in_(ids))).all()
+    return {int(r.paper_id): r for r in rows}
+
+
+def set_paper_content(session: Session, paper_id: int, **fields: Any) -> PaperContent:
+    """Create/update the content row for a paper. Caller commits.
+
+    Empty strings are stored as NULL so "has output" checks stay `IS NOT NULL`
+    (header-only) and never need to read the text itself.
+    """
+
+    unknown = set(fields) - set(CONTENT_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown paper_content fields: {sorted(unknown)}")
+
+    c = session.get(PaperContent, paper_id)
+    if not c:
+        c = PaperContent(paper_id=paper_id)
+    for k, v in fields.items():
+        setattr(c, k, v if v != "" else None)
+    c.updated_at = datetime.utcnow()
+    session.add(c)
+    return c
+
+
+def content_value(c: PaperContent | None, field: str) -> str | None:
+    return getattr(c, field, None) if c else None
+
+
+def content_json(c: PaperContent | None, field: str) -> dict:
+    """Parse a JSON object column (captions/meta); {} when missing or malformed."""
+
+    raw = content_value(c, field)
+    if not raw:
+        return {}
+    try:
+        obj = json.loads(raw) or {}
+    except Exception:
+        return {}
+    return obj if isinstance(obj, dict) else {}
+
+
+def content_present(field: str, paper_id_col=Paper.id):
+    """EXISTS clause: paper has a non-NULL paper_content.<field>.
+
+    Usage: select(Paper).where(~content_present("content_explain_en"))  # missing
+    """
+
+    col = getattr(PaperContent, field)
+    return exists(
+        select(PaperContent.paper_id)
+        .where(PaperContent.paper_id == paper_id_col)
+        .where(col.is_not(None))
+    )
@@ -1,13 +1,79 @@
 from __future__ import annotations
 
 import json
-import os
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable
 
-from sqlmodel import Session
+from sqlalchemy import delete, exists, func
+from sqlmodel import Session, select
 
+from app.core.config import settings
+from app.core.job_context import current_log_path
+from app.models.paper import Paper
 from app.models.paper_event import PaperEvent
+from app.models.paper_stage_state import PaperStageState
+from app.services.job_queue import PRIORITY_DEFAULT, drop_scheduled_jobs, enqueue_job_coalesced
+from app.services.retry_policy import STAGE_RETRY_POLICIES, classify_error, retry_at, stage_policy
+
+
+# Stages that exist per content language. Event stage names encode the language
+# as a suffix ("explain" = zh, "explain_en" = en).
+LANG_STAGES = {"explain", "caption", "paper_images", "one_liner"}
+
+TERMINAL_STATUSES = {"success", "failed", "skipped"}
+
+
+def split_stage(stage: str) -> tuple[str, str]:
+    """Map an event stage name to (base_stage, lang).
+
+    - explain -> (explain, zh), explain_en -> (explain, en)
+    - pdf -> (pdf, "")
+    """
+
+    s = (stage or "").strip()
+    if s.endswith("_en") and s[:-3] in LANG_STAGES:
+        return s[:-3], "en"
+    if s in LANG_STAGES:
+        return s, "zh"
+    return s, ""
+
+
+def _upsert_stage_state(
+    session: Session,
+    *,
+    paper_id: int,
+    stage: str,
+    status: str,
+    error: str | None,
+    at: datetime,
+) -> PaperStageState:
+    base, lang = split_stage(stage)
+
+    st = session.exec(
+        select(PaperStageState)
+        .where(PaperStageState.paper_id == paper_id)
+        .where(PaperStageState.stage == base)
+        .where(PaperStageState.lang == lang)
+    ).first()
+    if not st:
+        st = PaperStageState(paper_id=paper_id, stage=base, lang=lang, status=status, attempts=0)
+
+    if status == "started":
+        st.attempts = int(st.attempts or 0) + 1
+        st.started_at = at
+        st.duration_s = None
+        st.last_error = None
+    elif status in TERMINAL_STATUSES:
+        if st.status == "started" and st.started_at:
+            st.duration_s = max(0.0, (at - st.started_at).total_seconds())
+        st.last_error = error if status in {"failed", "skipped"} else None
+
+    if status == "success":
+        st.succeeded_at = at
+    st.status = status
+    st.updated_at = at
+    session.add(st)
+    return st
 
 
 def record_paper_event(
@@ -19,20 +85,175 @@ def record_paper_event(
     error: str | None = None,
     meta: dict[str, Any] | None = None,
     log_path: str | None = None,
+    commit: bool = True,
 ) -> PaperEvent:
+    """Append a history row and update the paper's current stage state.
+
+    `commit=False` leaves both in the session so a caller can write many events in
+    one transaction (no auto-retry scheduling then; failures should be committed).
+
+    A committed failure schedules a stage retry when the policy covers it; a later
+    success of the same stage (e.g. the next caption of a paper after one failed)
+    drops that retry again while it is still waiting.
+    """
+
     if not log_path:
-        log_path = (os.getenv("PAPERTOK_LOG_PATH") or "").strip() or None
+        log_path = current_log_path()
+
+    now = datetime.utcnow()
+    err = error[:2000] if isinstance(error, str) else None
 
     e = PaperEvent(
         paper_id=paper_id,
         stage=str(stage),
         status=str(status),
-        error=(error[:2000] if isinstance(error, str) else None),
+        error=err,
         meta_json=(json.dumps(meta, ensure_ascii=False) if isinstance(meta, dict) else None),
         log_path=log_path,
-        created_at=datetime.utcnow(),
+        created_at=now,
     )
     session.add(e)
+
+    # Keep the current-state row in the same transaction as the history row.
+    st = _upsert_stage_state(session, paper_id=paper_id, stage=str(stage), status=str(status), error=err, at=now)
+    if not commit:
+        return e
+
     session.commit()
     session.refresh(e)
+
+    if status == "failed" and settings.job_auto_retry:
+        try:
+            _schedule_stage_retry(session, paper_id=paper_id, stage=str(stage), error=err, attempts=int(st.attempts or 0))
+        except Exception as ex:
+            session.rollback()
+            print(f"WARN: scheduling retry for paper={paper_id} stage={stage} failed: {ex}")
+    elif status == "success" and settings.job_auto_retry:
+        try:
+            _drop_stage_retry(session, paper_id=paper_id, stage=str(stage))
+        except Exception as ex:
+            session.rollback()
+            print(f"WARN: dropping retry for paper={paper_id} stage={stage} failed: {ex}")
     return e
+
+
+def _stage_retry_payload(session: Session, *, paper_id: int, stage: str) -> dict[str, Any] | None:
+    """paper_retry_stage payload for an event stage name (None: paper gone)."""
+
+    base, lang = split_stage(stage)
+    external_id = session.exec(select(Paper.external_id).where(Paper.id == paper_id)).first()
+    if not external_id:
+        return None
+    payload: dict[str, Any] = {"external_id": str(external_id), "stage": base}
+    if lang:
+        payload["lang"] = lang
+    return payload
+
+
+def _schedule_stage_retry(session: Session, *, paper_id: int, stage: str, error: str | None, attempts: int) -> None:
+    """Queue a delayed paper_retry_stage job when the stage's retry policy covers the error."""
+
+    base, _ = split_stage(stage)
+    policy = stage_policy(base)
+    cls = classify_error(error)
+    if not policy.should_retry(max(1, attempts), cls):
+        return
+
+    payload = _stage_retry_payload(session, paper_id=paper_id, stage=stage)
+    if not payload:
+        return
+
+    at = retry_at(policy, max(1, attempts))
+    # Background work: does not take the interactive reserved slot like a manual retry.
+    enqueue_job_coalesced(
+        session, job_type="paper_retry_stage", payload=payload, priority=PRIORITY_DEFAULT, not_before=at
+    )
+    print(f"STAGE_RETRY_SCHEDULED: {payload['external_id']} stage={stage} ({cls}) attempt={attempts + 1} at={at.isoformat(timespec='seconds')}")
+
+
+def _drop_stage_retry(session: Session, *, paper_id: int, stage: str) -> None:
+    """Cancel a scheduled paper_retry_stage for a stage that has since succeeded."""
+
+    base, _ = split_stage(stage)
+    if base not in STAGE_RETRY_POLICIES:
+        return
+    payload = _stage_retry_payload(session, paper_id=paper_id, stage=stage)
+    if not payload:
+        return
+    n = drop_scheduled_jobs(
+        session, job_type="paper_retry_stage", payload=payload, reason="superseded: stage succeeded"
+    )
+    if n:
+        print(f"STAGE_RETRY_DROPPED: {payload['external_id']} stage={stage} (succeeded)")
+
+
+def get_stage_state(session: Session, *, paper_id: int, stage: str) -> PaperStageState | None:
+    """Point lookup by event stage name (e.g. "caption_en")."""
+
+    base, lang = split_stage(stage)
+    return session.exec(
+        select(PaperStageState)
+        .where(PaperStageState.paper_id == paper_id)
+        .where(PaperStageState.stage == base)
+        .where(PaperStageState.lang == lang)
+    ).first()
+
+
+def stage_succeeded(paper_id_col, *, stage: str, lang: str = ""):
+    """EXISTS clause: (stage, lang) has succeeded for the paper at some point.
+
+    Reads the sticky `succeeded_at`, so a later started/failed/skipped event (a rerun
+    in flight or failing) does not hide output that is already stored. Regen jobs
+    wipe the output together with the state row, which clears it.
+
+    Usage: select(Paper.id).where(stage_succeeded(Paper.id, stage="explain", lang="en"))
+    """
+
+    return exists(
+        select(PaperStageState.id)
+        .where(PaperStageState.paper_id == paper_id_col)
+        .where(PaperStageState.stage == stage)
+        .where(PaperStageState.lang == lang)
+        .where(PaperStageState.succeeded_at.is_not(None))
+    )
+
+
+def stage_status_counts(session: Session) -> dict[str, dict[str, dict[str, int]]]:
+    """Return {stage: {lang: {status: n}}} over current states."""
+
+    rows = session.exec(
+        select(PaperStageState.stage, PaperStageState.lang, PaperStageState.status, func.count(PaperStageState.id))
+        .group_by(PaperStageState.stage, PaperStageState.lang, PaperStageState.status)
+    ).all()
+
+    out: dict[str, dict[str, dict[str, int]]] = {}
+    for stage, lang, status, n in rows:
+        out.setdefault(stage, {}).setdefault(lang or "", {})[status] = int(n or 0)
+    return out
+
+
+def reset_stage_state(
+    session: Session,
+    *,
+    paper_ids: Iterable[int],
+    stage: str,
+    langs: Iterable[str],
+) -> int:
+    """Drop current-state rows for papers whose stage output was wiped (regen jobs)."""
+
+    ids = [int(x) for x in paper_ids]
+    langs0 = [x for x in langs if x]
+    if not ids or not langs0:
+        return 0
+
+    r = session.exec(  # type: ignore[call-overload]
+        delete(PaperStageState)
+        .where(PaperStageState.paper_id.in_(ids))
+        .where(PaperStageState.stage == stage)
+        .where(PaperStageState.lang.in_(langs0))
+    )
+    session.commit()
+    try:
+        return int(getattr(r, "rowcount", 0) or 0)
+    except Exception:
+        return 0
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Iterable
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+
+from app.models.paper import Paper
+from app.models.paper_content import PaperContent
+
+
+HF_SOURCE = "hf_daily"
+
+# Rows per INSERT statement (keeps bound parameters well under SQLite limits).
+_CHUNK = 200
+
+
+def hf_item_fields(item: dict[str, Any]) -> dict[str, Any]:
+    """Map one HF daily_papers item to `papers` columns.
+
+    The HF object shape may evolve; the raw item is stored in paper_content.meta_json too.
+    """
+
+    paper_obj = item.get("paper", {}) or {}
+
+    title = paper_obj.get("title") or item.get("title") or ""
+    external_id = paper_obj.get("id") or item.get("id") or title
+
+    # Prefer HF paper page; fall back to arXiv abs
+    url = item.get("url") or paper_obj.get("url")
+    if not url and external_id:
+        url = f"https://huggingface.co/papers/{external_id}"
+
+    thumbnail_url = item.get("thumbnail") or paper_obj.get("thumbnail")
+
+    return {
+        "external_id": str(external_id),
+        "title": title,
+        "url": url,
+        "thumbnail_url": thumbnail_url,
+    }
+
+
+def bulk_upsert_hf_papers(
+    session: Session,
+    days: Iterable[tuple[str | None, list[dict[str, Any]]]],
+) -> dict[str, int]:
+    """Upsert HF daily payloads (one or many days) with a few multi-row statements.
+
+    `days` is [(day, items), ...] in ingest order; when an external_id shows up more
+    than once the last occurrence wins, same as upserting the items one by one.
+    Existing rows keep their title/url/thumbnail when the new payload lacks them.
+
+    Returns {external_id: paper_id}. Caller commits (one transaction for the batch).
+    """
+
+    now = datetime.utcnow()
+    rows: dict[str, dict[str, Any]] = {}
+    metas: dict[str, str] = {}
+    for day, items in days:
+        for item in items or []:
+            f = hf_item_fields(item)
+            ext = f["external_id"]
+            prev = rows.pop(ext, None)  # re-insert so dict order follows the last occurrence
+            row = {**f, "source": HF_SOURCE, "day": day, "created_at": now, "updated_at": now}
+            if prev:
+                for k in ("title", "url", "thumbnail_url", "day"):
+                    row[k] = row[k] or prev[k]
+            rows[ext] = row
+            metas[ext] = json.dumps(item, ensure_ascii=False)
+
+    ids: dict[str, int] = {}
+    values = list(rows.values())
+    for i in range(0, len(values), _CHUNK):
+        stmt = sqlite_insert(Paper).values(values[i : i + _CHUNK])
+        ex = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Paper.source, Paper.external_id],
+            set_={
+                "title": func.coalesce(func.nullif(ex.title, ""), Paper.title),
+                "url": func.coalesce(ex.url, Paper.url),
+                "thumbnail_url": func.coalesce(ex.thumbnail_url, Paper.thumbnail_url),
+                "day": func.coalesce(ex.day, Paper.day),
+                "updated_at": ex.updated_at,
+            },
+        ).returning(Paper.external_id, Paper.id)
+        for ext, pid in session.execute(stmt).all():
+            ids[str(ext)] = int(pid)
+
+    content = [{"paper_id": ids[ext], "meta_json": meta, "updated_at": now} for ext, meta in metas.items()]
+    for i in range(0, len(content), _CHUNK):
+        stmt = sqlite_insert(PaperContent).values(content[i : i + _CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PaperContent.paper_id],
+            set_={"meta_json": stmt.excluded.meta_json, "updated_at": stmt.excluded.updated_at},
+        )
+        session.execute(stmt)
+
+    return ids
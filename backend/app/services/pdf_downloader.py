@@ -0,0 +1,210 @@
+"""arXiv PDF downloads: pooled, per-host limited, resumable and validated.
+
+- one process-wide httpx.Client (connection pool + keep-alive) for all downloads
+- at most PDF_DOWNLOAD_PER_HOST concurrent transfers per host, however many
+  threads download (daily_run stream workers, paper_retry jobs in the worker)
+- bytes go to `<name>.pdf.part`; an interrupted transfer resumes with a Range
+  request, and the file is renamed into place only once it looks like a whole PDF
+  (`%PDF-` header, `%%EOF` trailer)
+- PDFs already on disk without a recorded sha256 (downloaded before hashes were
+  kept) are hashed in a background thread, backfilled into papers.pdf_sha256 and
+  adopted into the blob store
+
+ARXIV_PDF_BASE_URL points the downloader at a mirror or a local stand-in.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+
+_HEAD_BYTES = 5
+_TAIL_BYTES = 2048
+_HASH_CHUNK = 1 << 20
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+_host_slots: dict[str, threading.BoundedSemaphore] = {}
+_hasher: ThreadPoolExecutor | None = None
+_hashing: set[str] = set()
+
+
+class InvalidPdf(ValueError):
+    """The downloaded bytes are not a complete PDF."""
+
+
+def _safe_filename(s: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", s)
+
+
+def arxiv_pdf_url(arxiv_id: str) -> str:
+    # supports 2602.04705, 2602.04705v2, cs/0601001
+    base = (settings.arxiv_pdf_base_url or "https://arxiv.org/pdf").rstrip("/")
+    return f"{base}/{arxiv_id}.pdf"
+
+
+def pdf_path_for(arxiv_id: str) -> str:
+    return os.path.join(settings.papers_pdf_dir, _safe_filename(arxiv_id) + ".pdf")
+
+
+def _http() -> httpx.Client:
+    global _client
+    with _client_lock:
+        if _client is None:
+            n = max(1, int(settings.pdf_download_per_host)) * 4
+            _client = httpx.Client(
+                timeout=httpx.Timeout(float(settings.pdf_download_timeout_s), connect=15.0),
+                limits=httpx.Limits(max_connections=n, max_keepalive_connections=n),
+                follow_redirects=True,
+                trust_env=False,
+            )
+        return _client
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc.lower()
+    with _client_lock:
+        sem = _host_slots.get(host)
+        if sem is None:
+            sem = _host_slots[host] = threading.BoundedSemaphore(max(1, int(settings.pdf_download_per_host)))
+        return sem
+
+
+def looks_like_pdf(path: str | Path) -> bool:
+    """`%PDF-` header and a `%%EOF` marker near the end (catches truncated files and
+    HTML error pages saved as .pdf)."""
+
+    try:
+        with open(path, "rb") as f:
+            if f.read(_HEAD_BYTES) != b"%PDF-":
+                return False
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - _TAIL_BYTES))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+
+def file_sha256(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _backfill_sha256(path: str, arxiv_id: str) -> None:
+    from sqlmodel import Session, select
+
+    from app.db.engine import engine
+    from app.models.paper import Paper
+
+    try:
+        with Session(engine) as session:
+            rows = session.exec(
+                select(Paper)
+                .where(Paper.external_id == arxiv_id)
+                .where(Paper.pdf_sha256.is_(None))
+            ).all()
+            if not rows:
+                # Already recorded (e.g. by another process): no need to read the file.
+                return
+            sha = file_sha256(path)
+            for p in rows:
+                p.pdf_sha256 = sha
+                session.add(p)
+            session.commit()
+            from app.services import blob_store
+
+            blob_store.put_file(session, path, kind="pdf", sha256=sha)
+    except Exception as e:
+        print(f"WARN: pdf sha256 backfill failed for {path}: {e}")
+    finally:
+        with _client_lock:
+            _hashing.discard(path)
+
+
+def hash_in_background(path: str, arxiv_id: str) -> None:
+    """Queue a sha256 backfill of an existing PDF (one hashing thread per process)."""
+
+    global _hasher
+    with _client_lock:
+        if path in _hashing:
+            return
+        _hashing.add(path)
+        if _hasher is None:
+            _hasher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-sha256")
+    _hasher.submit(_backfill_sha256, path, arxiv_id)
+
+
+def _fetch(url: str, part: Path) -> None:
+    """Append the rest of `url` to `part`, resuming from its current size."""
+
+    have = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={have}-"} if have else {}
+    with _host_slot(url), _http().stream("GET", url, headers=headers) as r:
+        if r.status_code == 416 and have:
+            # The part already holds the whole file.
+            return
+        r.raise_for_status()
+        mode = "ab" if have and r.status_code == 206 else "wb"
+        with open(part, mode) as f:
+            for chunk in r.iter_bytes():
+                if chunk:
+                    f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def download_pdf(arxiv_id: str, *, known_sha256: str | None = None) -> tuple[str, str, str]:
+    """Download an arXiv PDF; return (pdf_url, pdf_path, sha256).
+
+    sha256 is "" for a file that was already on disk. Unless the caller already has
+    its hash (`known_sha256`, i.e. papers.pdf_sha256), it is hashed in the background
+    and written to papers.pdf_sha256 instead of delaying the caller.
+    """
+
+    os.makedirs(settings.papers_pdf_dir, exist_ok=True)
+    pdf_url = arxiv_pdf_url(arxiv_id)
+    pdf_path = pdf_path_for(arxiv_id)
+    part = Path(pdf_path + ".part")
+
+    if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
+        if looks_like_pdf(pdf_path):
+            if not known_sha256:
+                hash_in_background(pdf_path, arxiv_id)
+            return pdf_url, pdf_path, ""
+        # Truncated by an old non-atomic download: continue it from where it stopped.
+        print(f"WARN: {pdf_path} is not a complete PDF -> resuming download")
+        os.replace(pdf_path, part)
+
+    attempts = max(1, int(settings.pdf_download_attempts))
+    for attempt in range(1, attempts + 1):
+        try:
+            _fetch(pdf_url, part)
+            break
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code in {429, 500, 502, 503, 504}
+            if attempt >= attempts or not retryable:
+                raise
+            print(f"WARN: pdf download {arxiv_id} attempt {attempt} failed ({e}); resuming")
+            time.sleep(min(30.0, 2.0**attempt))
+
+    if not looks_like_pdf(part):
+        part.unlink(missing_ok=True)
+        raise InvalidPdf(f"downloaded file for {arxiv_id} is not a complete PDF")
+
+    sha = file_sha256(part)
+    os.replace(part, pdf_path)
+    return pdf_url, pdf_path, sha
@@ -0,0 +1,268 @@
+"""Per provider/key rate limiting shared by every process on the host.
+
+Each (provider, API key) pair has a token bucket (requests per minute, with a burst
+of one minute's worth) and a concurrency cap, configured by RATE_LIMITS, e.g.
+`openai=120/8,seedream=30/2,glm=30/2` (rpm/concurrency; 0 = no limit). State lives
+in a small SQLite file (RATE_LIMIT_DB) updated under BEGIN IMMEDIATE, so the API
+server, the job worker, in-process jobs and daily_run all draw from the same
+buckets. A concurrency slot is a lease row that expires, so a crashed process
+cannot hold slots forever.
+
+A 429 from the provider penalises the key (Retry-After, else an exponential backoff
+per consecutive 429) instead of a fixed sleep in the client; callers move on to the
+next key or simply wait in acquire(). Waiting time is logged and accumulated per
+key (`rate_limit_stats()`, shown in /api/admin/status) and per thread
+(`thread_wait_s()`, so callers can time a request without the wait).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.job_context import check_canceled
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    penalty_until REAL NOT NULL DEFAULT 0,
+    strikes INTEGER NOT NULL DEFAULT 0,
+    acquired INTEGER NOT NULL DEFAULT 0,
+    throttled INTEGER NOT NULL DEFAULT 0,
+    wait_s REAL NOT NULL DEFAULT 0,
+    max_wait_s REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS leases (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_leases_key ON leases (key);
+CREATE TABLE IF NOT EXISTS adaptive (
+    name TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    lim REAL NOT NULL,
+    inflight INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    overloads INTEGER NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (name, pid)
+);
+"""
+
+# A slot is given back after this long even if its holder never released it.
+LEASE_S = 900.0
+# Longest single sleep while waiting (re-checks cancellation and other processes).
+_POLL_MAX_S = 1.0
+# Waits at least this long are logged.
+_LOG_WAIT_S = 1.0
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized: set[str] = set()
+
+
+def rate_limits() -> dict[str, tuple[float, int]]:
+    """Parse RATE_LIMITS into {provider: (requests per minute, max concurrent)}."""
+
+    out: dict[str, tuple[float, int]] = {}
+    for part in (settings.rate_limits or "").split(","):
+        name, _, spec = part.partition("=")
+        name = name.strip().lower()
+        if not name:
+            continue
+        rpm, _, conc = spec.partition("/")
+        try:
+            out[name] = (max(0.0, float(rpm or 0)), max(0, int(conc or 0)))
+        except ValueError:
+            continue
+    return out
+
+
+def limiter_db() -> sqlite3.Connection:
+    """This thread's connection to RATE_LIMIT_DB (also holds app.services.adaptive_concurrency state)."""
+
+    path = str(settings.rate_limit_db)
+    conn = getattr(_local, "conns", {}).get(path)
+    if conn is not None:
+        return conn
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    with _init_lock:
+        if path not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            _initialized.add(path)
+    if not hasattr(_local, "conns"):
+        _local.conns = {}
+    _local.conns[path] = conn
+    return conn
+
+
+def limiter_key(provider: str, api_key: str | None) -> str:
+    """Bucket key: provider plus a fingerprint of the API key (never the key itself)."""
+
+    fp = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+    return f"{provider}:{fp}"
+
+
+def _try_acquire(conn: sqlite3.Connection, key: str, rpm: float, conc: int, lease_id: str) -> float:
+    """One attempt; 0 when acquired, else the seconds to wait before trying again."""
+
+    now = time.time()
+    burst = max(1.0, rpm)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT tokens, updated, penalty_until FROM buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            tokens, penalty_until = burst, 0.0
+            conn.execute("INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, burst, now))
+        else:
+            tokens = min(burst, row[0] + max(0.0, now - row[1]) * rpm / 60.0) if rpm else burst
+            penalty_until = row[2]
+
+        wait = max(0.0, penalty_until - now)
+        if rpm and tokens < 1.0:
+            wait = max(wait, (1.0 - tokens) * 60.0 / rpm)
+        if conc and not wait:
+            conn.execute("DELETE FROM leases WHERE expires < ?", (now,))
+            (held,) = conn.execute("SELECT COUNT(*) FROM leases WHERE key = ?", (key,)).fetchone()
+            if held >= conc:
+                wait = 0.2
+
+        if wait:
+            conn.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE key = ?", (tokens, now, key))
+        else:
+            conn.execute(
+                "UPDATE buckets SET tokens = ?, updated = ?, acquired = acquired + 1 WHERE key = ?",
+                (tokens - 1.0 if rpm else tokens, now, key),
+            )
+            if conc:
+                conn.execute("INSERT INTO leases (id, key, expires) VALUES (?, ?, ?)", (lease_id, key, now + LEASE_S))
+        conn.execute("COMMIT")
+        return wait
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+_thread_waits = threading.local()
+
+
+def thread_wait_s() -> float:
+    """Seconds this thread has spent waiting in RateLimit so far (monotonic counter)."""
+
+    return getattr(_thread_waits, "s", 0.0)
+
+
+class RateLimit:
+    """Context manager holding one request's worth of a provider key's budget.
+
+        with RateLimit("seedream", api_key) as rl:
+            r = client.post(...)
+            if r.status_code == 429:
+                rl.throttled(r.headers.get("retry-after"))
+    """
+
+    def __init__(self, provider: str, api_key: str | None = None):
+        self.provider = provider.strip().lower()
+        self.key = limiter_key(self.provider, api_key)
+        self.rpm, self.conc = rate_limits().get(self.provider, (0.0, 0))
+        self.waited_s = 0.0
+        self._lease_id = uuid.uuid4().hex
+        self._throttled = False
+
+    def __enter__(self) -> "RateLimit":
+        if not (self.rpm or self.conc):
+            return self
+        conn = limiter_db()
+        t0 = time.perf_counter()
+        while True:
+            wait = _try_acquire(conn, self.key, self.rpm, self.conc, self._lease_id)
+            if not wait:
+                break
+            check_canceled()
+            time.sleep(min(wait, _POLL_MAX_S))
+            self.waited_s = time.perf_counter() - t0
+        if self.waited_s:
+            conn.execute(
+                "UPDATE buckets SET wait_s = wait_s + ?, max_wait_s = MAX(max_wait_s, ?) WHERE key = ?",
+                (self.waited_s, self.waited_s, self.key),
+            )
+        if self.waited_s >= _LOG_WAIT_S:
+            print(f"RATE_LIMIT_WAIT: {self.key} waited={self.waited_s:.1f}s")
+        _thread_waits.s = getattr(_thread_waits, "s", 0.0) + self.waited_s
+        return self
+
+    def throttled(self, retry_after: str | float | None = None) -> None:
+        """Record a 429: no request on this key until Retry-After (or backoff) passed."""
+
+        self._throttled = True
+        try:
+            delay = float(retry_after) if retry_after not in (None, "") else None
+        except (TypeError, ValueError):
+            delay = None
+        conn = limiter_db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT strikes FROM buckets WHERE key = ?", (self.key,)).fetchone()
+            strikes = (row[0] if row else 0) + 1
+            if delay is None:
+                delay = min(float(settings.rate_limit_max_backoff_s), 2.0 * 2 ** (strikes - 1))
+            now = time.time()
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated, penalty_until, strikes, throttled) VALUES (?, 0, ?, ?, ?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = 0, updated = excluded.updated, "
+                "penalty_until = MAX(penalty_until, excluded.penalty_until), strikes = excluded.strikes, "
+                "throttled = throttled + 1",
+                (self.key, now, now + delay, strikes),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"RATE_LIMIT_429: {self.key} backoff={delay:.1f}s strikes={strikes}")
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if not (self.rpm or self.conc):
+            return
+        conn = limiter_db()
+        if self.conc:
+            conn.execute("DELETE FROM leases WHERE id = ?", (self._lease_id,))
+        if not self._throttled and exc_type is None:
+            conn.execute("UPDATE buckets SET strikes = 0 WHERE key = ? AND strikes > 0", (self.key,))
+
+
+def rate_limit_stats() -> dict[str, dict]:
+    """Per bucket: requests, 429s, total/max wait, active slots, remaining penalty."""
+
+    path = str(settings.rate_limit_db)
+    if not os.path.exists(path):
+        return {}
+    conn = limiter_db()
+    now = time.time()
+    held = dict(
+        conn.execute("SELECT key, COUNT(*) FROM leases WHERE expires >= ? GROUP BY key", (now,)).fetchall()
+    )
+    out: dict[str, dict] = {}
+    for key, acquired, throttled, wait_s, max_wait_s, penalty_until in conn.execute(
+        "SELECT key, acquired, throttled, wait_s, max_wait_s, penalty_until FROM buckets ORDER BY key"
+    ):
+        out[key] = {
+            "requests": int(acquired),
+            "throttled": int(throttled),
+            "wait_s": round(float(wait_s), 1),
+            "max_wait_s": round(float(max_wait_s), 1),
+            "active": int(held.get(key, 0)),
+            "penalty_s": round(max(0.0, float(penalty_until) - now), 1),
+        }
+    return out
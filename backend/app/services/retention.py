@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.engine import engine
+from app.models.job import Job
+from app.models.job_rollup import JobRollup
+from app.models.paper_event import PaperEvent
+from app.models.paper_event_rollup import PaperEventRollup
+from app.services.blob_store import gc_blobs
+from app.services.job_logs import archive_finished_job_logs
+
+
+FINISHED_JOB_STATUSES = ("success", "failed", "canceled")
+
+
+def _cutoff(keep_days: int) -> str:
+    """Start of the UTC day `keep_days` ago, formatted like SQLite DATETIME values.
+
+    Cutting on a day boundary keeps every rollup day complete (a day is rolled once).
+    """
+
+    d = datetime.utcnow() - timedelta(days=max(0, int(keep_days)))
+    return d.strftime("%Y-%m-%d 00:00:00")
+
+
+def rollup_paper_events(*, keep_days: int) -> int:
+    """Roll paper_events older than keep_days into paper_event_rollups, then delete them."""
+
+    cutoff = _cutoff(keep_days)
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                INSERT INTO paper_event_rollups (day, stage, status, n, updated_at)
+                SELECT date(created_at), stage, status, count(*), :now
+                FROM paper_events
+                WHERE created_at < :cutoff
+                GROUP BY date(created_at), stage, status
+                ON CONFLICT (day, stage, status) DO UPDATE SET
+                  n = paper_event_rollups.n + excluded.n,
+                  updated_at = excluded.updated_at
+                """
+            ),
+            {"cutoff": cutoff, "now": now},
+        )
+        r = conn.execute(text("DELETE FROM paper_events WHERE created_at < :cutoff"), {"cutoff": cutoff})
+
+    return int(getattr(r, "rowcount", 0) or 0)
+
+
+def rollup_jobs(*, keep_days: int) -> int:
+    """Roll finished jobs older than keep_days into job_rollups, then delete them.
+
+    queued/running jobs are never touched.
+    """
+
+    cutoff = _cutoff(keep_days)
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    statuses = ", ".join(f"'{s}'" for s in FINISHED_JOB_STATUSES)
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO job_rollups (day, job_type, status, n, updated_at)
+                SELECT date(created_at), job_type, status, count(*), :now
+                FROM jobs
+                WHERE created_at < :cutoff AND status IN ({statuses})
+                GROUP BY date(created_at), job_type, status
+                ON CONFLICT (day, job_type, status) DO UPDATE SET
+                  n = job_rollups.n + excluded.n,
+                  updated_at = excluded.updated_at
+                """
+            ),
+            {"cutoff": cutoff, "now": now},
+        )
+        # Edges of pruned jobs go too (an upstream is finished, so its dependents were
+        # already released or canceled).
+        conn.execute(
+            text(
+                f"""
+                DELETE FROM job_dependencies
+                WHERE job_id IN (SELECT id FROM jobs WHERE created_at < :cutoff AND status IN ({statuses}))
+                   OR depends_on_id IN (SELECT id FROM jobs WHERE created_at < :cutoff AND status IN ({statuses}))
+                """
+            ),
+            {"cutoff": cutoff},
+        )
+        r = conn.execute(
+            text(f"DELETE FROM jobs WHERE created_at < :cutoff AND status IN ({statuses})"),
+            {"cutoff": cutoff},
+        )
+
+    return int(getattr(r, "rowcount", 0) or 0)
+
+
+def incremental_vacuum(*, pages: int, allow_full_vacuum: bool = False) -> dict:
+    """Release free pages back to the filesystem (SQLite only).
+
+    PRAGMA incremental_vacuum only works when auto_vacuum=INCREMENTAL. Switching an
+    existing DB to that mode needs one full VACUUM, which we only do when explicitly
+    allowed (it rewrites the whole file).
+    """
+
+    if engine.url.get_backend_name() != "sqlite":
+        return {"skipped": "not sqlite"}
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+
+        mode = int(conn.execute(text("PRAGMA auto_vacuum")).scalar() or 0)
+        if mode != 2:
+            if not allow_full_vacuum:
+                return {"skipped": f"auto_vacuum={mode} (run with full_vacuum=1 once to enable incremental mode)"}
+            conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+
+        free_before = int(conn.execute(text("PRAGMA freelist_count")).scalar() or 0)
+        conn.execute(text(f"PRAGMA incremental_vacuum({max(0, int(pages))})"))
+        free_after = int(conn.execute(text("PRAGMA freelist_count")).scalar() or 0)
+
+    return {"freelist_before": free_before, "freelist_after": free_after}
+
+
+def run_retention(
+    *,
+    events_keep_days: int | None = None,
+    jobs_keep_days: int | None = None,
+    vacuum_pages: int | None = None,
+    allow_full_vacuum: bool = False,
+) -> dict:
+    """Rollup + delete aged history, then incrementally vacuum. Safe to run repeatedly."""
+
+    ev_days = int(settings.paper_events_retention_days if events_keep_days is None else events_keep_days)
+    job_days = int(settings.jobs_retention_days if jobs_keep_days is None else jobs_keep_days)
+    pages = int(settings.db_incremental_vacuum_pages if vacuum_pages is None else vacuum_pages)
+
+    with Session(engine) as session:
+        logs_archived = archive_finished_job_logs(session)
+        blobs = gc_blobs(session)
+
+    return {
+        "paper_events_deleted": rollup_paper_events(keep_days=ev_days),
+        "jobs_deleted": rollup_jobs(keep_days=job_days),
+        "job_logs_archived": logs_archived,
+        "blobs": blobs,
+        "vacuum": incremental_vacuum(pages=pages, allow_full_vacuum=allow_full_vacuum),
+    }
+
+
+def paper_event_counts_by_stage(session: Session, *, status: str) -> dict[str, int]:
+    """All-time event counts per stage: rollups + retained raw events (both bounded)."""
+
+    out: dict[str, int] = {}
+
+    rolled = session.exec(
+        select(PaperEventRollup.stage, func.sum(PaperEventRollup.n))
+        .where(PaperEventRollup.status == status)
+        .group_by(PaperEventRollup.stage)
+    ).all()
+    for stage, n in rolled:
+        out[stage] = out.get(stage, 0) + int(n or 0)
+
+    raw = session.exec(
+        select(PaperEvent.stage, func.count(PaperEvent.id))
+        .where(PaperEvent.status == status)
+        .group_by(PaperEvent.stage)
+    ).all()
+    for stage, n in raw:
+        out[stage] = out.get(stage, 0) + int(n or 0)
+
+    return out
+
+
+def job_counts_by_status(session: Session) -> dict[str, int]:
+    """All-time job counts per status: rollups + jobs still in the table."""
+
+    out: dict[str, int] = {}
+
+    rolled = session.exec(select(JobRollup.status, func.sum(JobRollup.n)).group_by(JobRollup.status)).all()
+    for st, n in rolled:
+        out[st] = out.get(st, 0) + int(n or 0)
+
+    live = session.exec(select(Job.status, func.count(Job.id)).group_by(Job.status)).all()
+    for st, n in live:
+        out[st] = out.get(st, 0) + int(n or 0)
+
+    return out
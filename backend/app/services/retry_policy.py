@@ -0,0 +1,119 @@
+"""Declarative retry policies for jobs and per-paper pipeline stages.
+
+Transient provider trouble (429s, timeouts, 5xx, dropped connections) should not need
+a human to re-queue work. A policy says how many attempts a job type / stage gets,
+how long to back off between them (exponential with jitter), and which error classes
+are worth retrying. Retries are queue entries with a `not_before` time, never sleeps:
+
+- a failed job whose error (or the final line of its traceback) matches its policy
+  goes back to `queued`
+  (scripts.job_worker -> job_queue.retry_job)
+- a failed paper stage event schedules a `paper_retry_stage` job
+  (paper_events.record_paper_event), except inside pipeline nodes (`paper_stage`),
+  which are retried as jobs so their dependents keep waiting on them
+"""
+
+from __future__ import annotations
+
+import random
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+# Error classes, matched against an exception (`Type: message`) or the final error
+# line of a job's traceback, never against free-form log output.
+ERROR_CLASSES: dict[str, re.Pattern[str]] = {
+    "rate_limit": re.compile(r"\b429\b|too many requests|rate[ _-]?limit|quota exceeded", re.I),
+    # Transport timeouts only (httpx/socket/subprocess and the worker's own job timeout),
+    # not any text that happens to mention a timeout setting.
+    "timeout": re.compile(
+        r"\b(?:Read|Write|Connect|Pool)Timeout\b|\bTimeoutError\b|\bTimeoutExpired\b|\btimed out\b", re.I
+    ),
+    "server_error": re.compile(
+        r"server error '5\d\d|internal server error|bad gateway|service unavailable|gateway time-?out", re.I
+    ),
+    "network": re.compile(
+        r"connect(ion)? ?(error|reset|refused|aborted)|remoteprotocolerror|server disconnected"
+        r"|temporary failure in name resolution|name or service not known|network is unreachable",
+        re.I,
+    ),
+}
+
+TRANSIENT = frozenset({"rate_limit", "timeout", "server_error", "network"})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int
+    base_s: float
+    max_s: float
+    retry_on: frozenset[str] = TRANSIENT
+
+    def backoff_s(self, attempt: int) -> float:
+        """Delay before attempt `attempt + 1`: base * 2^(attempt-1), capped, with jitter
+        in [cap/2, cap] so a burst of failures does not retry in lockstep."""
+
+        cap = min(self.max_s, self.base_s * (2 ** max(0, attempt - 1)))
+        return random.uniform(cap / 2.0, cap)
+
+    def should_retry(self, attempt: int, error_class: str | None) -> bool:
+        return error_class is not None and error_class in self.retry_on and attempt < self.max_attempts
+
+
+NO_RETRY = RetryPolicy(max_attempts=1, base_s=0, max_s=0, retry_on=frozenset())
+
+_LLM_JOB = RetryPolicy(max_attempts=3, base_s=300, max_s=3600)
+_IMAGE_JOB = RetryPolicy(max_attempts=3, base_s=600, max_s=3600)
+_MINERU_JOB = RetryPolicy(max_attempts=2, base_s=600, max_s=600, retry_on=frozenset({"timeout"}))
+
+# Per job type (attempts = jobs.retries + 1; lease reclaims are not counted). Types not
+# listed are not retried; *_regen_scoped jobs wipe before running, so a blind rerun
+# would discard finished work (their per-paper failures are retried as stages).
+JOB_RETRY_POLICIES: dict[str, RetryPolicy] = {
+    "one_liner_scoped": _LLM_JOB,
+    "content_analysis_scoped": _LLM_JOB,
+    "image_caption_scoped": _LLM_JOB,
+    "paper_images_scoped": _IMAGE_JOB,
+    "paper_images_glm_backfill": _IMAGE_JOB,
+    "mineru_ocr_fix_scoped": _MINERU_JOB,
+    "epub_build_scoped": RetryPolicy(max_attempts=2, base_s=300, max_s=300, retry_on=frozenset({"timeout"})),
+    # Auto-retries of stages are governed by STAGE_RETRY_POLICIES instead.
+    "paper_retry_stage": NO_RETRY,
+    # Pipeline nodes are idempotent and hold up their dependents: retry them as jobs
+    # (they do not schedule stage retries).
+    "paper_stage": RetryPolicy(max_attempts=4, base_s=300, max_s=4 * 3600),
+}
+
+# Per base pipeline stage (attempts = paper_stage_state.attempts, i.e. `started` events).
+# Only stages paper_retry_stage can rerun are listed.
+STAGE_RETRY_POLICIES: dict[str, RetryPolicy] = {
+    "pdf": RetryPolicy(max_attempts=4, base_s=600, max_s=4 * 3600),
+    "mineru": RetryPolicy(max_attempts=2, base_s=900, max_s=900, retry_on=frozenset({"timeout"})),
+    "explain": RetryPolicy(max_attempts=4, base_s=300, max_s=4 * 3600),
+    "caption": RetryPolicy(max_attempts=4, base_s=300, max_s=4 * 3600),
+    "paper_images": RetryPolicy(max_attempts=4, base_s=600, max_s=4 * 3600),
+}
+
+
+def classify_error(text: str | None) -> str | None:
+    """First matching error class of an exception or final error line, or None."""
+
+    if not text:
+        return None
+    for name, pat in ERROR_CLASSES.items():
+        if pat.search(text):
+            return name
+    return None
+
+
+def job_policy(job_type: str) -> RetryPolicy:
+    return JOB_RETRY_POLICIES.get(job_type, NO_RETRY)
+
+
+def stage_policy(base_stage: str) -> RetryPolicy:
+    return STAGE_RETRY_POLICIES.get(base_stage, NO_RETRY)
+
+
+def retry_at(policy: RetryPolicy, attempt: int, *, now: datetime | None = None) -> datetime:
+    return (now or datetime.utcnow()) + timedelta(seconds=policy.backoff_s(attempt))
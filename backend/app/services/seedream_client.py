@@ -10,6 +10,7 @@ from typing import Optional
 import httpx
 
 from app.core.config import settings
+from app.services.rate_limiter import RateLimit
 
 
 ARK_DEFAULT_ENDPOINT = "https://ark.cn-beijing.volces.com/api/v3/images/generations"
@@ -160,7 +161,10 @@ def seedream_generate_image(
 
         try:
             with httpx.Client(timeout=timeout_s, trust_env=False) as client:
-                r = client.post(url, headers=headers, json=body)
+                with RateLimit("seedream", api_key) as rl:
+                    r = client.post(url, headers=headers, json=body)
+                    if r.status_code == 429:
+                        rl.throttled(r.headers.get("retry-after"))
 
                 # Try parse JSON error payload early
                 try:
@@ -170,11 +174,7 @@ def seedream_generate_image(
 
                 if not r.is_success:
                     if r.status_code in (401, 403, 429):
-                        # retryable: try next key; add a tiny backoff for 429
-                        if r.status_code == 429:
-                            import time
-
-                            time.sleep(1.2)
+                        # retryable: try next key (a 429 backs this key off in the rate limiter)
                         last_err = RuntimeError(
                             f"Seedream API key failed: HTTP {r.status_code}: {str(j)[:2000] or r.text[:2000]}"
                         )
@@ -1,18 +1,26 @@
 from __future__ import annotations
 
 from datetime import datetime
-import json
 
-from sqlalchemy import case, func
+from sqlalchemy import case, func, text
 from sqlmodel import Session, select
 
 from app.core.config import settings
 from app.db.engine import engine
 from app.models.job import Job
 from app.models.paper import Paper
+from app.models.paper_content import PaperContent
 from app.models.paper_event import PaperEvent
 from app.models.paper_image import PaperImage
+from app.services.adaptive_concurrency import adaptive_stats
 from app.services.app_config import get_effective_app_config
+from app.services.blob_store import blob_stats
+from app.services.job_queue import job_usage_by_type, slot_occupancy
+from app.services.llm_cache import llm_cache_stats
+from app.services.paper_content import content_present
+from app.services.paper_events import stage_status_counts
+from app.services.rate_limiter import rate_limit_stats
+from app.services.retention import job_counts_by_status, paper_event_counts_by_stage
 
 
 def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) -> dict:
@@ -23,7 +31,7 @@ def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) ->
       detailed operational errors.
 
     - Admin mode (include_sensitive=True): includes operational details such as
-      recent failures with log_path and job running list.
+      recent failures with log_path, job running list and per-type resource usage.
     """
 
     limit = max(1, min(int(limit or 50), 200))
@@ -31,7 +39,28 @@ def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) ->
     with Session(engine) as session:
         app_cfg = get_effective_app_config(session)
 
-        papers = session.exec(select(Paper).where(Paper.source == "hf_daily")).all()
+        # Narrow aggregates only: the heavy text lives in paper_content and is never
+        # pulled through the ORM here.
+        total, pdf, mineru = session.exec(
+            select(func.count(Paper.id), func.count(Paper.pdf_path), func.count(Paper.raw_text_path))
+            .where(Paper.source == "hf_daily")
+        ).one()
+        total, pdf, mineru = int(total or 0), int(pdf or 0), int(mineru or 0)
+
+        # paper_content stores empty outputs as NULL, so "has output" == NOT NULL.
+        # typeof() lets SQLite answer from the record header without loading the text
+        # (count(col) / col IS NOT NULL in a projection read the overflow pages).
+        def _present(col):
+            return func.coalesce(func.sum(case((func.typeof(col) != "null", 1), else_=0)), 0)
+
+        explain, captions = session.exec(
+            select(_present(PaperContent.content_explain_cn), _present(PaperContent.image_captions_json))
+            .select_from(PaperContent)
+            .join(Paper, Paper.id == PaperContent.paper_id)
+            .where(Paper.source == "hf_daily")
+        ).one()
+        explain, captions = int(explain or 0), int(captions or 0)
+
         latest_day = session.exec(
             select(Paper.day)
             .where(Paper.source == "hf_daily")
@@ -40,22 +69,25 @@ def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) ->
             .limit(1)
         ).first()
 
-        pdf = sum(1 for p in papers if p.pdf_path)
-        mineru = sum(1 for p in papers if p.raw_text_path)
-        explain = sum(1 for p in papers if p.content_explain_cn)
-        captions = sum(1 for p in papers if p.image_captions_json)
-
-        # Caption coverage (best-effort)
-        caption_entries = 0
-        for p in papers:
-            if not p.image_captions_json:
-                continue
-            try:
-                d = json.loads(p.image_captions_json) or {}
-                if isinstance(d, dict):
-                    caption_entries += len(d)
-            except Exception:
-                pass
+        # Caption coverage (best-effort; malformed / non-object JSON counts as 0)
+        caption_entries = int(
+            session.exec(
+                text(
+                    """
+                    SELECT count(*)
+                    FROM paper_content c
+                    JOIN papers p ON p.id = c.paper_id,
+                    json_each(
+                      CASE WHEN json_valid(c.image_captions_json) THEN
+                        CASE WHEN json_type(c.image_captions_json) = 'object' THEN c.image_captions_json END
+                      END
+                    )
+                    WHERE p.source = 'hf_daily'
+                    """
+                )
+            ).scalar()
+            or 0
+        )
 
         missing_pdf = session.exec(
             select(Paper.external_id)
@@ -72,13 +104,13 @@ def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) ->
         missing_explain = session.exec(
             select(Paper.external_id)
             .where(Paper.source == "hf_daily")
-            .where(Paper.content_explain_cn.is_(None))
+            .where(~content_present("content_explain_cn"))
             .limit(limit)
         ).all()
         missing_captions = session.exec(
             select(Paper.external_id)
             .where(Paper.source == "hf_daily")
-            .where(Paper.image_captions_json.is_(None))
+            .where(~content_present("image_captions_json"))
             .limit(limit)
         ).all()
 
@@ -132,23 +164,19 @@ def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) ->
             .limit(min(limit, 50))
         ).all()
 
-        stage_rows = session.exec(
-            select(PaperEvent.stage, func.count(PaperEvent.id))
-            .where(PaperEvent.status == "failed")
-            .group_by(PaperEvent.stage)
-        ).all()
-        failed_by_stage = {stage: int(n or 0) for (stage, n) in stage_rows}
+        # raw events (retention window) + daily rollups of pruned history
+        failed_by_stage = paper_event_counts_by_stage(session, status="failed")
+        skipped_by_stage = paper_event_counts_by_stage(session, status="skipped")
 
-        skipped_rows = session.exec(
-            select(PaperEvent.stage, func.count(PaperEvent.id))
-            .where(PaperEvent.status == "skipped")
-            .group_by(PaperEvent.stage)
-        ).all()
-        skipped_by_stage = {stage: int(n or 0) for (stage, n) in skipped_rows}
+        # current per-stage state (one row per paper/stage/lang; indexed aggregate)
+        stage_state = stage_status_counts(session)
 
         # job queue summary (public-safe aggregates)
-        job_rows = session.exec(select(Job.status, func.count(Job.id)).group_by(Job.status)).all()
-        jobs_by_status = {st: int(n or 0) for (st, n) in job_rows}
+        jobs_by_status = job_counts_by_status(session)
+
+        job_slots = slot_occupancy(session)
+        job_usage = job_usage_by_type(session, days=7) if include_sensitive else {}
+        blobs = blob_stats(session) if include_sensitive else {}
 
         running_jobs = session.exec(
             select(Job.id, Job.job_type, Job.status, Job.started_at, Job.log_path)
@@ -199,17 +227,17 @@ def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) ->
             "paper_images_providers": settings.paper_images_providers,
         },
         "papers": {
-            "total": len(papers),
+            "total": total,
             "pdf": pdf,
             "mineru_md": mineru,
             "content_explain_cn": explain,
             "image_captions_json": captions,
             "caption_entries": caption_entries,
             "missing": {
-                "pdf": {"count": max(0, len(papers) - pdf), "examples": missing_pdf},
-                "mineru_md": {"count": max(0, len(papers) - mineru), "examples": missing_mineru},
-                "content_explain_cn": {"count": max(0, len(papers) - explain), "examples": missing_explain},
-                "image_captions_json": {"count": max(0, len(papers) - captions), "examples": missing_captions},
+                "pdf": {"count": max(0, total - pdf), "examples": missing_pdf},
+                "mineru_md": {"count": max(0, total - mineru), "examples": missing_mineru},
+                "content_explain_cn": {"count": max(0, total - explain), "examples": missing_explain},
+                "image_captions_json": {"count": max(0, total - captions), "examples": missing_captions},
             },
         },
         "paper_images": {
@@ -225,10 +253,12 @@ def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) ->
             "recent_skipped": [],
             "recent_skipped_count": len(recent_paper_skipped),
         },
+        "stages": stage_state,
         "jobs": {
             "by_status": jobs_by_status,
             "running": [],
             "running_count": len(running_jobs),
+            "slots": job_slots,
         },
     }
 
@@ -277,4 +307,17 @@ def get_status_snapshot(*, limit: int = 50, include_sensitive: bool = False) ->
             for (i, jt, st, t, lp) in running_jobs
         ]
 
+        # Resource usage per job type over the last 7 days (sizing / regressions).
+        res["jobs"]["usage_by_type"] = job_usage
+
+        # Blob store: stored vs. logical bytes (dedup ratio of PDFs/images).
+        res["blobs"] = blobs
+
+        # Provider rate limiter buckets (requests, 429s, time spent waiting).
+        res["rate_limits"] = rate_limit_stats()
+        # AIMD concurrency gates (llm / vlm / image) of recently active processes.
+        res["adaptive_concurrency"] = adaptive_stats()
+        # LLM/VLM response cache (entries, bytes, hits/misses, evictions).
+        res["llm_cache"] = llm_cache_stats()
+
     return res
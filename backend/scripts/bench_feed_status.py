@@ -0,0 +1,150 @@
+"""Micro-benchmark for the feed + status read paths on a synthetic DB.
+
+Seeds a throwaway SQLite DB with N hf_daily papers carrying realistic-size
+explanations / caption maps / raw HF meta, then times:
+- GET /api/papers/random  (get_random_papers)
+- /api/status             (get_status_snapshot)
+
+Works on both layouts (heavy text on `papers` or in `paper_content`), so it can
+be run before/after a schema change for comparison.
+
+Usage:
+  cd papertok/backend
+  .venv/bin/python -m scripts.bench_feed_status --papers 3000 --repeat 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+
+def _seed(n: int) -> None:
+    from sqlalchemy import text
+
+    from app.db.engine import engine
+
+    explain = "讲解段落。" * 1500  # ~20KB UTF-8, similar to real explanations
+    captions = json.dumps({f"/static/mineru/x/images/{i}.jpg": "图注" * 120 for i in range(12)}, ensure_ascii=False)
+    meta = json.dumps({"paper": {"summary": "abstract " * 250, "authors": [{"name": "a"}] * 20}})
+
+    with engine.begin() as conn:
+        paper_cols = {r[1] for r in conn.execute(text("PRAGMA table_info(papers)")).fetchall()}
+        side_table = "content_explain_cn" not in paper_cols
+
+        for i in range(n):
+            heavy = {
+                "content_explain_cn": explain,
+                "content_explain_en": explain,
+                "image_captions_json": captions,
+                "image_captions_en_json": captions,
+                "meta_json": meta,
+            }
+            cols = {
+                "source": "hf_daily",
+                "external_id": f"2601.{i:05d}",
+                "day": f"2026-01-{(i // 10) % 28 + 1:02d}",
+                "title": f"Paper {i}",
+                # every 10th card falls back to the HF abstract (meta_json)
+                "one_liner": None if i % 10 == 0 else "一句话总结",
+                "one_liner_en": "one-liner",
+                "raw_text_path": f"/tmp/mineru/{i}/txt/{i}.md",
+                "pdf_path": f"/tmp/pdfs/{i}.pdf",
+                "created_at": "2026-01-01 00:00:00",
+                "updated_at": "2026-01-01 00:00:00",
+            }
+            if not side_table:
+                cols.update(heavy)
+
+            keys = ", ".join(cols)
+            vals = ", ".join(f":{k}" for k in cols)
+            pid = conn.execute(text(f"INSERT INTO papers ({keys}) VALUES ({vals}) RETURNING id"), cols).scalar()
+
+            if side_table:
+                conn.execute(
+                    text(
+                        "INSERT INTO paper_content (paper_id, content_explain_cn, content_explain_en, "
+                        "image_captions_json, image_captions_en_json, meta_json, updated_at) "
+                        "VALUES (:pid, :content_explain_cn, :content_explain_en, :image_captions_json, "
+                        ":image_captions_en_json, :meta_json, '2026-01-01 00:00:00')"
+                    ),
+                    {"pid": pid, **heavy},
+                )
+
+            for order_idx in range(3):
+                conn.execute(
+                    text(
+                        "INSERT INTO paper_images (paper_id, kind, provider, lang, order_idx, status, enabled, "
+                        "url_path, created_at, updated_at) VALUES (:pid, 'generated', 'seedream', 'zh', :o, "
+                        "'generated', 1, :u, '2026-01-01 00:00:00', '2026-01-01 00:00:00')"
+                    ),
+                    {"pid": pid, "o": order_idx, "u": f"/static/gen/{pid}/{order_idx}.webp"},
+                )
+
+            for stage in ("explain", "caption"):
+                conn.execute(
+                    text(
+                        "INSERT INTO paper_stage_state (paper_id, stage, lang, status, attempts, succeeded_at, updated_at) "
+                        "VALUES (:pid, :stage, 'zh', 'success', 1, '2026-01-01 00:00:00', '2026-01-01 00:00:00')"
+                    ),
+                    {"pid": pid, "stage": stage},
+                )
+
+
+def _time(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 2),
+        "max_ms": round(samples[-1], 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--papers", type=int, default=3000)
+    ap.add_argument("--repeat", type=int, default=30)
+    ap.add_argument("--db", default="", help="sqlite file to (re)create; default: temp file")
+    args = ap.parse_args()
+
+    db_path = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "bench.sqlite"
+    if db_path.exists():
+        db_path.unlink()
+    os.environ["DB_URL"] = f"sqlite:////{db_path.resolve()}"
+
+    # Import after DB_URL is set: the engine binds at import time.
+    from sqlalchemy import text
+
+    from app.api.papers import get_random_papers
+    from app.db.engine import engine
+    from app.db.init_db import init_db
+    from app.services.status_service import get_status_snapshot
+
+    init_db()
+    _seed(int(args.papers))
+
+    with engine.connect() as conn:
+        page_size = int(conn.execute(text("PRAGMA page_size")).scalar() or 0)
+        page_count = int(conn.execute(text("PRAGMA page_count")).scalar() or 0)
+
+    res = {
+        "papers": int(args.papers),
+        "db_mb": round(page_size * page_count / 1e6, 1),
+        "feed": _time(lambda: get_random_papers(limit=20, day="all", lang="zh"), int(args.repeat)),
+        "status": _time(lambda: get_status_snapshot(limit=50), int(args.repeat)),
+    }
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
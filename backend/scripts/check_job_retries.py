@@ -0,0 +1,96 @@
+"""Check that a pipeline node failed by a transient provider error is retried as a job.
+
+Builds a throwaway SQLite DB through init_db(), points the OpenAI-compatible endpoint
+at a local stand-in that answers every request with 429, and runs one `paper_stage`
+explain node through the job worker. The stage records the 429 on its failed event,
+the node exits NODE_FAILED with that error, and the worker must requeue the job with
+a `not_before` under the paper_stage retry policy instead of failing it for good.
+
+Run it after touching stage error handling, pipeline nodes or the retry policies:
+  cd papertok/backend
+  .venv/bin/python -m scripts.check_job_retries
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+class _TooManyRequests(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("content-length") or 0))
+        body = b'{"error": {"message": "rate limited"}}'
+        self.send_response(429)
+        self.send_header("content-type", "application/json")
+        self.send_header("retry-after", "0")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def main() -> int:
+    tmp = Path(tempfile.mkdtemp())
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TooManyRequests)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.update(
+        {
+            "DB_URL": f"sqlite:////{(tmp / 'retries.sqlite').resolve()}",
+            "RATE_LIMIT_DB": str(tmp / "rate_limits.sqlite"),
+            "LLM_CACHE": "0",
+            "OPENAI_API_KEY": "check",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_port}/v1",
+            "RUN_CONTENT_ANALYSIS": "1",
+            "PAPERTOK_LANGS": "en",
+            "JOB_AUTO_RETRY": "1",
+            "JOB_WORKER_IN_PROCESS": "1",
+            "JOB_WORKER_POLL_S": "0.2",
+        }
+    )
+
+    # Import after the environment is set: settings and the engine bind at import time.
+    from sqlmodel import Session
+
+    import scripts.job_worker as job_worker
+    from app.db.engine import engine
+    from app.db.init_db import init_db
+    from app.models.job import Job
+    from app.models.paper import Paper
+    from app.services.job_queue import enqueue_job
+
+    init_db()
+    job_worker.DATA_DIR = tmp / "data"
+    job_worker.LOG_DIR = tmp / "data" / "logs"
+
+    md = tmp / "paper.md"
+    md.write_text("# A paper\n\nSome parsed text.\n", encoding="utf-8")
+    with Session(engine) as session:
+        session.add(Paper(source="hf_daily", external_id="2601.00001", title="A paper", day="2026-01-01", raw_text_path=str(md)))
+        session.commit()
+        job_id = enqueue_job(
+            session, job_type="paper_stage", payload={"external_id": "2601.00001", "stage": "explain", "lang": "en"}
+        ).id
+
+    job_worker.main(max_jobs=1)
+    server.shutdown()
+
+    with Session(engine) as session:
+        j = session.get(Job, job_id)
+    ok = j is not None and j.status == "queued" and j.not_before is not None and "rate_limit" in (j.error or "")
+    print(f"{'OK  ' if ok else 'FAIL'} paper_stage node failed by a 429 is requeued")
+    print(f"       status={j.status if j else None} not_before={j.not_before if j else None}")
+    print(f"       error={j.error if j else None}")
+    print(f"JOB_RETRIES: checked=1 failed={0 if ok else 1}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
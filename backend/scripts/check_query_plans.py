@@ -0,0 +1,89 @@
+"""Check that hot queries are served by the intended indexes (EXPLAIN QUERY PLAN).
+
+Builds a throwaway SQLite DB through init_db() (i.e. the real migrations), then
+asks SQLite how it would run the feed / pending-stage / status queries and fails
+if a plan scans a large table instead of using the expected (partial) index.
+
+Run it after touching indexes or the query shapes below:
+  cd papertok/backend
+  .venv/bin/python -m scripts.check_query_plans
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+
+def _plan(engine, stmt) -> list[str]:
+    from sqlalchemy import text
+
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [str(r[-1]) for r in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()]
+
+
+def main() -> int:
+    db_path = Path(tempfile.mkdtemp()) / "plans.sqlite"
+    os.environ["DB_URL"] = f"sqlite:////{db_path.resolve()}"
+
+    # Import after DB_URL is set: the engine binds at import time.
+    from sqlmodel import select
+
+    from app.api.papers import feed_ids_query, feed_images_query
+    from app.db.engine import engine
+    from app.db.init_db import init_db
+    from app.models.paper_event import PaperEvent
+    from app.services.app_config import AppConfig
+    from scripts.daily_run import pending_explain_query, pending_mineru_query
+
+    init_db()
+
+    gated = AppConfig(
+        feed_require_explain=True,
+        feed_require_image_captions=False,
+        feed_require_generated_images=True,
+    )
+
+    # (name, statement, index that must appear, table that must not be scanned)
+    checks = [
+        ("feed ids (all days)", feed_ids_query(gated, lang="zh", day=None),
+         "idx_paper_images_generated_visible", "paper_images"),
+        ("feed ids (one day)", feed_ids_query(gated, lang="zh", day="2026-01-01"),
+         "idx_papers_parsed_source_day", "papers"),
+        ("feed images", feed_images_query([1, 2, 3], lang="zh"),
+         "idx_paper_images_generated_visible", "paper_images"),
+        ("pending mineru (all days)", pending_mineru_query().limit(50),
+         "idx_papers_pending_mineru", "papers"),
+        ("pending mineru (one day)", pending_mineru_query(day="2026-01-01").limit(50),
+         "idx_papers_pending_mineru_day", "papers"),
+        ("pending explain (all days)", pending_explain_query("en").limit(50),
+         "idx_papers_parsed", "papers"),
+        ("pending explain (one day)", pending_explain_query("zh", day="2026-01-01").limit(50),
+         "ix_papers_day", "papers"),
+        ("recent paper failures",
+         select(PaperEvent.id).where(PaperEvent.status == "failed")
+         .order_by(PaperEvent.created_at.desc()).limit(20),
+         "idx_paper_events_status_created", "paper_events"),
+    ]
+
+    failed = 0
+    for name, stmt, want_index, no_scan in checks:
+        plan = _plan(engine, stmt)
+        uses = any(re.search(rf"\b{want_index}\b", line) for line in plan)
+        scans = any(line.startswith(f"SCAN {no_scan}") and "INDEX" not in line for line in plan)
+        ok = uses and not scans
+        failed += 0 if ok else 1
+        print(f"{'OK  ' if ok else 'FAIL'} {name}")
+        for line in plan:
+            print(f"       {line}")
+
+    print(f"QUERY_PLANS: checked={len(checks)} failed={failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
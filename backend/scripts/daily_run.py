@@ -12,18 +12,21 @@ from __future__ import annotations
 import json
 import os
 import re
-import hashlib
 import base64
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 
 import httpx
 from sqlmodel import Session, select
-from sqlalchemy import or_
+from sqlalchemy import func, or_, update
 
-from app.core.config import settings
+from app.core.config import settings, settings_scope
+from app.core.job_context import ContextThreadPoolExecutor
 from app.core.prompts import (
     CONTENT_ANALYSIS_SYSTEM_PROMPT_ZH,
     CONTENT_ANALYSIS_SYSTEM_PROMPT_EN,
@@ -35,7 +38,23 @@ from app.models.paper_image import PaperImage
 from app.services.seedream_client import seedream_generate_image, seedream_has_keys
 from app.services.glm_image_client import glm_image_generate, glm_image_has_keys
 from app.services.app_config import get_effective_app_config
+from app.services.adaptive_concurrency import adaptive_call, adaptive_limit
+from app.services.job_progress import job_progress
+from app.services.llm_client import chat_completions, completion_text
+from app.services.paper_content import (
+    captions_field,
+    content_json,
+    content_present,
+    content_value,
+    explain_field,
+    get_paper_content,
+    load_paper_contents,
+    set_paper_content,
+)
 from app.services.paper_events import record_paper_event
+from app.services.paper_ingest import bulk_upsert_hf_papers, hf_item_fields
+from app.services import blob_store
+from app.services.pdf_downloader import arxiv_pdf_url, download_pdf, pdf_path_for
 
 
 def fetch_hf_daily(date: str) -> tuple[str, list[dict[str, Any]]]:
@@ -86,46 +105,8 @@ def fetch_hf_daily(date: str) -> tuple[str, list[dict[str, Any]]]:
         return date, data[: settings.hf_top_n]
 
 
-def _safe_filename(s: str) -> str:
-    return re.sub(r"[^A-Za-z0-9._-]+", "_", s)
-
-
-def arxiv_pdf_url(arxiv_id: str) -> str:
-    # supports 2602.04705, 2602.04705v2, cs/0601001
-    return f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-
-
-def download_pdf(arxiv_id: str) -> tuple[str, str, str]:
-    """Download arXiv PDF; return (pdf_url, pdf_path, sha256)."""
-    os.makedirs(settings.papers_pdf_dir, exist_ok=True)
-
-    pdf_url = arxiv_pdf_url(arxiv_id)
-    filename = _safe_filename(arxiv_id) + ".pdf"
-    pdf_path = os.path.join(settings.papers_pdf_dir, filename)
-
-    if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
-        # best-effort sha reuse (avoid reading entire file unless needed)
-        return pdf_url, pdf_path, ""
-
-    h = hashlib.sha256()
-    with httpx.stream(
-        "GET", pdf_url, timeout=120, follow_redirects=True, trust_env=False
-    ) as r:
-        r.raise_for_status()
-        with open(pdf_path, "wb") as f:
-            for chunk in r.iter_bytes():
-                if not chunk:
-                    continue
-                f.write(chunk)
-                h.update(chunk)
-
-    return pdf_url, pdf_path, h.hexdigest()
-
-
 def openai_chat(prompt: str, model: str, *, system_prompt: str = "You are a precise academic assistant.") -> str:
-    """OpenAI-compatible /v1/chat/completions wrapper (tolerant parsing)."""
-    url = settings.openai_base_url.rstrip("/") + "/chat/completions"
-    headers = {"Authorization": f"Bearer {settings.openai_api_key}"}
+    """OpenAI-compatible /v1/chat/completions wrapper (shared pooled client, tolerant parsing)."""
     payload = {
         "model": model,
         "messages": [
@@ -135,7 +116,7 @@ def openai_chat(prompt: str, model: str, *, system_prompt: str = "You are a prec
         "temperature": 0.4,
     }
 
-    return _openai_chat_payload(payload, url=url, headers=headers)
+    return _openai_chat_payload(payload)
 
 
 def openai_vision_caption(
@@ -200,8 +181,6 @@ def openai_vision_caption(
         {"type": "image_url", "image_url": {"url": data_url}},
     ]
 
-    url = settings.openai_base_url.rstrip("/") + "/chat/completions"
-    headers = {"Authorization": f"Bearer {settings.openai_api_key}"}
     payload = {
         "model": model,
         "messages": [
@@ -211,42 +190,11 @@ def openai_vision_caption(
         "temperature": 0.2,
     }
 
-    return _openai_chat_payload(payload, url=url, headers=headers)
+    return _openai_chat_payload(payload, kind="vlm")
 
 
-def _openai_chat_payload(payload: dict, *, url: str, headers: dict) -> str:
-    last_err = None
-    for attempt in range(3):
-        try:
-            with httpx.Client(timeout=180, trust_env=False) as client:
-                r = client.post(url, headers=headers, json=payload)
-                r.raise_for_status()
-                j = r.json()
-            break
-        except Exception as e:
-            last_err = e
-            if attempt < 2:
-                import time
-
-                time.sleep(1.5 * (attempt + 1))
-            else:
-                raise
-
-    if last_err and 'j' not in locals():
-        raise last_err
-
-    choice0 = (j.get("choices") or [{}])[0] or {}
-
-    # Standard OpenAI schema
-    msg = choice0.get("message")
-    if isinstance(msg, dict) and isinstance(msg.get("content"), str):
-        return msg["content"].strip()
-
-    # Some compat servers return `text` on choices
-    if isinstance(choice0.get("text"), str):
-        return choice0["text"].strip()
-
-    raise ValueError(f"Unexpected LLM response schema: {list(j.keys())}")
+def _openai_chat_payload(payload: dict, *, kind: str = "llm") -> str:
+    return completion_text(chat_completions(payload, kind=kind))
 
 
 def _extract_abstract_from_mineru_markdown(md_text: str) -> str | None:
@@ -324,6 +272,89 @@ def build_one_liner(title: str, abstract: str | None, *, lang: str = "zh") -> st
     return openai_chat(prompt, settings.llm_model_text)
 
 
+def _parse_json_array(text: str):
+    text = (text or "").strip()
+    try:
+        return json.loads(text)
+    except Exception:
+        # Try to recover from code fences / extra text.
+        l = text.find("[")
+        r = text.rfind("]")
+        if l != -1 and r != -1 and r > l:
+            return json.loads(text[l : r + 1])
+        raise
+
+
+def build_one_liners_batch(items: list[tuple[str, str, str | None]], *, lang: str = "zh") -> dict[str, str]:
+    """One request for several papers (ONE_LINER_BATCH > 1).
+
+    `items` are (id, title, abstract); returns {id: one-liner} for the papers the model
+    answered in its JSON array (callers fall back to build_one_liner for the rest).
+    """
+
+    lang0 = (lang or "zh").strip().lower()
+    if lang0 not in {"zh", "en"}:
+        lang0 = "zh"
+
+    papers = [{"id": k, "title": t, "abstract": (a or "").strip()} for k, t, a in items]
+    if lang0 == "en":
+        prompt = (
+            "For EACH paper below, write exactly ONE sentence in English summarizing it.\n"
+            "Requirements:\n"
+            "- one sentence per paper, no prefix, no numbering\n"
+            "- ~15-25 words, high information density\n"
+            "- Try to include at least two of: problem, method, contribution\n"
+            '- Output ONLY a strict JSON array (no code fences, no explanation): [{"id": "...", "one_liner": "..."}]\n'
+            "- one element per paper, with the paper's id unchanged\n\n"
+            "Papers (JSON):\n" + json.dumps(papers, ensure_ascii=False)
+        )
+    else:
+        prompt = (
+            "请【必须用中文】为下面【每一篇】论文各写一句话总结，要求：\n"
+            "- 每篇只输出一句话，不要编号，不要前缀\n"
+            "- 20~35个汉字左右，信息密度高\n"
+            "- 尽量包含：问题/方法/贡献中的至少两项\n"
+            '- 只输出严格 JSON 数组（不要代码块不要解释）：[{"id": "...", "one_liner": "..."}]\n'
+            "- 每篇论文一个元素，id 原样保留\n\n"
+            "论文列表（JSON）：\n" + json.dumps(papers, ensure_ascii=False)
+        )
+
+    arr = _parse_json_array(openai_chat(prompt, settings.llm_model_text))
+    if not isinstance(arr, list):
+        raise ValueError("one-liner batch output is not a JSON array")
+    wanted = {k for k, _, _ in items}
+    out: dict[str, str] = {}
+    for item in arr:
+        if not isinstance(item, dict):
+            continue
+        k = str(item.get("id") or "").strip()
+        text = str(item.get("one_liner") or "").strip()
+        if k in wanted and text:
+            out[k] = text
+    return out
+
+
+def _scope_papers(q, *, day: str | None, external_ids: list[str] | None):
+    if external_ids:
+        return q.where(Paper.external_id.in_(external_ids))
+    if day:
+        return q.where(Paper.day == day)
+    return q
+
+
+def pending_mineru_query(*, day: str | None = None, external_ids: list[str] | None = None):
+    """Downloaded but unparsed papers, oldest first (checked by scripts/check_query_plans.py)."""
+
+    q = select(Paper).where(Paper.pdf_path.is_not(None)).where(Paper.raw_text_path.is_(None))
+    return _scope_papers(q, day=day, external_ids=external_ids).order_by(Paper.id.asc())
+
+
+def pending_explain_query(lang: str, *, day: str | None = None, external_ids: list[str] | None = None):
+    """Parsed papers without an explanation in `lang`, oldest first (checked by scripts/check_query_plans.py)."""
+
+    q = select(Paper).where(Paper.raw_text_path.is_not(None)).where(~content_present(explain_field(lang)))
+    return _scope_papers(q, day=day, external_ids=external_ids).order_by(Paper.id.asc())
+
 
 def run_mineru_for_pending(
     session: Session, *, day: str | None = None, external_ids: list[str] | None = None
@@ -345,17 +376,7 @@ def run_mineru_for_pending(
         print("MINERU: enabled but MINERU_MAX=0 -> skipping")
         return
 
-    q = (
-        select(Paper)
-        .where(Paper.pdf_path.is_not(None))
-        .where(Paper.raw_text_path.is_(None))
-    )
-    if external_ids:
-        q = q.where(Paper.external_id.in_(external_ids))
-    elif day:
-        q = q.where(Paper.day == day)
-
-    rows = session.exec(q.order_by(Paper.id.asc()).limit(max_n)).all()
+    rows = session.exec(pending_mineru_query(day=day, external_ids=external_ids).limit(max_n)).all()
 
     if not rows:
         print("MINERU: nothing to do")
@@ -406,8 +427,12 @@ def run_mineru_for_pending(
             if (first_err is not None or not Path(getattr(res, "md_path")).exists()) and settings.mineru_repair_on_fail:
                 from app.services.pdf_repair import repair_pdf_for_pdfium
 
+                # Keyed by the source content when known, so a re-downloaded or renamed
+                # copy of the same PDF reuses the repair.
                 stem = Path(p.pdf_path).stem
-                repaired_pdf = Path(settings.mineru_repair_cache_dir) / f"{stem}.pdf"
+                repaired_pdf = Path(settings.mineru_repair_cache_dir) / f"{p.pdf_sha256 or stem}.pdf"
+                if not repaired_pdf.exists() and (Path(settings.mineru_repair_cache_dir) / f"{stem}.pdf").exists():
+                    repaired_pdf = Path(settings.mineru_repair_cache_dir) / f"{stem}.pdf"
 
                 # Only attempt repair on failure; keep original PDF untouched.
                 if not repaired_pdf.exists() or repaired_pdf.stat().st_size < 1024:
@@ -426,6 +451,10 @@ def run_mineru_for_pending(
                             meta={"tool": rr.tool, "output_pdf": str(repaired_pdf)},
                         )
                         print(f"PDF_REPAIR_OK: {p.external_id} tool={rr.tool} -> {repaired_pdf}")
+                        try:
+                            blob_store.put_file(session, repaired_pdf, kind="pdf_repaired")
+                        except OSError as e:
+                            print(f"WARN: blob store: {repaired_pdf}: {e}")
                     else:
                         record_paper_event(
                             session,
@@ -477,6 +506,12 @@ def run_mineru_for_pending(
                 session.add(p)
                 session.commit()
 
+                # Extracted figures repeat across papers/versions (logos, shared plots).
+                try:
+                    blob_store.put_tree(session, Path(res.md_path).parent / "images", kind="mineru_image")
+                except Exception as e:
+                    print(f"WARN: blob store: MinerU images of {p.external_id}: {e}")
+
                 meta = {"md_path": str(res.md_path)}
                 try:
                     from app.services.mineru_quality import measure_md_quality
@@ -593,26 +628,20 @@ def run_content_analysis_for_pending(
 
     langs = [x.strip().lower() for x in (settings.papertok_langs or ["zh"]) if x.strip()]
     langs = [x for x in langs if x in {"zh", "en"}] or ["zh"]
+    prog = job_progress()
 
     for lang0 in langs:
         stage = "explain_en" if lang0 == "en" else "explain"
-        explain_col = Paper.content_explain_en if lang0 == "en" else Paper.content_explain_cn
-
-        q = select(Paper).where(Paper.raw_text_path.is_not(None)).where(explain_col.is_(None))
-        if external_ids:
-            q = q.where(Paper.external_id.in_(external_ids))
-        elif day:
-            q = q.where(Paper.day == day)
-
-        rows = session.exec(q.order_by(Paper.id.asc()).limit(max_n)).all()
+        q = pending_explain_query(lang0, day=day, external_ids=external_ids)
+        rows = session.exec(q.limit(max_n)).all()
 
         if not rows:
             print(f"CONTENT_ANALYSIS[{lang0}]: nothing to do")
             continue
 
         # Concurrency: run LLM calls in parallel, then write results back in the main thread.
-        conc = int(getattr(settings, "content_analysis_concurrency", 1) or 1)
-        conc = max(1, min(conc, 16))
+        # The pool is sized to the AIMD max; the `llm` gate decides how many calls run.
+        conc = adaptive_limit("llm").max_limit
 
         items: list[tuple[int, str, str, str]] = []  # (paper_id, external_id, title, raw_text_path)
         by_id: dict[int, Paper] = {}
@@ -620,6 +649,7 @@ def run_content_analysis_for_pending(
             by_id[int(p.id)] = p
             record_paper_event(session, paper_id=p.id, stage=stage, status="started")
             items.append((int(p.id), str(p.external_id or ""), str(p.title or ""), str(p.raw_text_path or "")))
+        prog.add_total(len(items))
 
         def _task(it: tuple[int, str, str, str]) -> tuple[int, str | None, str | None]:
             pid, eid, title, raw_path = it
@@ -635,59 +665,63 @@ def run_content_analysis_for_pending(
         if conc <= 1 or len(items) <= 1:
             for it in items:
                 pid, eid, _, _ = it
+                prog.item(f"{eid} [{lang0}]")
                 try:
                     print(f"CONTENT_ANALYSIS[{lang0}]: {eid} -> generating...")
                     pid2, out, err = _task(it)
                     if err:
                         record_paper_event(session, paper_id=pid2, stage=stage, status="failed", error=err)
                         print(f"WARN: {err}")
+                        prog.failed()
                         continue
 
                     p = by_id.get(pid2)
                     if not p:
+                        prog.failed()
                         continue
-                    if lang0 == "en":
-                        p.content_explain_en = out
-                    else:
-                        p.content_explain_cn = out
+                    set_paper_content(session, pid2, **{explain_field(lang0): out})
 
                     p.updated_at = datetime.utcnow()
                     session.add(p)
                     session.commit()
                     record_paper_event(session, paper_id=pid2, stage=stage, status="success")
                     print(f"CONTENT_ANALYSIS_OK[{lang0}]: {eid}")
+                    prog.done()
                 except Exception as e:
                     record_paper_event(session, paper_id=pid, stage=stage, status="failed", error=str(e))
                     print(f"WARN: content analysis failed[{lang0}] for {eid}: {e}")
+                    prog.failed()
         else:
             print(f"CONTENT_ANALYSIS[{lang0}]: concurrency={conc} papers={len(items)}")
-            with ThreadPoolExecutor(max_workers=conc) as ex:
+            with ContextThreadPoolExecutor(max_workers=conc) as ex:
                 fut_map = {ex.submit(_task, it): it for it in items}
                 for fut in as_completed(fut_map):
                     pid, eid, _, _ = fut_map[fut]
+                    prog.item(f"{eid} [{lang0}]")
                     try:
                         pid2, out, err = fut.result()
                         if err:
                             record_paper_event(session, paper_id=pid2, stage=stage, status="failed", error=err)
                             print(f"WARN: {err}")
+                            prog.failed()
                             continue
 
                         p = by_id.get(pid2)
                         if not p:
+                            prog.failed()
                             continue
-                        if lang0 == "en":
-                            p.content_explain_en = out
-                        else:
-                            p.content_explain_cn = out
+                        set_paper_content(session, pid2, **{explain_field(lang0): out})
 
                         p.updated_at = datetime.utcnow()
                         session.add(p)
                         session.commit()
                         record_paper_event(session, paper_id=pid2, stage=stage, status="success")
                         print(f"CONTENT_ANALYSIS_OK[{lang0}]: {eid}")
+                        prog.done()
                     except Exception as e:
                         record_paper_event(session, paper_id=pid, stage=stage, status="failed", error=str(e))
                         print(f"WARN: content analysis failed[{lang0}] for {eid}: {e}")
+                        prog.failed()
 
 
 
@@ -888,15 +922,16 @@ def run_image_caption_for_pending(
 ) -> None:
     """Optionally caption MinerU extracted images with a VLM and cache to DB (zh/en).
 
-    Supports limited concurrency inside a single job via IMAGE_CAPTION_CONCURRENCY / settings.image_caption_concurrency.
+    Captions run concurrently under the adaptive `vlm` gate (app.services.adaptive_concurrency;
+    IMAGE_CAPTION_CONCURRENCY is its start value).
 
     Controlled by:
     - RUN_IMAGE_CAPTION=1
     - PAPERTOK_LANGS=zh,en
 
     Captions are stored separately:
-    - zh -> papers.image_captions_json
-    - en -> papers.image_captions_en_json
+    - zh -> paper_content.image_captions_json
+    - en -> paper_content.image_captions_en_json
     """
 
     if not settings.run_image_caption:
@@ -935,6 +970,9 @@ def run_image_caption_for_pending(
     langs = [x for x in langs if x in {"zh", "en"}] or ["zh"]
 
     done = 0
+    # Progress unit: one paper in one language (papers without missing captions count as done).
+    prog = job_progress()
+    prog.add_total(len(rows) * len(langs))
 
     for lang0 in langs:
         if done >= max_total:
@@ -946,6 +984,7 @@ def run_image_caption_for_pending(
             if done >= max_total:
                 break
 
+            prog.item(f"{p.external_id} [{lang0}]")
             md_path = Path(p.raw_text_path or "")
             img_dir = md_path.parent / "images"
 
@@ -957,23 +996,17 @@ def run_image_caption_for_pending(
             except Exception:
                 md_text = ""
             if not img_dir.exists() or not img_dir.is_dir():
+                prog.done()
                 continue
 
             # load existing captions by lang
-            captions: dict[str, str] = {}
-            raw_json = p.image_captions_en_json if lang0 == "en" else p.image_captions_json
-            if raw_json:
-                try:
-                    captions = json.loads(raw_json) or {}
-                    if not isinstance(captions, dict):
-                        captions = {}
-                except Exception:
-                    captions = {}
+            captions: dict[str, str] = content_json(get_paper_content(session, p.id), captions_field(lang0))
 
             # collect image files
             exts = {".jpg", ".jpeg", ".png", ".webp"}
             files = [fp for fp in sorted(img_dir.iterdir()) if fp.is_file() and fp.suffix.lower() in exts]
             if not files:
+                prog.done()
                 continue
 
             paper_added = 0
@@ -991,9 +1024,11 @@ def run_image_caption_for_pending(
                 todo.append((fp, url))
             
             if not todo:
+                prog.done()
                 continue
             
-            max_workers = max(1, int(getattr(settings, "image_caption_concurrency", 1) or 1))
+            # Sized to the AIMD max; the `vlm` gate decides how many captions run at once.
+            max_workers = adaptive_limit("vlm").max_limit
             
             # Schedule at most remaining quotas for this paper
             remaining_total = max(0, max_total - done)
@@ -1001,10 +1036,11 @@ def run_image_caption_for_pending(
             to_run = todo[: max(0, min(remaining_total, remaining_paper, len(todo)))]
             
             if not to_run:
+                prog.done()
                 continue
             
             futs = {}
-            with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            with ContextThreadPoolExecutor(max_workers=max_workers) as ex:
                 for fp, url in to_run:
                     try:
                         if not started_event:
@@ -1054,10 +1090,9 @@ def run_image_caption_for_pending(
                         done += 1
             
                         # Persist incrementally so UI can see progress while the job is still running.
-                        if lang0 == "en":
-                            p.image_captions_en_json = json.dumps(captions, ensure_ascii=False)
-                        else:
-                            p.image_captions_json = json.dumps(captions, ensure_ascii=False)
+                        set_paper_content(
+                            session, p.id, **{captions_field(lang0): json.dumps(captions, ensure_ascii=False)}
+                        )
                         p.updated_at = datetime.utcnow()
                         session.add(p)
                         session.commit()
@@ -1082,6 +1117,13 @@ def run_image_caption_for_pending(
                     meta={"added": paper_added, "images_total": len(files)},
                 )
                 print(f"IMAGE_CAPTION_OK[{lang0}]: {p.external_id} (+{paper_added}, total={done}/{max_total})")
+            if failed_event and paper_added == 0:
+                prog.failed()
+            else:
+                prog.done()
+
+    if done >= max_total:
+        prog.settle()
 
 
 
@@ -1103,18 +1145,6 @@ def build_paper_images_plan(
 
     explain = (explain or "").strip()
 
-    def _try_parse_json_array(text: str):
-        text = (text or "").strip()
-        try:
-            return json.loads(text)
-        except Exception:
-            # Try to recover from code fences / extra text.
-            l = text.find("[")
-            r = text.rfind("]")
-            if l != -1 and r != -1 and r > l:
-                return json.loads(text[l : r + 1])
-            raise
-
     lang0 = (lang or "zh").strip().lower()
     if lang0 not in {"zh", "en"}:
         lang0 = "zh"
@@ -1250,7 +1280,7 @@ def build_paper_images_plan(
         for attempt in range(1, 4):
             try:
                 text = openai_chat(user_prompt, settings.llm_model_text, system_prompt=system_prompt)
-                arr = _try_parse_json_array(text)
+                arr = _parse_json_array(text)
                 if not isinstance(arr, list) or len(arr) != n:
                     raise ValueError("plan is not an N-item list")
 
@@ -1357,17 +1387,16 @@ def run_paper_images_for_pending(
 
     target_n = max(1, int(settings.paper_images_per_paper))
     max_papers = max(1, int(settings.paper_images_max_papers))
+    prog = job_progress()
 
     for lang0 in langs:
         stage = "paper_images_en" if lang0 == "en" else "paper_images"
-        explain_col = Paper.content_explain_en if lang0 == "en" else Paper.content_explain_cn
-
         # Only generate images for papers that already have explanation in the target language.
         q = (
             select(Paper)
             .where(Paper.source == "hf_daily")
             .where(Paper.raw_text_path.is_not(None))
-            .where(explain_col.is_not(None))
+            .where(content_present(explain_field(lang0)))
         )
         if external_ids:
             q = q.where(Paper.external_id.in_(external_ids))
@@ -1401,7 +1430,10 @@ def run_paper_images_for_pending(
             print(f"PAPER_IMAGES[{lang0}]: nothing to do")
             continue
 
-        def _process_one(sess: Session, p: Paper) -> None:
+        def _process_one(sess: Session, p: Paper) -> bool:
+            """Returns False when some images failed or are still missing."""
+
+            prog.item(f"{p.external_id} [{lang0}]")
             record_paper_event(sess, paper_id=p.id, stage=stage, status="started")
 
             one_liner_txt = (p.one_liner_en or "").strip() if lang0 == "en" else (p.one_liner or "").strip()
@@ -1409,7 +1441,7 @@ def run_paper_images_for_pending(
                 # fallback to whichever exists
                 one_liner_txt = (p.one_liner or p.one_liner_en or "").strip()
 
-            explain_txt = p.content_explain_en if lang0 == "en" else p.content_explain_cn
+            explain_txt = content_value(get_paper_content(sess, p.id), explain_field(lang0))
 
             plan = build_paper_images_plan(
                 title=p.title,
@@ -1527,24 +1559,26 @@ def run_paper_images_for_pending(
                         )
 
                         if prov == "seedream":
-                            res = seedream_generate_image(
-                                prompt=prompt,
-                                size=size,
-                                out_path=tmp_path,
-                                negative_prompt=img.negative_prompt,
-                                watermark=False,
-                            )
+                            with adaptive_call("image"):
+                                res = seedream_generate_image(
+                                    prompt=prompt,
+                                    size=size,
+                                    out_path=tmp_path,
+                                    negative_prompt=img.negative_prompt,
+                                    watermark=False,
+                                )
                             sha = res.sha256
                             remote_url = res.remote_url
                             local_path = res.local_path
                         else:
                             # GLM-Image does not support negative_prompt; ignore it.
-                            res2 = glm_image_generate(
-                                prompt=prompt,
-                                size=size,
-                                out_path=tmp_path,
-                                watermark=False,
-                            )
+                            with adaptive_call("image"):
+                                res2 = glm_image_generate(
+                                    prompt=prompt,
+                                    size=size,
+                                    out_path=tmp_path,
+                                    watermark=False,
+                                )
                             sha = res2.sha256
                             remote_url = res2.remote_url
                             local_path = res2.local_path
@@ -1560,6 +1594,11 @@ def run_paper_images_for_pending(
                             final_path = local_path
                             final_name = tmp_name
 
+                        try:
+                            blob_store.put_file(sess, final_path, kind="generated_image", sha256=sha, commit=False)
+                        except OSError as e:
+                            print(f"WARN: blob store: {final_path}: {e}")
+
                         img.local_path = str(final_path)
                         img.url_path = f"{mount_prefix}/{rel_dir}/{final_name}"
                         img.sha256 = sha
@@ -1591,9 +1630,9 @@ def run_paper_images_for_pending(
                         )
 
             # Per-paper summary event (success if all providers reached target_n without failures).
+            any_failed = False
             try:
                 summary = {}
-                any_failed = False
                 for prov in enabled:
                     rows2 = sess.exec(
                         select(PaperImage)
@@ -1618,73 +1657,534 @@ def run_paper_images_for_pending(
                 )
             except Exception:
                 pass
-        conc = int(getattr(settings, "paper_images_concurrency", 1) or 1)
-        conc = max(1, min(conc, 16))
+            return not any_failed
+
+        prog.add_total(len(picked))
+        # Sized to the AIMD max; the `image` gate decides how many generations run at once.
+        conc = adaptive_limit("image").max_limit
         if conc <= 1 or len(picked) <= 1:
             for p in picked:
-                _process_one(session, p)
+                try:
+                    ok = _process_one(session, p)
+                except Exception:
+                    prog.failed()
+                    raise
+                if ok:
+                    prog.done()
+                else:
+                    prog.failed()
         else:
             print(f"PAPER_IMAGES[{lang0}]: concurrency={conc} papers={len(picked)} providers={enabled}")
             ids = [int(p.id) for p in picked]
-            def _worker(pid: int) -> None:
+            def _worker(pid: int) -> bool:
                 with Session(engine) as sess2:
                     p2 = sess2.get(Paper, pid)
                     if not p2:
-                        return
-                    _process_one(sess2, p2)
-            with ThreadPoolExecutor(max_workers=conc) as ex:
+                        return False
+                    return _process_one(sess2, p2)
+            with ContextThreadPoolExecutor(max_workers=conc) as ex:
                 futs = [ex.submit(_worker, pid) for pid in ids]
                 for fut in as_completed(futs):
                     try:
-                        fut.result()
+                        ok = fut.result()
                     except Exception as e:
+                        ok = False
                         print(f"WARN: PAPER_IMAGES worker failed: {e}")
+                    if ok:
+                        prog.done()
+                    else:
+                        prog.failed()
 
 
 
 
-def upsert_paper(session: Session, item: dict[str, Any], *, day: str | None) -> Paper:
-    # The HF daily_papers object shape may evolve; store raw JSON too.
-    paper_obj = item.get("paper", {}) or {}
+def fetch_paper_pdf(session: Session, p: Paper) -> tuple[str, str, str]:
+    """download_pdf() with the blob store in front: a PDF whose sha256 is known is
+    restored from the store instead of downloaded again, and a fetched PDF is adopted
+    into the store. Returns (pdf_url, pdf_path, sha256)."""
 
-    title = paper_obj.get("title") or item.get("title") or ""
-    external_id = paper_obj.get("id") or item.get("id") or title
+    path = pdf_path_for(p.external_id)
+    if p.pdf_sha256 and not os.path.exists(path):
+        if blob_store.restore_view(session, p.pdf_sha256, path, kind="pdf"):
+            return arxiv_pdf_url(p.external_id), path, p.pdf_sha256
 
-    # Prefer HF paper page; fall back to arXiv abs
-    url = item.get("url") or paper_obj.get("url")
-    if not url and external_id:
-        url = f"https://huggingface.co/papers/{external_id}"
+    pdf_url, pdf_path, pdf_sha = download_pdf(p.external_id, known_sha256=p.pdf_sha256)
+    # A PDF that was already on disk comes back without a hash; pass the recorded one
+    # (put_file only trusts it when the file already is that blob's view, and returns
+    # the verified hash) or leave it to the background hasher.
+    pdf_sha = pdf_sha or p.pdf_sha256 or ""
+    if pdf_sha:
+        try:
+            pdf_sha = blob_store.put_file(session, pdf_path, kind="pdf", sha256=pdf_sha) or pdf_sha
+        except OSError as e:
+            print(f"WARN: blob store: {pdf_path}: {e}")
+    return pdf_url, pdf_path, pdf_sha
 
-    thumbnail_url = item.get("thumbnail") or paper_obj.get("thumbnail")
 
-    existing = session.exec(
-        select(Paper).where(
-            Paper.source == "hf_daily", Paper.external_id == str(external_id)
-        )
-    ).first()
-
-    if existing:
-        p = existing
-        p.title = title or p.title
-        p.url = url or p.url
-        p.thumbnail_url = thumbnail_url or p.thumbnail_url
-        if day:
-            p.day = day
-        p.meta_json = json.dumps(item, ensure_ascii=False)
+def download_pdf_for_paper(session: Session, p: Paper) -> None:
+    """Download the arXiv PDF of one paper and record the `pdf` stage."""
+
+    if not (settings.download_pdf and p.external_id):
+        return
+    try:
+        record_paper_event(session, paper_id=p.id, stage="pdf", status="started")
+        pdf_url, pdf_path, pdf_sha = fetch_paper_pdf(session, p)
+        p.pdf_url = pdf_url
+        p.pdf_path = pdf_path
+        if pdf_sha:
+            p.pdf_sha256 = pdf_sha
         p.updated_at = datetime.utcnow()
-        return p
-
-    p = Paper(
-        source="hf_daily",
-        external_id=str(external_id),
-        day=day,
-        title=title,
-        url=url,
-        thumbnail_url=thumbnail_url,
-        meta_json=json.dumps(item, ensure_ascii=False),
+        session.add(p)
+        session.commit()
+        record_paper_event(
+            session,
+            paper_id=p.id,
+            stage="pdf",
+            status="success",
+            meta={"pdf_path": pdf_path},
+        )
+    except Exception as e:
+        record_paper_event(
+            session,
+            paper_id=p.id,
+            stage="pdf",
+            status="failed",
+            error=str(e),
+        )
+        print(f"WARN: failed to download PDF for {p.external_id}: {e}")
+
+
+def _one_liner_langs() -> list[str]:
+    langs = [x.strip().lower() for x in (settings.papertok_langs or ["zh"]) if x.strip()]
+    return [x for x in langs if x in {"zh", "en"}] or ["zh"]
+
+
+def one_liner_rows(
+    session: Session, *, day: str | None = None, external_ids: list[str] | None = None, max_n: int | None = None
+) -> list[Paper]:
+    """Papers that need a one-liner (or a rewrite from MinerU if enabled)."""
+
+    langs = _one_liner_langs()
+    if settings.rewrite_one_liner_from_mineru:
+        from datetime import timedelta
+
+        cutoff = datetime.utcnow() - timedelta(minutes=int(settings.rewrite_one_liner_skip_recent_minutes))
+        q = (
+            select(Paper)
+            .where(Paper.source == "hf_daily")
+            .where(Paper.raw_text_path.is_not(None))
+            .where(Paper.updated_at < cutoff)
+        )
+        if external_ids:
+            q = q.where(Paper.external_id.in_(external_ids))
+        elif day:
+            q = q.where(Paper.day == day)
+
+        limit = int(settings.rewrite_one_liner_max) if max_n is None else max_n
+        rows = session.exec(q.order_by(Paper.id.asc()).limit(limit)).all()
+        print(
+            "ONE_LINER: rewrite enabled -> "
+            f"candidates={len(rows)} cutoff_utc={cutoff.isoformat()} langs={langs}"
+        )
+        return list(rows)
+
+    need = []
+    if "zh" in langs:
+        need.append(Paper.one_liner.is_(None))
+    if "en" in langs:
+        need.append(Paper.one_liner_en.is_(None))
+
+    q = select(Paper).where(Paper.source == "hf_daily").where(or_(*need))
+    if external_ids:
+        q = q.where(Paper.external_id.in_(external_ids))
+    elif day:
+        q = q.where(Paper.day == day)
+
+    limit = int(settings.one_liner_max) if max_n is None else max_n
+    return list(session.exec(q.order_by(Paper.id.asc()).limit(limit)).all())
+
+
+def _one_liner_abstract(meta: dict, raw_text_path: str | None) -> str | None:
+    hf_abstract = (
+        meta.get("paper", {}).get("summary")
+        or meta.get("paper", {}).get("abstract")
+        or meta.get("summary")
+        or meta.get("abstract")
     )
-    session.add(p)
-    return p
+
+    mineru_abstract = None
+    if settings.one_liner_prefer_mineru and raw_text_path:
+        try:
+            md_path = Path(raw_text_path)
+            if md_path.exists():
+                md_text = md_path.read_text(encoding="utf-8", errors="ignore")
+                md_text = md_text[: int(settings.one_liner_mineru_input_chars)]
+                mineru_abstract = _extract_abstract_from_mineru_markdown(md_text)
+        except Exception:
+            mineru_abstract = None
+
+    return mineru_abstract or (hf_abstract if isinstance(hf_abstract, str) else None)
+
+
+def _one_liner_task(
+    lang0: str, papers: list[tuple[int, str, str | None]]
+) -> tuple[dict[int, str], dict[int, Exception], int]:
+    """One-liners of `papers` (paper_id, title, abstract) in one language.
+
+    Several papers go out as one batched request first; papers it did not answer (or
+    all of them, if it failed) get a request of their own. Returns (texts, errors,
+    number of requests).
+    """
+
+    texts: dict[int, str] = {}
+    errors: dict[int, Exception] = {}
+    requests = 0
+    if len(papers) > 1:
+        requests += 1
+        try:
+            got = build_one_liners_batch([(str(pid), title, abstract) for pid, title, abstract in papers], lang=lang0)
+            texts = {int(k): v for k, v in got.items()}
+        except Exception as e:
+            print(f"WARN: ONE_LINER batch[{lang0}] of {len(papers)} failed, one request per paper instead: {e}")
+
+    for pid, title, abstract in papers:
+        if pid in texts:
+            continue
+        requests += 1
+        try:
+            texts[pid] = build_one_liner(title, abstract, lang=lang0)
+        except Exception as e:
+            errors[pid] = e
+    return texts, errors, requests
+
+
+def generate_one_liners(
+    session: Session, rows: list[Paper], *, rewrite: bool | None = None, stop_on_error: bool = True
+) -> dict[str, int]:
+    """Generate the missing one-liners of `rows` (zh/en per PAPERTOK_LANGS).
+
+    Requests run concurrently (at most ONE_LINER_CONCURRENCY, under the adaptive `llm`
+    gate); with ONE_LINER_BATCH > 1 one request covers several papers (JSON output).
+    Results are written every ONE_LINER_WRITE_BATCH papers in one transaction, while
+    the next chunk is already being generated.
+
+    `rewrite` (default: REWRITE_ONE_LINER_FROM_MINERU) regenerates existing zh
+    one-liners. With `stop_on_error` no new chunk starts after a failure and the first
+    error is raised once the running ones are written; otherwise failures are
+    recorded and the rest continues. Returns counts (papers, failed, requests).
+    """
+
+    langs = _one_liner_langs()
+    if rewrite is None:
+        rewrite = bool(settings.rewrite_one_liner_from_mineru)
+
+    # Parse raw HF meta up-front (one batched read).
+    metas = {pid: content_json(c, "meta_json") for pid, c in load_paper_contents(session, [p.id for p in rows]).items()}
+
+    # Plain snapshot: rows expire on commit and are never touched from worker threads.
+    todo: list[tuple[int, str, str, str | None, list[str]]] = []
+    for p in rows:
+        todo_langs: list[str] = []
+        if "zh" in langs and (rewrite or p.one_liner is None):
+            todo_langs.append("zh")
+        if "en" in langs and (p.one_liner_en is None):
+            todo_langs.append("en")
+        if todo_langs:
+            todo.append((int(p.id), str(p.external_id or ""), str(p.title or ""), p.raw_text_path, todo_langs))
+
+    stats = {"papers": 0, "failed": 0, "requests": 0}
+    if not todo:
+        return stats
+
+    conc = max(1, min(int(settings.one_liner_concurrency), adaptive_limit("llm").max_limit))
+    per_request = max(1, int(settings.one_liner_batch))
+    chunk_n = max(1, int(settings.one_liner_write_batch))
+    prog = job_progress()
+    prog.add_total(len(todo))
+    first_error: list[Exception] = []
+    t0 = time.perf_counter()
+
+    def _stage(lang0: str) -> str:
+        return "one_liner_en" if lang0 == "en" else "one_liner"
+
+    def _submit(ex: ContextThreadPoolExecutor, chunk: list[tuple[int, str, str, str | None, list[str]]]):
+        papers = []
+        for pid, eid, title, raw_text_path, todo_langs in chunk:
+            papers.append((pid, eid, title, _one_liner_abstract(metas.get(pid) or {}, raw_text_path), todo_langs))
+            for lang0 in todo_langs:
+                record_paper_event(session, paper_id=pid, stage=_stage(lang0), status="started", commit=False)
+        session.commit()
+        prog.item(papers[0][1])
+
+        futs = []
+        for lang0 in langs:
+            group = [(pid, title, abstract) for pid, _, title, abstract, todo_langs in papers if lang0 in todo_langs]
+            for i in range(0, len(group), per_request):
+                futs.append((lang0, ex.submit(_one_liner_task, lang0, group[i : i + per_request])))
+        return papers, futs
+
+    def _write(papers, futs) -> None:
+        texts: dict[int, dict[str, str]] = {}
+        errors: dict[int, dict[str, Exception]] = {}
+        for lang0, fut in futs:
+            ok, bad, n = fut.result()
+            stats["requests"] += n
+            for pid, text in ok.items():
+                # build_one_liner returns the raw completion; store it trimmed (both paths).
+                texts.setdefault(pid, {})[lang0] = (text or "").strip()
+            for pid, e in bad.items():
+                errors.setdefault(pid, {})[lang0] = e
+
+        now = datetime.utcnow()
+        for pid, _, _, _, _ in papers:
+            got = texts.get(pid)
+            if not got:
+                continue
+            values: dict[str, Any] = {
+                "display_title": func.coalesce(Paper.display_title, Paper.title),
+                "updated_at": now,
+            }
+            if "zh" in got:
+                values["one_liner"] = got["zh"]
+            if "en" in got:
+                values["one_liner_en"] = got["en"]
+            session.execute(update(Paper).where(Paper.id == pid).values(**values))
+            for lang0 in got:
+                record_paper_event(session, paper_id=pid, stage=_stage(lang0), status="success", commit=False)
+        session.commit()
+
+        for pid, eid, _, _, _ in papers:
+            for lang0, e in (errors.get(pid) or {}).items():
+                record_paper_event(session, paper_id=pid, stage=_stage(lang0), status="failed", error=str(e))
+                print(f"WARN: ONE_LINER failed[{lang0}] for {eid}: {e}")
+                if not first_error:
+                    first_error.append(e)
+            got = texts.get(pid) or {}
+            if got:
+                print(f"ONE_LINER_OK: {eid}" + "".join(f" {k}={v[:60].strip()}" for k, v in got.items()))
+            if pid in errors:
+                stats["failed"] += 1
+                prog.failed()
+            else:
+                stats["papers"] += 1
+                prog.done()
+
+    ex = ContextThreadPoolExecutor(max_workers=conc)
+    try:
+        # Two chunks in flight: the pool keeps working on the next one while a chunk is written.
+        inflight: list = []
+        for i in range(0, len(todo), chunk_n):
+            if first_error and stop_on_error:
+                break
+            inflight.append(_submit(ex, todo[i : i + chunk_n]))
+            if len(inflight) >= 2:
+                _write(*inflight.pop(0))
+        while inflight:
+            _write(*inflight.pop(0))
+    except BaseException:
+        ex.shutdown(wait=False, cancel_futures=True)
+        raise
+    ex.shutdown()
+
+    print(
+        f"ONE_LINER_DONE: papers={stats['papers']} failed={stats['failed']} requests={stats['requests']} "
+        f"concurrency={conc} batch={per_request} wall_s={time.perf_counter() - t0:.1f}"
+    )
+    if first_error and stop_on_error:
+        raise first_error[0]
+    return stats
+
+
+# Streaming daily pipeline: stages in the order a paper passes through them. The
+# one-liner runs right after MinerU (it prefers the parsed abstract) so the card has
+# its text before the slower explain/caption/image stages.
+STREAM_STAGES: tuple[str, ...] = ("pdf", "mineru", "one_liner", "explain", "caption", "paper_images")
+
+_STREAM_DONE = object()
+
+
+def stream_stage_concurrency() -> dict[str, int]:
+    """Parse DAILY_STAGE_CONCURRENCY (`stage=n,...`); unlisted stages get one worker."""
+
+    limits = {stage: 1 for stage in STREAM_STAGES}
+    for part in (settings.daily_stage_concurrency or "").split(","):
+        name, _, n = part.partition("=")
+        name = name.strip().lower()
+        if name not in limits:
+            continue
+        try:
+            limits[name] = max(1, min(int(n), 16))
+        except ValueError:
+            continue
+    return limits
+
+
+class _StageBudget:
+    """Run-wide quota of a stage (the *_MAX settings), shared by its workers."""
+
+    def __init__(self, n: int) -> None:
+        self.left = max(0, int(n))
+        self._lock = threading.Lock()
+
+    def take(self, n: int = 1) -> int:
+        with self._lock:
+            got = min(self.left, max(0, n))
+            self.left -= got
+            return got
+
+    def refund(self, n: int) -> None:
+        if n > 0:
+            with self._lock:
+                self.left += n
+
+
+def _caption_count(session: Session, paper_id: int, langs: list[str]) -> int:
+    c = get_paper_content(session, paper_id)
+    return sum(len(content_json(c, captions_field(lang0))) for lang0 in langs)
+
+
+def run_streaming_pipeline(external_ids: list[str], *, one_liner: bool) -> dict[str, Any]:
+    """Run the per-paper stages with each paper flowing through them independently.
+
+    Every stage has its own worker threads (DAILY_STAGE_CONCURRENCY) and hands papers
+    to the next stage through a bounded queue (DAILY_STAGE_QUEUE_MAX), so the first
+    paper can be fully processed while later ones are still downloading, and a slow
+    stage applies back-pressure instead of piling up work. Stage functions are the
+    same as in barrier mode, called with `external_ids=[eid]`; the run-wide quotas
+    (MINERU_MAX, CONTENT_ANALYSIS_MAX, IMAGE_CAPTION_MAX, PAPER_IMAGES_MAX_PAPERS,
+    ONE_LINER_MAX) are shared budgets across the stage's workers.
+
+    A stage that raises (e.g. one-liner generation) does not stop
+    the other papers; the first such error is re-raised once the queues have drained,
+    so the run fails as it would in barrier mode.
+    """
+
+    stages = [s for s in STREAM_STAGES if one_liner or s != "one_liner"]
+    conc = stream_stage_concurrency()
+    qmax = max(1, int(settings.daily_stage_queue_max))
+    queues = [queue.Queue(maxsize=qmax) for _ in stages]
+    out_q: queue.Queue = queue.Queue()
+    langs = _one_liner_langs()
+
+    budgets = {
+        "mineru": _StageBudget(settings.mineru_max),
+        "one_liner": _StageBudget(
+            settings.rewrite_one_liner_max if settings.rewrite_one_liner_from_mineru else settings.one_liner_max
+        ),
+        "explain": _StageBudget(settings.content_analysis_max),
+        "caption": _StageBudget(settings.image_caption_max),
+        "paper_images": _StageBudget(settings.paper_images_max_papers),
+    }
+    per_paper_captions = max(1, int(settings.image_caption_per_paper)) * len(langs)
+
+    lock = threading.Lock()
+    exited = [0] * len(stages)
+    first_error: list[Exception] = []
+    busy_s = {s: 0.0 for s in stages}
+    t0 = time.perf_counter()
+
+    def _process(session: Session, stage: str, eid: str) -> None:
+        p = session.exec(select(Paper).where(Paper.external_id == eid)).first()
+        if p is None:
+            return
+        ids = [eid]
+        if stage == "pdf":
+            download_pdf_for_paper(session, p)
+        elif stage == "mineru":
+            if p.pdf_path and not p.raw_text_path and budgets["mineru"].take():
+                run_mineru_for_pending(session, external_ids=ids)
+        elif stage == "one_liner":
+            rows = one_liner_rows(session, external_ids=ids, max_n=1)
+            if rows and budgets["one_liner"].take():
+                generate_one_liners(session, rows)
+        elif stage == "explain":
+            if p.raw_text_path and budgets["explain"].take():
+                run_content_analysis_for_pending(session, external_ids=ids)
+        elif stage == "caption":
+            if not p.raw_text_path:
+                return
+            got = budgets["caption"].take(per_paper_captions)
+            if not got:
+                return
+            before = _caption_count(session, p.id, langs)
+            try:
+                with settings_scope():
+                    settings.image_caption_max = got
+                    run_image_caption_for_pending(session, external_ids=ids)
+            finally:
+                session.expire_all()
+                budgets["caption"].refund(got - max(0, _caption_count(session, p.id, langs) - before))
+        elif stage == "paper_images":
+            if p.raw_text_path and budgets["paper_images"].take():
+                run_paper_images_for_pending(session, external_ids=ids)
+
+    def _worker(i: int) -> None:
+        stage = stages[i]
+        nxt = queues[i + 1] if i + 1 < len(stages) else out_q
+        try:
+            with Session(engine) as session:
+                while True:
+                    eid = queues[i].get()
+                    if eid is _STREAM_DONE:
+                        break
+                    t = time.perf_counter()
+                    try:
+                        _process(session, stage, eid)
+                    except Exception as e:
+                        session.rollback()
+                        print(f"WARN: PIPELINE[{stage}] {eid} failed: {e}")
+                        with lock:
+                            if not first_error:
+                                first_error.append(e)
+                    finally:
+                        session.expunge_all()
+                    with lock:
+                        busy_s[stage] += time.perf_counter() - t
+                    # Later stages gate on their own inputs, so a paper always moves on.
+                    nxt.put(eid)
+        finally:
+            with lock:
+                exited[i] += 1
+                last = exited[i] == conc[stage]
+            if last:
+                for _ in range(conc[stages[i + 1]] if i + 1 < len(stages) else 1):
+                    nxt.put(_STREAM_DONE)
+
+    print(
+        f"PIPELINE_STREAM: papers={len(external_ids)} stages={stages} "
+        f"concurrency={ {s: conc[s] for s in stages} } queue_max={qmax}"
+    )
+
+    first_s: float | None = None
+    finished = 0
+    with ContextThreadPoolExecutor(max_workers=sum(conc[s] for s in stages)) as ex:
+        futs = [ex.submit(_worker, i) for i, s in enumerate(stages) for _ in range(conc[s])]
+        for eid in external_ids:
+            queues[0].put(eid)
+        for _ in range(conc[stages[0]]):
+            queues[0].put(_STREAM_DONE)
+
+        while True:
+            eid = out_q.get()
+            if eid is _STREAM_DONE:
+                break
+            finished += 1
+            dt = time.perf_counter() - t0
+            first_s = dt if first_s is None else first_s
+            print(f"PIPELINE_PAPER_DONE: {eid} t={dt:.1f}s ({finished}/{len(external_ids)})")
+        for f in futs:
+            f.result()
+
+    stats = {
+        "papers": finished,
+        "first_paper_s": round(first_s, 1) if first_s is not None else None,
+        "wall_s": round(time.perf_counter() - t0, 1),
+        "busy_s": {s: round(v, 1) for s, v in busy_s.items()},
+    }
+    print(f"PIPELINE_STREAM_DONE: {json.dumps(stats, ensure_ascii=False)}")
+    if first_error:
+        raise first_error[0]
+    return stats
 
 
 def main():
@@ -1701,49 +2201,16 @@ def main():
     else:
         print("HF_TOP_N=0 -> skipping HuggingFace fetch")
 
-    with Session(engine) as session:
-        active_external_ids: set[str] = set()
-
-        for item in items:
-            p = upsert_paper(session, item, day=effective_date)
-
-            # Ensure p.id is available before writing paper_events.
-            session.add(p)
-            session.commit()
-            session.refresh(p)
-
-            if p.external_id:
-                active_external_ids.add(str(p.external_id))
-
-            if settings.download_pdf and p.external_id:
-                try:
-                    record_paper_event(session, paper_id=p.id, stage="pdf", status="started")
-                    pdf_url, pdf_path, pdf_sha = download_pdf(p.external_id)
-                    p.pdf_url = pdf_url
-                    p.pdf_path = pdf_path
-                    if pdf_sha:
-                        p.pdf_sha256 = pdf_sha
-                    p.updated_at = datetime.utcnow()
-                    session.add(p)
-                    session.commit()
-                    record_paper_event(
-                        session,
-                        paper_id=p.id,
-                        stage="pdf",
-                        status="success",
-                        meta={"pdf_path": pdf_path},
-                    )
-                except Exception as e:
-                    record_paper_event(
-                        session,
-                        paper_id=p.id,
-                        stage="pdf",
-                        status="failed",
-                        error=str(e),
-                    )
-                    print(f"WARN: failed to download PDF for {p.external_id}: {e}")
+    # `SKIP_LLM` historically only meant: skip the *one-liner* stage.
+    # We keep that behavior for existing ops scripts, but allow running one-liners
+    # in isolation via RUN_ONE_LINER=1.
+    run_one_liners = not (settings.skip_llm and not settings.run_one_liner)
 
+    with Session(engine) as session:
+        # One transaction for the whole payload (ids are needed before writing paper_events).
+        ids = bulk_upsert_hf_papers(session, [(effective_date, items)])
         session.commit()
+        active_external_ids: set[str] = set(ids)
 
         # Note: we do NOT clear old days. Daily job only *processes* the fetched Top10,
         # while the feed can show full history.
@@ -1752,17 +2219,39 @@ def main():
         active_day = effective_date if settings.hf_top_n > 0 else None
         active_ids = sorted(active_external_ids) if settings.hf_top_n > 0 else None
 
-        # Optional: PDF -> markdown + images via mineru (heavy, controlled by env flags).
-        run_mineru_for_pending(session, day=active_day, external_ids=active_ids)
+        # Streaming needs a known set of papers; an unscoped run (HF_TOP_N=0) sweeps
+        # the whole DB stage by stage.
+        streaming = (settings.daily_pipeline or "").strip().lower() == "stream" and bool(active_ids)
 
-        # Optional: markdown -> Chinese teaching-style explanation (LLM)
-        run_content_analysis_for_pending(session, day=active_day, external_ids=active_ids)
+        if streaming:
+            # Fetch order (HF rank), not id order: the top papers become visible first.
+            order = [hf_item_fields(item)["external_id"] for item in items]
+            run_streaming_pipeline(
+                list(dict.fromkeys(order)),
+                one_liner=run_one_liners and bool(settings.openai_api_key),
+            )
+        else:
+            # PDFs in parallel (DAILY_STAGE_CONCURRENCY pdf=; the downloader caps transfers per host).
+            def _download(pid: int) -> None:
+                with Session(engine) as s0:
+                    download_pdf_for_paper(s0, s0.get(Paper, pid))
+
+            pids = [ids[hf_item_fields(item)["external_id"]] for item in items]
+            with ContextThreadPoolExecutor(max_workers=stream_stage_concurrency()["pdf"]) as ex:
+                list(ex.map(_download, pids))
+            session.expire_all()
+
+            # Optional: PDF -> markdown + images via mineru (heavy, controlled by env flags).
+            run_mineru_for_pending(session, day=active_day, external_ids=active_ids)
 
-        # Optional: MinerU images -> captions (VLM)
-        run_image_caption_for_pending(session, day=active_day, external_ids=active_ids)
+            # Optional: markdown -> Chinese teaching-style explanation (LLM)
+            run_content_analysis_for_pending(session, day=active_day, external_ids=active_ids)
 
-        # Optional: generated illustrations (Seedream / GLM-Image)
-        run_paper_images_for_pending(session, day=active_day, external_ids=active_ids)
+            # Optional: MinerU images -> captions (VLM)
+            run_image_caption_for_pending(session, day=active_day, external_ids=active_ids)
+
+            # Optional: generated illustrations (Seedream / GLM-Image)
+            run_paper_images_for_pending(session, day=active_day, external_ids=active_ids)
 
         # Optional: build EPUBs (pandoc)
         if settings.run_epub:
@@ -1787,10 +2276,16 @@ def main():
             except Exception as e:
                 print(f"WARN: EPUB_DAILY failed: {e}")
 
-        # `SKIP_LLM` historically only meant: skip the *one-liner* stage.
-        # We keep that behavior for existing ops scripts, but allow running one-liners
-        # in isolation via RUN_ONE_LINER=1.
-        if settings.skip_llm and not settings.run_one_liner:
+        # Optional: roll up + prune aged paper_events/jobs and release free pages.
+        if settings.run_db_retention:
+            try:
+                from app.services.retention import run_retention
+
+                print(f"DB_RETENTION: {json.dumps(run_retention(), ensure_ascii=False)}")
+            except Exception as e:
+                print(f"WARN: DB_RETENTION failed: {e}")
+
+        if not run_one_liners:
             print("SKIP_LLM=1 -> ingest done; skipping one-liner generation")
             return
 
@@ -1799,88 +2294,11 @@ def main():
                 "OPENAI_API_KEY is empty. Put it in papertok/.env (do NOT commit)."
             )
 
-        langs = [x.strip().lower() for x in (settings.papertok_langs or ["zh"]) if x.strip()]
-        langs = [x for x in langs if x in {"zh", "en"}] or ["zh"]
+        if streaming:
+            return
 
         # generate one-liners for those missing (or rewrite from MinerU if enabled)
-        if settings.rewrite_one_liner_from_mineru:
-            from datetime import timedelta
-
-            cutoff = datetime.utcnow() - timedelta(minutes=int(settings.rewrite_one_liner_skip_recent_minutes))
-            q = (
-                select(Paper)
-                .where(Paper.source == "hf_daily")
-                .where(Paper.raw_text_path.is_not(None))
-                .where(Paper.updated_at < cutoff)
-            )
-            if active_ids:
-                q = q.where(Paper.external_id.in_(active_ids))
-            elif active_day:
-                q = q.where(Paper.day == active_day)
-
-            rows = session.exec(q.order_by(Paper.id.asc()).limit(int(settings.rewrite_one_liner_max))).all()
-            print(
-                "ONE_LINER: rewrite enabled -> "
-                f"candidates={len(rows)} cutoff_utc={cutoff.isoformat()} langs={langs}"
-            )
-        else:
-            need = []
-            if "zh" in langs:
-                need.append(Paper.one_liner.is_(None))
-            if "en" in langs:
-                need.append(Paper.one_liner_en.is_(None))
-
-            q = select(Paper).where(Paper.source == "hf_daily").where(or_(*need))
-            if active_ids:
-                q = q.where(Paper.external_id.in_(active_ids))
-            elif active_day:
-                q = q.where(Paper.day == active_day)
-
-            rows = session.exec(q.order_by(Paper.id.asc()).limit(int(settings.one_liner_max))).all()
-
-        for p in rows:
-            meta = json.loads(p.meta_json) if p.meta_json else {}
-            hf_abstract = (
-                meta.get("paper", {}).get("summary")
-                or meta.get("paper", {}).get("abstract")
-                or meta.get("summary")
-                or meta.get("abstract")
-            )
-
-            mineru_abstract = None
-            if settings.one_liner_prefer_mineru and p.raw_text_path:
-                try:
-                    md_path = Path(p.raw_text_path)
-                    if md_path.exists():
-                        md_text = md_path.read_text(encoding="utf-8", errors="ignore")
-                        md_text = md_text[: int(settings.one_liner_mineru_input_chars)]
-                        mineru_abstract = _extract_abstract_from_mineru_markdown(md_text)
-                except Exception:
-                    mineru_abstract = None
-
-            abstract = mineru_abstract or (hf_abstract if isinstance(hf_abstract, str) else None)
-
-            changed = False
-            if "zh" in langs and (settings.rewrite_one_liner_from_mineru or p.one_liner is None):
-                p.one_liner = build_one_liner(p.title, abstract, lang="zh")
-                changed = True
-
-            if "en" in langs and (p.one_liner_en is None):
-                p.one_liner_en = build_one_liner(p.title, abstract, lang="en")
-                changed = True
-
-            if changed:
-                p.display_title = p.display_title or p.title
-                p.updated_at = datetime.utcnow()
-                session.add(p)
-                session.commit()
-
-                msg = f"ONE_LINER_OK: {p.external_id}"
-                if "zh" in langs:
-                    msg += f" zh={((p.one_liner or '')[:60]).strip()}"
-                if "en" in langs:
-                    msg += f" en={((p.one_liner_en or '')[:60]).strip()}"
-                print(msg)
+        generate_one_liners(session, one_liner_rows(session, day=active_day, external_ids=active_ids))
 
 
 if __name__ == "__main__":
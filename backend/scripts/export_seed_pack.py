@@ -108,14 +108,15 @@ def main() -> None:
     # Pick top 10 processed papers for that earliest day.
     cur.execute(
         """
-        SELECT id, external_id, title, COALESCE(display_title, title) AS display_title,
-               one_liner, content_explain_cn, url, day
-        FROM papers
-        WHERE source='hf_daily'
-          AND day = ?
-          AND one_liner IS NOT NULL
-          AND content_explain_cn IS NOT NULL
-        ORDER BY id ASC
+        SELECT p.id, p.external_id, p.title, COALESCE(p.display_title, p.title) AS display_title,
+               p.one_liner, c.content_explain_cn, p.url, p.day
+        FROM papers p
+        JOIN paper_content c ON c.paper_id = p.id
+        WHERE p.source='hf_daily'
+          AND p.day = ?
+          AND p.one_liner IS NOT NULL
+          AND c.content_explain_cn IS NOT NULL
+        ORDER BY p.id ASC
         LIMIT 10
         """,
         (min_day,),
@@ -0,0 +1,76 @@
+"""Backfill HF Daily Papers metadata for a range of days (ingest only).
+
+Fetches each day's payload (a few in parallel), then upserts all of them in one
+transaction via bulk_upsert_hf_papers. PDFs / MinerU / LLM stages are left to
+daily_run (HF_DATE=...) or the job queue.
+
+Run:
+  cd papertok/backend
+  .venv/bin/python -m scripts.hf_backfill_days --start 2026-01-01 --end 2026-01-31
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any
+
+from sqlmodel import Session
+
+from app.db.engine import engine
+from app.db.init_db import init_db
+from app.services.paper_ingest import bulk_upsert_hf_papers
+from scripts.daily_run import fetch_hf_daily
+
+
+def _days(start: str, end: str) -> list[str]:
+    d0, d1 = date.fromisoformat(start), date.fromisoformat(end)
+    if d1 < d0:
+        d0, d1 = d1, d0
+    return [(d0 + timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+
+
+def _fetch(day: str) -> tuple[str, list[dict[str, Any]]]:
+    try:
+        return fetch_hf_daily(day)
+    except Exception as e:
+        print(f"WARN: HF fetch failed for {day}: {e}")
+        return day, []
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", required=True, help="YYYY-MM-DD")
+    ap.add_argument("--end", required=True, help="YYYY-MM-DD (inclusive)")
+    ap.add_argument("--concurrency", type=int, default=4, help="parallel HF requests")
+    args = ap.parse_args()
+
+    init_db()
+
+    days = _days(args.start, args.end)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, int(args.concurrency))) as pool:
+        fetched = list(pool.map(_fetch, days))
+
+    # HF clamps future dates to the latest allowed day; keep one payload per effective day.
+    by_day: dict[str, list[dict[str, Any]]] = {}
+    for eff_day, items in fetched:
+        if items:
+            by_day[eff_day] = items
+    t1 = time.perf_counter()
+
+    with Session(engine) as session:
+        ids = bulk_upsert_hf_papers(session, sorted(by_day.items()))
+        session.commit()
+    t2 = time.perf_counter()
+
+    print(
+        f"HF_BACKFILL_DONE: days={len(days)} fetched_days={len(by_day)} papers={len(ids)} "
+        f"fetch_s={t1 - t0:.1f} db_s={t2 - t1:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
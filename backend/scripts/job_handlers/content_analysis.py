@@ -11,6 +11,8 @@ from sqlalchemy import text
 from app.core.config import settings
 from app.db.engine import engine
 from app.db.init_db import init_db
+from app.services import llm_cache
+from app.services.paper_events import reset_stage_state
 
 # Reuse pipeline implementation
 from scripts.daily_run import run_content_analysis_for_pending
@@ -33,7 +35,7 @@ def wipe_explain(session: Session, *, day: str | None, external_ids: list[str] |
     if not cols:
         cols = ["content_explain_cn=NULL"]
 
-    q = f"UPDATE papers SET {', '.join(cols)} WHERE raw_text_path IS NOT NULL"
+    where = "raw_text_path IS NOT NULL"
     params: dict = {}
 
     if external_ids:
@@ -42,28 +44,36 @@ def wipe_explain(session: Session, *, day: str | None, external_ids: list[str] |
             k = f"eid{i}"
             keys.append(f":{k}")
             params[k] = eid
-        q += f" AND external_id IN ({','.join(keys)})"
+        where += f" AND external_id IN ({','.join(keys)})"
     elif day:
-        q += " AND day = :day"
+        where += " AND day = :day"
         params["day"] = day
 
     from app.db.engine import engine
 
+    q = f"UPDATE paper_content SET {', '.join(cols)} WHERE paper_id IN (SELECT id FROM papers WHERE {where})"
+
     with engine.connect() as conn:
         r = conn.execute(text(q), params)
+        paper_ids = [int(x) for x in conn.execute(text(f"SELECT id FROM papers WHERE {where}"), params).scalars()]
         conn.commit()
 
+    # Drop current-state rows too, so paper_stage_state does not report wiped outputs as done.
+    reset_stage_state(
+        session, paper_ids=paper_ids, stage="explain", langs=[x for x in langs if x in {"zh", "en"}] or ["zh"]
+    )
+
     try:
         return int(getattr(r, "rowcount", 0) or 0)
     except Exception:
         return 0
 
 
-def main():
+def main(argv: list[str] | None = None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--job-type", required=True, help="content_analysis_scoped|content_analysis_regen_scoped")
     ap.add_argument("--payload", required=True, help="path to payload json")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     job_type = str(args.job_type)
     payload_path = Path(args.payload)
@@ -104,6 +114,8 @@ def main():
         except Exception:
             pass
 
+    llm_cache.apply_fresh(job_type, payload)
+
     init_db()
 
     with Session(engine) as session:
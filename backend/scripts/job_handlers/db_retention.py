@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+from app.db.init_db import init_db
+from app.services.retention import run_retention
+
+
+def _opt_int(payload: dict, key: str) -> int | None:
+    if key not in payload or payload.get(key) in (None, ""):
+        return None
+    try:
+        return int(payload[key])
+    except Exception:
+        return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--job-type", required=True, help="db_retention")
+    ap.add_argument("--payload", required=True, help="path to payload json")
+    args = ap.parse_args(argv)
+
+    payload: dict = {}
+    try:
+        payload = json.loads(Path(args.payload).read_text(encoding="utf-8")) or {}
+    except Exception:
+        payload = {}
+
+    init_db()
+
+    res = run_retention(
+        events_keep_days=_opt_int(payload, "events_keep_days"),
+        jobs_keep_days=_opt_int(payload, "jobs_keep_days"),
+        vacuum_pages=_opt_int(payload, "vacuum_pages"),
+        allow_full_vacuum=bool(payload.get("full_vacuum")),
+    )
+
+    print(f"RETENTION: {json.dumps(res, ensure_ascii=False)}")
+    print(f"RETENTION_JOB_DONE: {datetime.now().isoformat(timespec='seconds')}")
+
+
+if __name__ == "__main__":
+    main()
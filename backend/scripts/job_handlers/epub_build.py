@@ -32,11 +32,11 @@ def _parse_external_ids(s: str | None) -> list[str] | None:
     return arr or None
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--job-type", required=True, help="epub_build_scoped|epub_build_regen_scoped")
     ap.add_argument("--payload", required=True, help="path to payload json")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     job_type = str(args.job_type)
     payload_path = Path(args.payload)
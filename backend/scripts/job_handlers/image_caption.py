@@ -11,6 +11,8 @@ from sqlalchemy import text
 from app.db.init_db import init_db
 from app.db.engine import engine
 from app.models.paper import Paper
+from app.services import llm_cache
+from app.services.paper_events import reset_stage_state
 from app.core.config import settings
 
 # We reuse the existing caption implementation.
@@ -52,7 +54,7 @@ def wipe_captions(
     if not cols:
         cols = ["image_captions_json=NULL"]
 
-    q = f"UPDATE papers SET {', '.join(cols)} WHERE raw_text_path IS NOT NULL"
+    where = "raw_text_path IS NOT NULL"
     params: dict = {}
     if external_ids:
         # SQLite doesn't support binding list directly in plain text; use IN (...) with named params
@@ -61,18 +63,26 @@ def wipe_captions(
             k = f"eid{i}"
             keys.append(f":{k}")
             params[k] = eid
-        q += f" AND external_id IN ({','.join(keys)})"
+        where += f" AND external_id IN ({','.join(keys)})"
     elif day:
-        q += " AND day = :day"
+        where += " AND day = :day"
         params["day"] = day
 
     # SQLModel Session.exec does not support params in some versions; use a raw connection.
     from app.db.engine import engine
 
+    q = f"UPDATE paper_content SET {', '.join(cols)} WHERE paper_id IN (SELECT id FROM papers WHERE {where})"
+
     with engine.connect() as conn:
         r = conn.execute(text(q), params)
+        paper_ids = [int(x) for x in conn.execute(text(f"SELECT id FROM papers WHERE {where}"), params).scalars()]
         conn.commit()
 
+    # Drop current-state rows too, so paper_stage_state does not report wiped outputs as done.
+    reset_stage_state(
+        session, paper_ids=paper_ids, stage="caption", langs=[x for x in langs if x in {"zh", "en"}] or ["zh"]
+    )
+
     # rowcount may be -1 for some drivers; best-effort
     try:
         return int(getattr(r, "rowcount", 0) or 0)
@@ -80,11 +90,11 @@ def wipe_captions(
         return 0
 
 
-def main():
+def main(argv: list[str] | None = None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--job-type", required=True, help="image_caption_scoped|image_caption_regen_scoped")
     ap.add_argument("--payload", required=True, help="path to payload json")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     job_type = str(args.job_type)
     payload_path = Path(args.payload)
@@ -113,6 +123,8 @@ def main():
         except Exception:
             pass
 
+    llm_cache.apply_fresh(job_type, payload)
+
     # Language scope (zh|en|both)
     lang = str(payload.get("lang") or "both").strip().lower()
     langs: list[str]
@@ -11,6 +11,8 @@ from app.core.config import settings
 from app.db.init_db import init_db
 from app.db.engine import engine
 from app.models.paper import Paper
+from app.services import blob_store
+from app.services.job_progress import job_progress
 from app.services.paper_events import record_paper_event
 
 
@@ -32,7 +34,7 @@ def _parse_external_ids(s: str | None) -> list[str] | None:
     return arr or None
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument(
         "--job-type",
@@ -40,7 +42,7 @@ def main() -> None:
         help="mineru_ocr_fix_scoped|mineru_ocr_fix_regen_scoped",
     )
     ap.add_argument("--payload", required=True, help="path to payload json")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     job_type = str(args.job_type)
     payload_path = Path(args.payload)
@@ -114,13 +116,17 @@ def main() -> None:
         from app.services.mineru_fallback import merge_mineru_outputs
 
         fixed: list[str] = []
+        prog = job_progress()
+        prog.add_total(len(rows))
 
         for p in rows:
             eid = (p.external_id or "").strip() or str(p.id)
+            prog.item(eid)
             try:
                 md_path = Path(str(p.raw_text_path))
                 if not md_path.exists():
                     print(f"MINERU_OCR_FIX_SKIP: {eid} reason=md_missing path={md_path}")
+                    prog.done()
                     continue
 
                 q0 = measure_md_quality(md_path)
@@ -131,6 +137,7 @@ def main() -> None:
                 )
                 if (not overwrite) and (not bad):
                     print(f"MINERU_OCR_FIX_SKIP: {eid} qmarks={q0.qmarks} per_k={q0.qmarks_per_k:.2f}")
+                    prog.done()
                     continue
 
                 record_paper_event(
@@ -168,6 +175,10 @@ def main() -> None:
                 )
 
                 merged = merge_mineru_outputs(dst=dst, src=ocr_res)
+                try:
+                    blob_store.put_tree(session, dst.images_dir, kind="mineru_image")
+                except Exception as e:
+                    print(f"WARN: blob store: MinerU images of {eid}: {e}")
 
                 q1 = measure_md_quality(dst.md_path)
                 record_paper_event(
@@ -199,6 +210,7 @@ def main() -> None:
                 session.commit()
 
                 fixed.append(eid)
+                prog.done()
                 print(
                     f"MINERU_OCR_FIX_OK: {eid} qmarks {q0.qmarks}->{q1.qmarks} "
                     f"copied_images={merged.get('copied_images')}"
@@ -213,6 +225,7 @@ def main() -> None:
                     error=str(e),
                 )
                 print(f"MINERU_OCR_FIX_FAIL: {eid} err={e}")
+                prog.failed()
 
         if regen_epub and fixed:
             try:
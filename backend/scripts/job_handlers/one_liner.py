@@ -12,9 +12,10 @@ from app.core.config import settings
 from app.db.engine import engine
 from app.db.init_db import init_db
 from app.models.paper import Paper
-from app.services.paper_events import record_paper_event
+from app.services import llm_cache
+from app.services.paper_events import reset_stage_state
 
-from scripts.daily_run import build_one_liner, _extract_abstract_from_mineru_markdown
+from scripts.daily_run import generate_one_liners
 
 
 def _parse_external_ids(s: str | None) -> list[str] | None:
@@ -34,7 +35,7 @@ def wipe_one_liners(session: Session, *, day: str | None, external_ids: list[str
     if not cols:
         cols = ["one_liner=NULL"]
 
-    q = f"UPDATE papers SET {', '.join(cols)} WHERE source='hf_daily'"
+    where = "source='hf_daily'"
     params: dict = {}
 
     if external_ids:
@@ -43,28 +44,36 @@ def wipe_one_liners(session: Session, *, day: str | None, external_ids: list[str
             k = f"eid{i}"
             keys.append(f":{k}")
             params[k] = eid
-        q += f" AND external_id IN ({','.join(keys)})"
+        where += f" AND external_id IN ({','.join(keys)})"
     elif day:
-        q += " AND day = :day"
+        where += " AND day = :day"
         params["day"] = day
 
     from app.db.engine import engine
 
+    q = f"UPDATE papers SET {', '.join(cols)} WHERE {where}"
+
     with engine.connect() as conn:
         r = conn.execute(text(q), params)
+        paper_ids = [int(x) for x in conn.execute(text(f"SELECT id FROM papers WHERE {where}"), params).scalars()]
         conn.commit()
 
+    # Drop current-state rows too, so paper_stage_state does not report wiped outputs as done.
+    reset_stage_state(
+        session, paper_ids=paper_ids, stage="one_liner", langs=[x for x in langs if x in {"zh", "en"}] or ["zh"]
+    )
+
     try:
         return int(getattr(r, "rowcount", 0) or 0)
     except Exception:
         return 0
 
 
-def main():
+def main(argv: list[str] | None = None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--job-type", required=True, help="one_liner_scoped|one_liner_regen_scoped")
     ap.add_argument("--payload", required=True, help="path to payload json")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     job_type = str(args.job_type)
     payload_path = Path(args.payload)
@@ -94,6 +103,15 @@ def main():
         except Exception:
             pass
 
+    for key in ("one_liner_concurrency", "one_liner_batch", "one_liner_write_batch"):
+        if key in payload:
+            try:
+                setattr(settings, key, int(payload[key]))
+            except Exception:
+                pass
+
+    llm_cache.apply_fresh(job_type, payload)
+
     init_db()
 
     with Session(engine) as session:
@@ -135,56 +153,9 @@ def main():
             print("ONE_LINER: nothing to do")
             return
 
-        for p in rows:
-            meta = json.loads(p.meta_json) if p.meta_json else {}
-            hf_abstract = (
-                meta.get("paper", {}).get("summary")
-                or meta.get("paper", {}).get("abstract")
-                or meta.get("summary")
-                or meta.get("abstract")
-            )
-
-            mineru_abstract = None
-            if settings.one_liner_prefer_mineru and p.raw_text_path:
-                try:
-                    md_path = Path(p.raw_text_path)
-                    if md_path.exists():
-                        md_text = md_path.read_text(encoding="utf-8", errors="ignore")
-                        md_text = md_text[: int(settings.one_liner_mineru_input_chars)]
-                        mineru_abstract = _extract_abstract_from_mineru_markdown(md_text)
-                except Exception:
-                    mineru_abstract = None
-
-            abstract = mineru_abstract or (hf_abstract if isinstance(hf_abstract, str) else None)
-
-            # Generate per language
-            for lang0 in langs:
-                stage = "one_liner_en" if lang0 == "en" else "one_liner"
-
-                # Skip if already exists (non-regen job)
-                if job_type != "one_liner_regen_scoped":
-                    if lang0 == "en" and p.one_liner_en:
-                        continue
-                    if lang0 == "zh" and p.one_liner:
-                        continue
-
-                try:
-                    record_paper_event(session, paper_id=p.id, stage=stage, status="started")
-                    out = build_one_liner(p.title, abstract, lang=lang0)
-                    out = (out or "").strip()
-                    if lang0 == "en":
-                        p.one_liner_en = out
-                    else:
-                        p.one_liner = out
-                    p.display_title = p.display_title or p.title
-                    p.updated_at = datetime.utcnow()
-                    session.add(p)
-                    session.commit()
-                    record_paper_event(session, paper_id=p.id, stage=stage, status="success")
-                    print(f"ONE_LINER_OK[{lang0}]: {p.external_id}")
-                except Exception as e:
-                    record_paper_event(session, paper_id=p.id, stage=stage, status="failed", error=str(e))
-                    print(f"WARN: ONE_LINER failed[{lang0}] for {p.external_id}: {e}")
+        # Regen jobs wiped the scope above, so "missing" covers both job types.
+        stats = generate_one_liners(session, rows, rewrite=False, stop_on_error=False)
+        print(f"ONE_LINER_JOB_STATS: {stats}")
 
     print(f"ONE_LINER_JOB_DONE: {datetime.now().isoformat(timespec='seconds')}")
 
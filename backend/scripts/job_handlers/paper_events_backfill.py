@@ -11,6 +11,7 @@ from app.db.engine import engine
 from app.models.paper import Paper
 from app.models.paper_event import PaperEvent
 from app.models.paper_image import PaperImage
+from app.services.paper_content import content_value, load_paper_contents
 from app.services.paper_events import record_paper_event
 
 
@@ -34,8 +35,15 @@ def main():
 
     with Session(engine) as session:
         papers = session.exec(select(Paper).where(Paper.source == "hf_daily")).all()
+        # Read content flags once up-front (record_paper_event commits expire loaded rows).
+        has = {
+            pid: (bool(content_value(c, "content_explain_cn")), bool(content_value(c, "image_captions_json")))
+            for pid, c in load_paper_contents(session, [p.id for p in papers]).items()
+        }
 
         for p in papers:
+            has_explain, has_captions = has.get(p.id, (False, False))
+
             # pdf
             if not _has_any_event(session, paper_id=p.id, stage="pdf"):
                 if p.pdf_path:
@@ -55,7 +63,7 @@ def main():
 
             # explain
             if not _has_any_event(session, paper_id=p.id, stage="explain"):
-                if p.content_explain_cn:
+                if has_explain:
                     record_paper_event(session, paper_id=p.id, stage="explain", status="success", meta={"backfill": True, "at": now})
                 else:
                     reason = "missing raw_text_path" if not p.raw_text_path else "not generated yet"
@@ -64,7 +72,7 @@ def main():
 
             # caption
             if not _has_any_event(session, paper_id=p.id, stage="caption"):
-                if p.image_captions_json:
+                if has_captions:
                     record_paper_event(session, paper_id=p.id, stage="caption", status="success", meta={"backfill": True, "at": now})
                 else:
                     reason = "missing raw_text_path" if not p.raw_text_path else "not generated yet"
@@ -73,7 +81,7 @@ def main():
 
             # paper_images
             if not _has_any_event(session, paper_id=p.id, stage="paper_images"):
-                if not p.raw_text_path or not p.content_explain_cn:
+                if not p.raw_text_path or not has_explain:
                     record_paper_event(session, paper_id=p.id, stage="paper_images", status="skipped", error="missing prerequisites", meta={"backfill": True, "at": now})
                     added += 1
                 else:
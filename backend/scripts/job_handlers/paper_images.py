@@ -14,6 +14,8 @@ from app.db.engine import engine
 from app.db.init_db import init_db
 from app.models.paper import Paper
 from app.services.app_config import get_effective_app_config
+from app.services import llm_cache
+from app.services.paper_events import reset_stage_state
 
 # Reuse pipeline implementation
 from scripts.daily_run import run_paper_images_for_pending
@@ -103,6 +105,8 @@ def wipe_paper_images(
         r = conn.execute(text(q_del), params)
         conn.commit()
 
+    reset_stage_state(session, paper_ids=paper_ids, stage="paper_images", langs=lang_list or ["zh", "en"])
+
     # wipe disk (best-effort)
     # determine out_root(s)
     out_roots: list[str] = []
@@ -131,11 +135,11 @@ def wipe_paper_images(
         return 0
 
 
-def main():
+def main(argv: list[str] | None = None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--job-type", required=True, help="paper_images_scoped|paper_images_regen_scoped")
     ap.add_argument("--payload", required=True, help="path to payload json")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     job_type = str(args.job_type)
     payload_path = Path(args.payload)
@@ -175,6 +179,8 @@ def main():
         except Exception:
             pass
 
+    llm_cache.apply_fresh(job_type, payload)
+
     init_db()
 
     with Session(engine) as session:
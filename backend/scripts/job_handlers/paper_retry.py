@@ -11,11 +11,13 @@ from app.db.init_db import init_db
 from app.db.engine import engine
 from app.models.paper import Paper
 from app.core.config import settings
-from app.services.paper_events import record_paper_event
+from app.services.epub_builder import build_epubs_for_pending
+from app.services.paper_content import captions_field, content_value, explain_field, get_paper_content
+from app.services.paper_events import LANG_STAGES, get_stage_state, record_paper_event
 
 # Reuse pipeline functions
 from scripts.daily_run import (
-    download_pdf,
+    fetch_paper_pdf,
     run_mineru_for_pending,
     run_content_analysis_for_pending,
     run_image_caption_for_pending,
@@ -23,11 +25,54 @@ from scripts.daily_run import (
 )
 
 
-def main():
+STAGES = ("pdf", "mineru", "explain", "caption", "paper_images", "epub")
+
+
+def stage_output_ready(session: Session, p: Paper, stage: str, lang: str) -> bool:
+    """Whether the output of `stage` (in `lang`) exists for the paper."""
+
+    if stage == "pdf":
+        return bool(p.pdf_path)
+    if stage == "mineru":
+        return bool(p.raw_text_path)
+    if stage == "explain":
+        return bool(content_value(get_paper_content(session, p.id), explain_field(lang)))
+    if stage == "caption":
+        return bool(content_value(get_paper_content(session, p.id), captions_field(lang)))
+    if stage == "paper_images":
+        st = get_stage_state(session, paper_id=p.id, stage=f"{stage}_en" if lang == "en" else stage)
+        return st is not None and st.status == "success"
+    if stage == "epub":
+        return bool(p.epub_path_en if lang == "en" else p.epub_path_zh)
+    return False
+
+
+def _check_node(session: Session, p: Paper, stage: str, lang: str) -> None:
+    """Pipeline node outcome: fail (non-zero exit) unless the stage left its output.
+
+    Captions and images are best-effort per paper (a paper may have no figures, an
+    image provider may be off): those nodes only fail when the stage recorded a failure.
+    """
+
+    session.refresh(p)
+    if stage_output_ready(session, p, stage, lang):
+        print(f"NODE_OK: {p.external_id} stage={stage} lang={lang}")
+        return
+    st = get_stage_state(session, paper_id=p.id, stage=f"{stage}_en" if lang == "en" and stage in LANG_STAGES else stage)
+    if stage in {"caption", "paper_images"} and (st is None or st.status != "failed"):
+        print(f"NODE_OK: {p.external_id} stage={stage} lang={lang} (no output: {st.status if st else 'not run'})")
+        return
+    # The stage's own error (e.g. a provider 429) on one line: the worker classifies
+    # this message to decide whether the node is retried.
+    why = " ".join((st.last_error or "").split()) if st else ""
+    raise SystemExit(f"NODE_FAILED: {p.external_id} stage={stage} lang={lang}: {why or 'no output'}")
+
+
+def main(argv: list[str] | None = None):
     ap = argparse.ArgumentParser()
-    ap.add_argument("--job-type", required=True)
+    ap.add_argument("--job-type", required=True, help="paper_retry_stage|paper_stage")
     ap.add_argument("--payload", required=True)
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     payload_path = Path(args.payload)
     payload: dict = {}
@@ -41,8 +86,31 @@ def main():
 
     if not external_id:
         raise SystemExit("payload.external_id is required")
-    if stage not in {"pdf", "mineru", "explain", "caption", "paper_images"}:
-        raise SystemExit("payload.stage must be one of: pdf|mineru|explain|caption|paper_images")
+    if stage not in STAGES:
+        raise SystemExit(f"payload.stage must be one of: {'|'.join(STAGES)}")
+
+    # Optional language for explain/caption/paper_images/epub (automatic stage retries
+    # and pipeline nodes set it). Without one, retry every configured language:
+    # PAPERTOK_LANGS, or for epub the language the daily EPUB build uses.
+    lang = str(payload.get("lang") or "").strip().lower()
+    if lang:
+        if lang not in {"zh", "en"}:
+            raise SystemExit("payload.lang must be zh|en")
+        langs = [lang]
+        settings.papertok_langs = langs
+    elif stage == "epub":
+        langs = ["en"]
+    else:
+        langs = [x.strip().lower() for x in (settings.papertok_langs or ["zh"]) if x.strip()]
+        langs = [x for x in langs if x in {"zh", "en"}] or ["zh"]
+
+    # paper_stage = one node of a pipeline DAG (see scripts.job_handlers.pipeline):
+    # idempotent, and it must fail when the stage produced nothing, so dependents are
+    # never started on missing inputs. The node itself is retried as a job, so failed
+    # stage events must not schedule separate paper_retry_stage jobs.
+    node = str(args.job_type) == "paper_stage"
+    if node:
+        settings.job_auto_retry = False
 
     # Optional overrides
     if "image_caption_max" in payload:
@@ -63,86 +131,136 @@ def main():
         if not p:
             raise SystemExit(f"paper not found: {external_id}")
 
-        print(f"RETRY_START: {external_id} stage={stage} at {datetime.now().isoformat(timespec='seconds')}")
-
-        if stage == "pdf":
-            record_paper_event(session, paper_id=p.id, stage="pdf", status="started")
-            try:
-                pdf_url, pdf_path, pdf_sha = download_pdf(external_id)
-                p.pdf_url = pdf_url
-                p.pdf_path = pdf_path
-                if pdf_sha:
-                    p.pdf_sha256 = pdf_sha
-                p.updated_at = datetime.utcnow()
-                session.add(p)
-                session.commit()
-                record_paper_event(session, paper_id=p.id, stage="pdf", status="success", meta={"pdf_path": pdf_path})
-                print(f"RETRY_OK: pdf -> {pdf_path}")
-                return
-            except Exception as e:
-                record_paper_event(session, paper_id=p.id, stage="pdf", status="failed", error=str(e))
-                raise
-
-        if stage == "mineru":
-            if not p.pdf_path:
-                record_paper_event(session, paper_id=p.id, stage="mineru", status="skipped", error="missing pdf_path")
-                print("RETRY_SKIP: mineru (missing pdf_path)")
+        if node:
+            # pdf/mineru have one output whatever the language.
+            node_langs = langs if stage in {"explain", "caption", "paper_images", "epub"} else langs[:1]
+            if all(stage_output_ready(session, p, stage, x) for x in node_langs):
+                print(f"NODE_OK: {external_id} stage={stage} langs={node_langs} (already done)")
                 return
+            _run_stage(session, p, stage=stage, langs=langs)
+            for x in node_langs:
+                _check_node(session, p, stage, x)
+            return
+
+        _run_stage(session, p, stage=stage, langs=langs)
+
+
+def _not_generated(session: Session, p: Paper, stage: str, reason: str) -> None:
+    """Record a stage that left no output as skipped, unless it recorded a failure
+    itself: that error (e.g. a provider 429) is what retries are classified by."""
+
+    st = get_stage_state(session, paper_id=p.id, stage=stage)
+    if st is not None and st.status == "failed":
+        return
+    record_paper_event(session, paper_id=p.id, stage=stage, status="skipped", error=reason)
 
-            # Force this run
-            settings.run_mineru = True
-            settings.mineru_max = 1
-            run_mineru_for_pending(session, external_ids=[external_id])
-            # If still missing, record a skipped marker for visibility
-            session.refresh(p)
-            if not p.raw_text_path:
-                record_paper_event(session, paper_id=p.id, stage="mineru", status="skipped", error="mineru did not produce raw_text_path")
+
+def _run_stage(session: Session, p: Paper, *, stage: str, langs: list[str]) -> None:
+    external_id = p.external_id
+    print(f"RETRY_START: {external_id} stage={stage} langs={langs} at {datetime.now().isoformat(timespec='seconds')}")
+
+    def _lang_stage(lang: str) -> str:
+        return f"{stage}_en" if lang == "en" else stage
+
+    if stage == "pdf":
+        record_paper_event(session, paper_id=p.id, stage="pdf", status="started")
+        try:
+            pdf_url, pdf_path, pdf_sha = fetch_paper_pdf(session, p)
+            p.pdf_url = pdf_url
+            p.pdf_path = pdf_path
+            if pdf_sha:
+                p.pdf_sha256 = pdf_sha
+            p.updated_at = datetime.utcnow()
+            session.add(p)
+            session.commit()
+            record_paper_event(session, paper_id=p.id, stage="pdf", status="success", meta={"pdf_path": pdf_path})
+            print(f"RETRY_OK: pdf -> {pdf_path}")
             return
+        except Exception as e:
+            record_paper_event(session, paper_id=p.id, stage="pdf", status="failed", error=str(e))
+            raise
 
-        if stage == "explain":
-            if not p.raw_text_path:
-                record_paper_event(session, paper_id=p.id, stage="explain", status="skipped", error="missing raw_text_path")
-                print("RETRY_SKIP: explain (missing raw_text_path)")
-                return
+    if stage == "mineru":
+        if not p.pdf_path:
+            record_paper_event(session, paper_id=p.id, stage="mineru", status="skipped", error="missing pdf_path")
+            print("RETRY_SKIP: mineru (missing pdf_path)")
+            return
+
+        # Force this run
+        settings.run_mineru = True
+        settings.mineru_max = 1
+        run_mineru_for_pending(session, external_ids=[external_id])
+        # If still missing, record a skipped marker for visibility
+        session.refresh(p)
+        if not p.raw_text_path:
+            record_paper_event(session, paper_id=p.id, stage="mineru", status="skipped", error="mineru did not produce raw_text_path")
+        return
 
-            settings.run_content_analysis = True
-            settings.content_analysis_max = 1
-            run_content_analysis_for_pending(session, external_ids=[external_id])
-            session.refresh(p)
-            if not p.content_explain_cn:
-                record_paper_event(session, paper_id=p.id, stage="explain", status="skipped", error="explain not generated")
+    if stage == "explain":
+        if not p.raw_text_path:
+            for lang in langs:
+                record_paper_event(
+                    session, paper_id=p.id, stage=_lang_stage(lang), status="skipped", error="missing raw_text_path"
+                )
+            print("RETRY_SKIP: explain (missing raw_text_path)")
             return
 
-        if stage == "caption":
-            if not p.raw_text_path:
-                record_paper_event(session, paper_id=p.id, stage="caption", status="skipped", error="missing raw_text_path")
-                print("RETRY_SKIP: caption (missing raw_text_path)")
-                return
+        settings.run_content_analysis = True
+        settings.content_analysis_max = 1
+        run_content_analysis_for_pending(session, external_ids=[external_id])
+        for lang in langs:
+            if not content_value(get_paper_content(session, p.id), explain_field(lang)):
+                _not_generated(session, p, _lang_stage(lang), "explain not generated")
+        return
 
-            settings.run_image_caption = True
-            run_image_caption_for_pending(session, external_ids=[external_id])
-            session.refresh(p)
-            if not p.image_captions_json:
-                record_paper_event(session, paper_id=p.id, stage="caption", status="skipped", error="no captions generated")
+    if stage == "caption":
+        if not p.raw_text_path:
+            for lang in langs:
+                record_paper_event(
+                    session, paper_id=p.id, stage=_lang_stage(lang), status="skipped", error="missing raw_text_path"
+                )
+            print("RETRY_SKIP: caption (missing raw_text_path)")
             return
 
-        if stage == "paper_images":
-            if not p.raw_text_path or not p.content_explain_cn:
+        settings.run_image_caption = True
+        run_image_caption_for_pending(session, external_ids=[external_id])
+        for lang in langs:
+            if not content_value(get_paper_content(session, p.id), captions_field(lang)):
+                _not_generated(session, p, _lang_stage(lang), "no captions generated")
+        return
+
+    if stage == "paper_images":
+        ready = []
+        for lang in langs:
+            if not p.raw_text_path or not content_value(get_paper_content(session, p.id), explain_field(lang)):
                 record_paper_event(
                     session,
                     paper_id=p.id,
-                    stage="paper_images",
+                    stage=_lang_stage(lang),
                     status="skipped",
-                    error="missing raw_text_path or content_explain_cn",
+                    error=f"missing raw_text_path or {explain_field(lang)}",
                 )
-                print("RETRY_SKIP: paper_images (missing prerequisites)")
-                return
+            else:
+                ready.append(lang)
+        if not ready:
+            print("RETRY_SKIP: paper_images (missing prerequisites)")
+            return
 
-            settings.run_paper_images = True
-            settings.paper_images_max_papers = 1
-            run_paper_images_for_pending(session, external_ids=[external_id])
+        settings.papertok_langs = ready
+        settings.run_paper_images = True
+        settings.paper_images_max_papers = 1
+        run_paper_images_for_pending(session, external_ids=[external_id])
+        return
+
+    if stage == "epub":
+        if not p.raw_text_path:
+            print("RETRY_SKIP: epub (missing raw_text_path)")
             return
 
+        for r in build_epubs_for_pending(session, external_ids=[external_id], langs=langs, max_n=1):
+            print(f"RETRY_OK: epub[{r.kind}] -> {r.url_path}")
+        return
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.engine import engine
+from app.db.init_db import init_db
+from app.models.job import Job
+from app.models.paper import Paper
+from app.services.job_progress import job_progress
+from app.services.job_queue import PRIORITY_DEFAULT, enqueue_job_coalesced
+from scripts.job_handlers.paper_retry import stage_output_ready
+
+
+# Per-paper DAG: (stage, per-language, upstream stages). Edges follow real inputs:
+# explain/caption read the MinerU markdown, images are planned from the explanation,
+# the EPUB embeds captions and uses a generated image as cover.
+DAG: list[tuple[str, bool, tuple[str, ...]]] = [
+    ("pdf", False, ()),
+    ("mineru", False, ("pdf",)),
+    ("explain", True, ("mineru",)),
+    ("caption", True, ("mineru",)),
+    ("paper_images", True, ("explain",)),
+    ("epub", True, ("caption", "paper_images")),
+]
+
+
+def _langs(v, default: list[str]) -> list[str]:
+    if isinstance(v, str):
+        v = v.replace("\n", ",").split(",")
+    if not isinstance(v, list):
+        return default
+    out = [str(x).strip().lower() for x in v]
+    return [x for x in dict.fromkeys(out) if x in {"zh", "en"}] or default
+
+
+def _stages(v) -> list[str]:
+    all_stages = [s for s, _per_lang, _up in DAG]
+    if isinstance(v, str):
+        v = v.replace("\n", ",").split(",")
+    if not isinstance(v, list):
+        return all_stages
+    picked = [str(x).strip().lower() for x in v]
+    return [s for s in all_stages if s in picked] or all_stages
+
+
+_UPSTREAM = {stage: up for stage, _per_lang, up in DAG}
+
+
+def _upstream_ids(nodes: dict[tuple[str, str], int | None], stage: str, lang: str) -> set[int]:
+    """Node ids `stage` waits for. An upstream that was not expanded (stage not
+    selected, language not in `langs`) is looked through to its own inputs."""
+
+    out: set[int] = set()
+    for up in _UPSTREAM[stage]:
+        for key in ((up, lang), (up, "")):
+            if key in nodes:
+                if nodes[key] is not None:
+                    out.add(int(nodes[key]))
+                break
+        else:
+            out |= _upstream_ids(nodes, up, lang)
+    return out
+
+
+def _latest_day(session: Session) -> str | None:
+    return session.exec(
+        select(Paper.day)
+        .where(Paper.source == "hf_daily")
+        .where(Paper.day.is_not(None))
+        .order_by(Paper.day.desc())
+        .limit(1)
+    ).first()
+
+
+def _active_nodes(session: Session) -> dict[tuple[str, str, str], int]:
+    """Queued/running paper_stage jobs by (external_id, stage, lang), so a second
+    pipeline over the same papers hangs off the existing nodes."""
+
+    out: dict[tuple[str, str, str], int] = {}
+    rows = session.exec(
+        select(Job.id, Job.payload_json)
+        .where(Job.job_type == "paper_stage")
+        .where(Job.status.in_(("queued", "running")))
+    ).all()
+    for jid, payload_json in rows:
+        try:
+            p = json.loads(payload_json or "{}") or {}
+        except Exception:
+            continue
+        key = (str(p.get("external_id") or ""), str(p.get("stage") or ""), str(p.get("lang") or ""))
+        out.setdefault(key, int(jid))
+    return out
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--job-type", required=True, help="pipeline")
+    ap.add_argument("--payload", required=True, help="path to payload json")
+    args = ap.parse_args(argv)
+
+    payload: dict = {}
+    try:
+        payload = json.loads(Path(args.payload).read_text(encoding="utf-8")) or {}
+    except Exception:
+        payload = {}
+
+    langs = _langs(payload.get("langs"), list(settings.papertok_langs or ["zh"]))
+    epub_langs = _langs(payload.get("epub_langs"), ["en"])
+    stages = set(_stages(payload.get("stages")))
+    try:
+        base_priority = int(payload.get("priority", PRIORITY_DEFAULT))
+    except Exception:
+        base_priority = PRIORITY_DEFAULT
+
+    init_db()
+
+    with Session(engine) as session:
+        day = payload.get("day")
+        day = day.strip() if isinstance(day, str) else None
+        if day == "latest":
+            day = _latest_day(session)
+
+        external_ids = payload.get("external_ids")
+        if isinstance(external_ids, str):
+            external_ids = external_ids.replace("\n", ",").split(",")
+        external_ids = [str(x).strip() for x in external_ids or [] if str(x).strip()] or None
+
+        if not external_ids and not day:
+            raise SystemExit("payload.day or payload.external_ids is required")
+
+        q = select(Paper).where(Paper.source == "hf_daily")
+        q = q.where(Paper.external_id.in_(external_ids)) if external_ids else q.where(Paper.day == day)
+        papers = session.exec(q.order_by(Paper.id.asc())).all()
+
+        print(
+            f"PIPELINE_START: day={day} external_ids={len(external_ids) if external_ids else 0} "
+            f"papers={len(papers)} langs={langs} epub_langs={epub_langs} stages={sorted(stages)}"
+        )
+
+        prog = job_progress()
+        prog.add_total(len(papers))
+        active = _active_nodes(session)
+        created = reused = done = 0
+
+        for p in papers:
+            prog.item(p.external_id)
+            # (stage, lang) -> job id of the node, or None when the output already exists
+            nodes: dict[tuple[str, str], int | None] = {}
+            for depth, (stage, per_lang, _up) in enumerate(DAG):
+                if stage not in stages:
+                    continue
+                for lang in (epub_langs if stage == "epub" else langs) if per_lang else [""]:
+                    if stage_output_ready(session, p, stage, lang or "zh"):
+                        nodes[(stage, lang)] = None
+                        done += 1
+                        continue
+
+                    key = (p.external_id, stage, lang)
+                    if key in active:
+                        nodes[(stage, lang)] = active[key]
+                        reused += 1
+                        continue
+
+                    node_payload = {"external_id": p.external_id, "stage": stage}
+                    if lang:
+                        node_payload["lang"] = lang
+                    # Deeper stages first: finishing papers beats starting new ones.
+                    j, _ = enqueue_job_coalesced(
+                        session,
+                        job_type="paper_stage",
+                        payload=node_payload,
+                        priority=base_priority + depth,
+                        coalesce=False,
+                        depends_on=sorted(_upstream_ids(nodes, stage, lang)),
+                    )
+                    nodes[(stage, lang)] = active[key] = int(j.id)
+                    created += 1
+            prog.done()
+
+    print(f"PIPELINE_DONE: papers={len(papers)} nodes_created={created} nodes_reused={reused} stages_done={done}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,62 @@
 from __future__ import annotations
 
+import importlib
 import os
+import re
+import signal
+import socket
 import subprocess
 import sys
-from contextlib import contextmanager
-from datetime import datetime, timedelta
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from datetime import datetime
 from pathlib import Path
 
-from sqlmodel import Session, select
-
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.job_context import (
+    JobCanceled,
+    JobControl,
+    ResourceUsage,
+    install_output_routing,
+    job_context,
+    thread_usage,
+)
 from app.db.init_db import init_db
 from app.db.engine import engine
 from app.models.job import Job
+from app.services.job_logs import archive_log, tail_text
+from app.services.job_progress import close_job_progress
+from app.services.job_queue import (
+    cancel_blocked_jobs,
+    cancel_requested,
+    claim_candidates,
+    claim_job,
+    finish_job,
+    job_slot,
+    job_timeout_s,
+    reclaim_expired_jobs,
+    record_job_usage,
+    renew_lease,
+    retry_job,
+    slot_limit_for,
+    slot_limits,
+    slot_occupancy,
+)
+from app.services.retry_policy import classify_error, job_policy, retry_at
 
 
 PAPERTOK_ROOT = Path(__file__).resolve().parents[2]  # papertok/
 BACKEND_DIR = PAPERTOK_ROOT / "backend"
 DATA_DIR = PAPERTOK_ROOT / "data"
 LOG_DIR = DATA_DIR / "logs"
-LOCK_PATH = DATA_DIR / ".job_worker.lock"
+
+# Lease owner id for this worker process (several workers may drain the queue).
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
 
 
 SUPPORTED: dict[str, list[str]] = {
@@ -81,6 +119,13 @@ SUPPORTED: dict[str, list[str]] = {
         "scripts.job_handlers.paper_events_backfill",
     ],
 
+    # db maintenance
+    "db_retention": [
+        str(BACKEND_DIR / ".venv" / "bin" / "python"),
+        "-m",
+        "scripts.job_handlers.db_retention",
+    ],
+
     # epub
     "epub_build_scoped": [
         str(BACKEND_DIR / ".venv" / "bin" / "python"),
@@ -111,96 +156,412 @@ SUPPORTED: dict[str, list[str]] = {
         "-m",
         "scripts.job_handlers.paper_retry",
     ],
+
+    # per-paper DAG (pipeline expands into paper_stage nodes linked by dependencies)
+    "pipeline": [
+        str(BACKEND_DIR / ".venv" / "bin" / "python"),
+        "-m",
+        "scripts.job_handlers.pipeline",
+    ],
+    "paper_stage": [
+        str(BACKEND_DIR / ".venv" / "bin" / "python"),
+        "-m",
+        "scripts.job_handlers.paper_retry",
+    ],
 }
 
 
-@contextmanager
-def _file_lock(path: Path):
-    import fcntl
+def _claim_next_job(session: Session, *, limits: dict[str, int]) -> tuple[int, str, str, Path] | None:
+    """Claim the best queued job (priority, aging, fair share) whose slot has room.
+
+    Candidates are pre-filtered in Python; the claim itself is an atomic conditional
+    UPDATE (claim_job), so losing a race to another worker just moves on.
+    Returns (job_id, job_type, slot, log_path).
+    """
+
+    occ = slot_occupancy(session)
+
+    def _room(slot: str, priority: int) -> bool:
+        return occ.get(slot, {}).get("running", 0) < slot_limit_for(limits, slot, priority)
+
+    for job_id, job_type, payload_json, priority in claim_candidates(session):
+        slot = job_slot(job_type, payload_json)
+        if not _room(slot, priority):
+            continue
+
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        log_path = LOG_DIR / f"job_{job_id}_{job_type}.log"
+        if claim_job(
+            session,
+            job_id=job_id,
+            slot=slot,
+            limit=slot_limit_for(limits, slot, priority),
+            owner=WORKER_ID,
+            log_path=str(log_path),
+        ):
+            return job_id, job_type, slot, log_path
+
+    return None
+
+
+def _available_mem_mb() -> float | None:
+    """Best-effort available memory (psutil, /proc/meminfo or macOS vm_stat)."""
 
-    path.parent.mkdir(parents=True, exist_ok=True)
-    f = path.open("w")
     try:
-        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-        yield
-    finally:
+        import psutil  # type: ignore
+
+        return psutil.virtual_memory().available / 1e6
+    except Exception:
+        pass
+
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1e3
+    except Exception:
+        pass
+
+    try:
+        out = subprocess.run(["vm_stat"], capture_output=True, text=True, timeout=5).stdout
+        page = 4096
+        pages = 0
+        for line in out.splitlines():
+            if "page size of" in line:
+                page = int(line.split("page size of")[1].split()[0])
+            elif line.startswith(("Pages free:", "Pages inactive:", "Pages speculative:")):
+                pages += int(line.split(":")[1].strip().rstrip("."))
+        if pages:
+            return pages * page / 1e6
+    except Exception:
+        pass
+
+    return None
+
+
+def _budget_ok() -> tuple[bool, str]:
+    """Global CPU/memory budget for starting an *additional* concurrent job."""
+
+    max_load = float(settings.job_worker_max_load or 0)
+    if max_load > 0:
         try:
-            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        except Exception:
+            load = os.getloadavg()[0] / max(1, os.cpu_count() or 1)
+            if load > max_load:
+                return False, f"load/core {load:.2f} > {max_load:.2f}"
+        except OSError:
             pass
-        f.close()
-
-
-def _now_utc() -> datetime:
-    # Keep naive UTC for SQLite compatibility in this MVP.
-    return datetime.utcnow()
-
-
-def _mark_stale_running_jobs_failed(session: Session) -> None:
-    stale_before = _now_utc() - timedelta(hours=12)
-    stale = session.exec(
-        select(Job)
-        .where(Job.status == "running")
-        .where(Job.started_at.is_not(None))
-        .where(Job.started_at < stale_before)
-        .order_by(Job.id.asc())
-        .limit(5)
-    ).all()
-
-    for j in stale:
-        j.status = "failed"
-        j.error = ((j.error or "").strip() + "\n" if j.error else "") + "stale running job auto-failed by worker"
-        j.finished_at = _now_utc()
-        j.updated_at = _now_utc()
-        session.add(j)
-
-    if stale:
-        session.commit()
-
-
-def _claim_next_job(session: Session) -> tuple[int, str, Path] | None:
-    """Atomically claim the next queued job (within this session) and mark running."""
-
-    j = session.exec(
-        select(Job)
-        .where(Job.status == "queued")
-        .order_by(Job.id.asc())
-        .limit(1)
-    ).first()
-    if not j:
+
+    min_mem = int(settings.job_worker_min_free_mem_mb or 0)
+    if min_mem > 0:
+        avail = _available_mem_mb()
+        if avail is not None and avail < min_mem:
+            return False, f"free mem {avail:.0f}MB < {min_mem}MB"
+
+    return True, ""
+
+
+def _finish_job(job_id: int, *, status: str, error: str | None = None) -> None:
+    with Session(engine) as session:
+        if not finish_job(session, job_id=job_id, owner=WORKER_ID, status=status, error=error):
+            print(f"JOB_WORKER: job={job_id} lease no longer ours; outcome {status} not recorded")
+        elif status != "success":
+            # Dependents of this job can never run now.
+            n = cancel_blocked_jobs(session)
+            if n:
+                print(f"JOB_WORKER: job={job_id} {status}; canceled {n} dependent job(s)")
+
+
+# Start marker of a run in the job log (retries append to the same log).
+_RUN_START = re.compile(r"^=== JOB \d+ \S+ START .*$", re.M)
+
+
+def _final_error_line(log_path: Path, *, lines: int = 40) -> str | None:
+    """Final error line of the latest run in the job log tail: the `Type: message`
+    line of its last traceback, else its last `NODE_FAILED:` line (pipeline nodes
+    exit with the stage's own error), else None."""
+
+    try:
+        tail = tail_text(log_path, lines=lines, max_bytes=16_000)
+    except OSError:
         return None
+    starts = list(_RUN_START.finditer(tail))
+    if starts:
+        tail = tail[starts[-1].end():]
+    _, marker, rest = tail.rpartition("Traceback (most recent call last):")
+    if marker:
+        # Frames are indented; the first unindented line after them is the exception.
+        for line in rest.splitlines():
+            if line.strip() and not line[0].isspace():
+                return line.strip()
+    for line in reversed(tail.splitlines()):
+        if line.startswith("NODE_FAILED:"):
+            return line.strip()
+    return None
+
+
+def _retry_or_fail(job_id: int, job_type: str, error: str, log_path: Path) -> None:
+    """Failed run: requeue it with backoff if the job type's retry policy covers the
+    error class (from the error, else the run's final error line), else record the
+    failure."""
+
+    final = _final_error_line(log_path)
+    if final and final not in error:
+        error = f"{error}: {final}"
+    policy = job_policy(job_type)
+    if settings.job_auto_retry and policy.max_attempts > 1:
+        cls = classify_error(error)
+        with Session(engine) as session:
+            j = session.get(Job, job_id)
+            # The failed run is retry attempt `retries + 1`; lease reclaims do not count.
+            attempt = int(j.retries or 0) + 1 if j else 1
+            if policy.should_retry(attempt, cls):
+                at = retry_at(policy, attempt)
+                note = f"{error} [{cls}; retry {attempt + 1}/{policy.max_attempts} at {at.isoformat(timespec='seconds')}]"
+                if retry_job(session, job_id=job_id, owner=WORKER_ID, error=note, not_before=at):
+                    print(f"JOB_WORKER: job={job_id} failed ({cls}); retry scheduled at {at.isoformat(timespec='seconds')}")
+                    return
+    _finish_job(job_id, status="failed", error=error)
+
+
+def _heartbeat(job_id: int) -> bool:
+    try:
+        with Session(engine) as session:
+            return renew_lease(session, job_id=job_id, owner=WORKER_ID)
+    except Exception as e:
+        # Transient DB trouble (e.g. locked): keep running; the lease has slack.
+        print(f"JOB_WORKER: heartbeat failed for job={job_id}: {e}")
+        return True
+
+
+# Handlers that take `--job-type/--payload` (payload written to data/jobs/job_<id>.payload.json).
+PAYLOAD_JOB_TYPES = {
+    "one_liner_scoped",
+    "one_liner_regen_scoped",
+    "content_analysis_scoped",
+    "content_analysis_regen_scoped",
+    "image_caption_scoped",
+    "image_caption_regen_scoped",
+    "paper_images_scoped",
+    "paper_images_regen_scoped",
+    "epub_build_scoped",
+    "epub_build_regen_scoped",
+    "mineru_ocr_fix_scoped",
+    "mineru_ocr_fix_regen_scoped",
+    "paper_retry_stage",
+    "paper_stage",
+    "pipeline",
+    "db_retention",
+}
 
-    job_id = int(j.id)
-    job_type = str(j.job_type)
+# Slots whose jobs always get their own process (MinerU: heavy native deps, crash-prone).
+ISOLATED_SLOTS = {"mineru"}
 
-    LOG_DIR.mkdir(parents=True, exist_ok=True)
-    log_path = LOG_DIR / f"job_{job_id}_{job_type}.log"
+# Handlers without cancellation checkpoints (no job_progress / run_child): a timeout or
+# cancel can only be enforced by killing their process, so they never run in-process.
+UNCANCELLABLE_JOB_TYPES = {"paper_events_backfill", "db_retention"}
 
-    j.status = "running"
-    j.log_path = str(log_path)
-    j.started_at = _now_utc()
-    j.updated_at = _now_utc()
 
-    session.add(j)
-    session.commit()
+def _handler_module(job_type: str) -> str | None:
+    """Python module of an in-process capable handler (`python -m <module>` entries)."""
 
-    return job_id, job_type, log_path
+    cmd = SUPPORTED.get(job_type) or []
+    if len(cmd) == 3 and cmd[1] == "-m":
+        return cmd[2]
+    return None
 
 
-def _finish_job(job_id: int, *, status: str, error: str | None = None) -> None:
-    with Session(engine) as session:
-        j = session.get(Job, job_id)
-        if not j:
-            return
-        j.status = status
-        j.error = error
-        j.finished_at = _now_utc()
-        j.updated_at = _now_utc()
-        session.add(j)
-        session.commit()
+def _preload_handlers() -> None:
+    """Import in-process handlers once (FastAPI/SQLModel/httpx/daily_run are shared)."""
+
+    for job_type in SUPPORTED:
+        mod = _handler_module(job_type)
+        if not mod:
+            continue
+        try:
+            importlib.import_module(mod)
+        except Exception as e:
+            print(f"JOB_WORKER: preload {mod} failed: {e}")
+
+
+def _call_handler(module: str, argv: list[str] | None) -> int:
+    """Run a handler's main() in this thread; map SystemExit/exceptions to an exit code."""
+
+    try:
+        mod = importlib.import_module(module)
+        if argv is None:
+            mod.main()
+        else:
+            mod.main(argv)
+        return 0
+    except SystemExit as e:
+        if e.code is None or e.code == 0:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code)
+        return 1
+    except JobCanceled as e:
+        print(f"JOB_STOPPED: {e}")
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+
+def _cancel_requested(job_id: int) -> bool:
+    try:
+        with Session(engine) as session:
+            return cancel_requested(session, job_id)
+    except Exception as e:
+        print(f"JOB_WORKER: cancel check failed for job={job_id}: {e}")
+        return False
+
+
+def _supervise(job_id: int, wait, stop, *, timeout_s: float | None) -> str | None:
+    """Wait for a running handler while heartbeating its lease, enforcing its timeout
+    and watching for an admin cancel.
+
+    `wait(seconds)` returns True once the handler has finished; `stop(reason)` asks it
+    to stop. Returns why it was stopped ("lost" | "timeout" | "canceled"), or None.
+    After a stop the handler gets JOB_KILL_GRACE_S to exit; then we return anyway and
+    the caller escalates.
+    """
+
+    hb = max(1.0, float(settings.job_heartbeat_s or 30))
+    tick = max(0.5, min(hb, float(settings.job_worker_poll_s or 2)))
+    grace = max(1.0, float(settings.job_kill_grace_s or 30))
+    t0 = last_beat = time.monotonic()
+    reason: str | None = None
+    stopped_at = 0.0
+
+    while not wait(tick):
+        now = time.monotonic()
+        if reason:
+            if now - stopped_at >= grace:
+                break
+            continue
+        if now - last_beat >= hb:
+            last_beat = now
+            if not _heartbeat(job_id):
+                # We were presumed dead and the job reclaimed: stop instead of racing the new owner.
+                reason = "lost"
+        if not reason and timeout_s and now - t0 >= timeout_s:
+            reason = "timeout"
+        if not reason and _cancel_requested(job_id):
+            reason = "canceled"
+        if reason:
+            stopped_at = now
+            print(f"JOB_WORKER: stopping job={job_id} reason={reason}")
+            stop(reason)
+    return reason
+
+
+def _run_in_process(
+    job_id: int,
+    module: str,
+    argv: list[str] | None,
+    f,
+    log_path: Path,
+    *,
+    timeout_s: float | None,
+    usage: ResourceUsage,
+) -> tuple[int, str | None]:
+    """Returns (rc, stop_reason). A stopped handler raises JobCanceled at its next
+    progress checkpoint and its run_child() processes are killed. A thread cannot be
+    killed: one that does not come back within the grace period (e.g. stuck in a
+    blocking call) keeps the job's slot and lease, heartbeated, until it exits, so the
+    job is not finished, retried or reclaimed while its handler still runs."""
+
+    control = JobControl()
+    control.usage = usage
+    result: list[int] = []
+
+    def _target() -> None:
+        start = thread_usage()
+        try:
+            with job_context(log=f, log_path=str(log_path), job_id=job_id, control=control):
+                result.append(_call_handler(module, argv))
+        finally:
+            usage.add_thread(start)
+            close_job_progress(job_id)
+
+    t = threading.Thread(target=_target, name=f"job-{job_id}-handler", daemon=True)
+    t.start()
+
+    def _wait(s: float) -> bool:
+        t.join(s)
+        return not t.is_alive()
+
+    reason = _supervise(job_id, _wait, control.stop, timeout_s=timeout_s)
+    if t.is_alive():
+        control.kill_children()
+        print(f"JOB_WORKER: job={job_id} handler did not stop in time; holding its slot until it exits")
+        hb = max(1.0, float(settings.job_heartbeat_s or 30))
+        while not _wait(hb):
+            if reason != "lost" and not _heartbeat(job_id):
+                reason = "lost"
+        print(f"JOB_WORKER: job={job_id} handler thread exited")
+    return (result[0] if result else 1), reason
+
+
+def _killpg(p: subprocess.Popen, sig: int) -> None:
+    try:
+        os.killpg(p.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _run_subprocess(
+    job_id: int, cmd: list[str], f, log_path: Path, *, timeout_s: float | None, usage: ResourceUsage
+) -> tuple[int, str | None]:
+    """Returns (rc, stop_reason). The handler leads its own process group, so a stop
+    terminates MinerU / pandoc grandchildren too. It is reaped with wait4(), whose
+    rusage covers the handler and the children it waited for."""
+
+    env = os.environ.copy()
+    env["PAPERTOK_LOG_PATH"] = str(log_path)
+    env["PAPERTOK_JOB_ID"] = str(job_id)
+
+    f.flush()
+    p = subprocess.Popen(
+        cmd,
+        cwd=str(BACKEND_DIR),
+        stdout=f,
+        stderr=subprocess.STDOUT,
+        env=env,
+        start_new_session=True,
+    )
+
+    def _wait(s: float) -> bool:
+        deadline = time.monotonic() + s
+        while p.returncode is None:
+            try:
+                pid, status, ru = os.wait4(p.pid, os.WNOHANG)
+            except ChildProcessError:
+                p.wait()
+                break
+            if pid:
+                p.returncode = os.waitstatus_to_exitcode(status)
+                usage.add_rusage(ru)
+                break
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(0.1, s))
+        return True
+
+    reason = _supervise(job_id, _wait, lambda _r: _killpg(p, signal.SIGTERM), timeout_s=timeout_s)
+    if not _wait(0):
+        _killpg(p, signal.SIGKILL)
+        while not _wait(1.0):
+            pass
+    rc = int(p.returncode)
+    if reason:
+        # The group may outlive its leader (children ignoring SIGTERM).
+        _killpg(p, signal.SIGKILL)
+    return rc, reason
 
 
-def _execute_job(job_id: int, job_type: str, log_path: Path) -> None:
+def _execute_job(job_id: int, job_type: str, slot: str, log_path: Path) -> None:
     cmd = SUPPORTED.get(job_type)
     if not cmd:
         _finish_job(job_id, status="failed", error=f"unsupported job_type: {job_type}")
@@ -211,21 +572,8 @@ def _execute_job(job_id: int, job_type: str, log_path: Path) -> None:
     payload_path.mkdir(parents=True, exist_ok=True)
     payload_file = payload_path / f"job_{job_id}.payload.json"
 
-    if job_type in {
-        "one_liner_scoped",
-        "one_liner_regen_scoped",
-        "content_analysis_scoped",
-        "content_analysis_regen_scoped",
-        "image_caption_scoped",
-        "image_caption_regen_scoped",
-        "paper_images_scoped",
-        "paper_images_regen_scoped",
-        "epub_build_scoped",
-        "epub_build_regen_scoped",
-        "mineru_ocr_fix_scoped",
-        "mineru_ocr_fix_regen_scoped",
-        "paper_retry_stage",
-    }:
+    argv: list[str] | None = None
+    if job_type in PAYLOAD_JOB_TYPES:
         with Session(engine) as session:
             j = session.get(Job, job_id)
             payload = j.payload_json if j else None
@@ -234,83 +582,186 @@ def _execute_job(job_id: int, job_type: str, log_path: Path) -> None:
         except Exception:
             payload_file.write_text("{}", encoding="utf-8")
 
-        cmd = cmd + ["--job-type", job_type, "--payload", str(payload_file)]
+        argv = ["--job-type", job_type, "--payload", str(payload_file)]
+        cmd = cmd + argv
+
+    module = _handler_module(job_type)
+    in_process = (
+        bool(module)
+        and slot not in ISOLATED_SLOTS
+        and job_type not in UNCANCELLABLE_JOB_TYPES
+        and settings.job_worker_in_process
+    )
+    mode = "in-process" if in_process else "subprocess"
+    timeout_s = job_timeout_s(job_type, slot)
 
     rc = 1
     err: str | None = None
+    stopped: str | None = None
+    usage = ResourceUsage()
+    t0 = time.monotonic()
 
     try:
-        with log_path.open("ab") as f:
-            f.write(
-                (
-                    f"\n=== JOB {job_id} {job_type} START {datetime.now().isoformat()} ===\n"
-                ).encode()
-            )
+        with log_path.open("a", encoding="utf-8", buffering=1) as f:
+            f.write(f"\n=== JOB {job_id} {job_type} START {datetime.now().isoformat()} ({mode}) ===\n")
             f.flush()
 
-            env = os.environ.copy()
-            env["PAPERTOK_LOG_PATH"] = str(log_path)
-
-            p = subprocess.Popen(
-                cmd,
-                cwd=str(BACKEND_DIR),
-                stdout=f,
-                stderr=subprocess.STDOUT,
-                env=env,
-            )
-            rc = p.wait()
+            if in_process:
+                rc, stopped = _run_in_process(
+                    job_id, str(module), argv, f, log_path, timeout_s=timeout_s, usage=usage
+                )
+            else:
+                rc, stopped = _run_subprocess(job_id, cmd, f, log_path, timeout_s=timeout_s, usage=usage)
 
+            note = f" stopped={stopped}" if stopped else ""
+            cols = usage.columns(wall_s=time.monotonic() - t0)
             f.write(
-                (
-                    f"\n=== JOB {job_id} {job_type} END rc={rc} {datetime.now().isoformat()} ===\n"
-                ).encode()
+                f"\n=== JOB {job_id} {job_type} END rc={rc}{note} wall={cols['wall_s']:.1f}s "
+                f"cpu={cols['cpu_user_s'] + cols['cpu_sys_s']:.1f}s rss_max={cols['max_rss_mb']}MB "
+                f"{datetime.now().isoformat()} ===\n"
             )
             f.flush()
 
     except Exception as e:
         err = str(e)
         try:
-            with log_path.open("ab") as f:
-                f.write(
-                    (
-                        f"\n=== JOB {job_id} {job_type} EXCEPTION {datetime.now().isoformat()} ===\n{err}\n"
-                    ).encode()
-                )
+            with log_path.open("a", encoding="utf-8") as f:
+                f.write(f"\n=== JOB {job_id} {job_type} EXCEPTION {datetime.now().isoformat()} ===\n{err}\n")
         except Exception:
             pass
 
-    if err:
-        _finish_job(job_id, status="failed", error=err)
+    if stopped == "lost":
+        # The new owner writes to the same log: leave it plain.
+        print(f"JOB_WORKER: job={job_id} lease lost; outcome not recorded (rc={rc})")
+        return
+
+    try:
+        with Session(engine) as session:
+            record_job_usage(session, job_id=job_id, usage=usage.columns(wall_s=time.monotonic() - t0))
+    except Exception as e:
+        print(f"JOB_WORKER: job={job_id} usage not recorded: {e}")
+
+    if stopped == "canceled":
+        _finish_job(job_id, status="canceled", error="canceled by admin")
+    elif stopped == "timeout":
+        _retry_or_fail(job_id, job_type, f"timed out after {timeout_s:.0f}s", log_path)
+    elif err:
+        _retry_or_fail(job_id, job_type, err, log_path)
     elif rc == 0:
         _finish_job(job_id, status="success")
     else:
-        _finish_job(job_id, status="failed", error=f"command exited with code {rc}")
+        _retry_or_fail(job_id, job_type, f"command exited with code {rc}", log_path)
+
+    if settings.job_log_archive:
+        # A requeued (retried) job appends to a fresh plain log; it is archived again later.
+        try:
+            archive_log(log_path)
+        except OSError as e:
+            print(f"JOB_WORKER: job={job_id} log archive failed: {e}")
+
+
+# Expired-lease sweeps are writes; no need to run them on every poll.
+RECLAIM_EVERY_S = 30.0
 
 
-def main(max_jobs: int = 3) -> None:
+def main(max_jobs: int = 3, *, daemon: bool = False) -> None:
+    """Run queued jobs concurrently under per-slot limits (JOB_SLOTS).
+
+    Claims are lease-based (see app.services.job_queue), so several worker processes
+    may run side by side. Handlers are imported once and run in-process, except
+    MinerU-slot jobs, handlers without cancellation checkpoints and shell scripts,
+    which keep their own process.
+
+    - daemon=True: long-lived; polls the queue until SIGTERM/SIGINT, then stops
+      claiming and exits once running jobs finish (a second signal exits at once;
+      unfinished jobs are requeued when their lease expires).
+    - otherwise: starts up to `max_jobs` jobs (more while earlier ones still run, so
+      a long backfill does not hold back short jobs) and returns when idle.
+    """
+
     init_db()
     DATA_DIR.mkdir(parents=True, exist_ok=True)
+    install_output_routing()
+    if settings.job_worker_in_process:
+        _preload_handlers()
+
+    stopping = threading.Event()
+
+    def _on_signal(signum, _frame) -> None:
+        if stopping.is_set():
+            raise SystemExit(128 + signum)
+        print(f"JOB_WORKER: signal {signum}; draining running jobs")
+        stopping.set()
+
+    if daemon:
+        signal.signal(signal.SIGTERM, _on_signal)
+        signal.signal(signal.SIGINT, _on_signal)
+        print(f"JOB_WORKER: daemon started worker={WORKER_ID}")
+
+    limits = slot_limits()
+    running: dict[int, tuple[str, threading.Thread]] = {}
+    started = 0
+    last_budget_msg = ""
+    last_reclaim = 0.0
+
+    while True:
+        for jid, (_slot, t) in list(running.items()):
+            if not t.is_alive():
+                running.pop(jid)
+
+        claimed = None
+        if not stopping.is_set() and (daemon or started < max_jobs or running):
+            # The budget only gates extra concurrency; a lone job always runs.
+            ok, why = _budget_ok() if running else (True, "")
+            if not ok and why != last_budget_msg:
+                print(f"JOB_WORKER: budget exhausted ({why}); waiting")
+            last_budget_msg = why
+            if ok:
+                with Session(engine) as session:
+                    if time.monotonic() - last_reclaim >= RECLAIM_EVERY_S:
+                        last_reclaim = time.monotonic()
+                        reclaimed = reclaim_expired_jobs(session)
+                        if any(reclaimed.values()):
+                            print(f"JOB_WORKER: expired leases {reclaimed}")
+                        # Catches upstream failures recorded elsewhere (admin cancel, reclaim).
+                        blocked = cancel_blocked_jobs(session)
+                        if blocked:
+                            print(f"JOB_WORKER: canceled {blocked} job(s) with failed dependencies")
+                    claimed = _claim_next_job(session, limits=limits)
+
+        if claimed:
+            job_id, job_type, slot, log_path = claimed
+            t = threading.Thread(
+                target=_execute_job,
+                args=(job_id, job_type, slot, log_path),
+                name=f"job-{job_id}",
+                daemon=False,
+            )
+            t.start()
+            running[job_id] = (slot, t)
+            started += 1
+            occ = Counter(sl for sl, _t in running.values())
+            print(
+                f"JOB_WORKER: started job={job_id} type={job_type} slot={slot} "
+                f"worker={WORKER_ID} occupancy={dict(occ)} limits={limits}"
+            )
+            continue
 
-    with _file_lock(LOCK_PATH):
-        processed = 0
-        while processed < max_jobs:
-            with Session(engine) as session:
-                _mark_stale_running_jobs_failed(session)
-                claimed = _claim_next_job(session)
-
-            if not claimed:
-                return
+        if not running and (stopping.is_set() or not daemon):
+            return
 
-            job_id, job_type, log_path = claimed
-            _execute_job(job_id, job_type, log_path)
-            processed += 1
+        time.sleep(max(0.2, float(settings.job_worker_poll_s or 2)))
 
 
 if __name__ == "__main__":
-    mj = 3
-    if len(sys.argv) >= 2:
-        try:
-            mj = int(sys.argv[1])
-        except Exception:
-            pass
-    main(max_jobs=mj)
+    args = sys.argv[1:]
+    if "--daemon" in args:
+        main(daemon=True)
+    else:
+        mj = 3
+        if args:
+            try:
+                mj = int(args[0])
+            except Exception:
+                pass
+        main(max_jobs=mj)
@@ -36,6 +36,8 @@ export function AdminPage() {
   const [jobs, setJobs] = useState<JobsResp | null>(null);
   const [workerMeta, setWorkerMeta] = useState<WorkerLogsMeta | null>(null);
   const [jobLog, setJobLog] = useState<string | null>(null);
+  // Byte window of the log shown (the API serves ranges; older parts load on demand).
+  const [jobLogWin, setJobLogWin] = useState<{ jobId: number; start: number } | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [saveMsg, setSaveMsg] = useState<string | null>(null);
@@ -209,17 +211,63 @@ export function AdminPage() {
     }
   };
 
-  const viewJobLog = async (jobId: number) => {
+  const cancelJob = async (jobId: number) => {
     setLoading(true);
     setError(null);
+    setJobMsg(null);
     try {
-      const r = await fetch(`${API_BASE}/api/admin/jobs/${jobId}/log?tail_lines=200`, { headers });
+      const r = await fetch(`${API_BASE}/api/admin/jobs/${jobId}/cancel`, {
+        method: 'POST',
+        headers,
+      });
       if (!r.ok) {
         const t = await r.text();
-        throw new Error(`log HTTP ${r.status}: ${t}`);
+        throw new Error(`cancel HTTP ${r.status}: ${t}`);
       }
       const j = await r.json();
+      setJobMsg(j.cancel === 'canceled' ? `Canceled job #${jobId}` : `Stopping job #${jobId}…`);
+      await refresh();
+    } catch (e: any) {
+      setError(e?.message || 'Failed to cancel job');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const LOG_PAGE_BYTES = 65536;
+
+  const fetchJobLog = async (jobId: number, offset: number, limit: number) => {
+    const r = await fetch(`${API_BASE}/api/admin/jobs/${jobId}/log?offset=${offset}&limit=${limit}`, { headers });
+    if (!r.ok) {
+      const t = await r.text();
+      throw new Error(`log HTTP ${r.status}: ${t}`);
+    }
+    return r.json();
+  };
+
+  const viewJobLog = async (jobId: number) => {
+    setLoading(true);
+    setError(null);
+    try {
+      const j = await fetchJobLog(jobId, -LOG_PAGE_BYTES, LOG_PAGE_BYTES);
       setJobLog(j.log || '');
+      setJobLogWin(typeof j.offset === 'number' ? { jobId, start: j.offset } : null);
+    } catch (e: any) {
+      setError(e?.message || 'Failed to load job log');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const loadOlderJobLog = async () => {
+    if (!jobLogWin || jobLogWin.start <= 0) return;
+    setLoading(true);
+    setError(null);
+    try {
+      const start = Math.max(0, jobLogWin.start - LOG_PAGE_BYTES);
+      const j = await fetchJobLog(jobLogWin.jobId, start, jobLogWin.start - start);
+      setJobLog((j.log || '') + (jobLog || ''));
+      setJobLogWin({ jobId: jobLogWin.jobId, start });
     } catch (e: any) {
       setError(e?.message || 'Failed to load job log');
     } finally {
@@ -785,6 +833,22 @@ export function AdminPage() {
                       {j.started_at ? ` | started: ${j.started_at}` : ''}
                       {j.finished_at ? ` | finished: ${j.finished_at}` : ''}
                     </div>
+                    {j.progress && (
+                      <div className="text-[11px] text-white/60 mt-1">
+                        progress: {j.progress.done + j.progress.failed}/{j.progress.total ?? '?'}
+                        {j.progress.failed ? ` (failed ${j.progress.failed})` : ''}
+                        {j.progress.per_min != null ? ` | ${j.progress.per_min}/min` : ''}
+                        {j.progress.eta_at ? ` | eta: ${j.progress.eta_at}` : ''}
+                        {j.status === 'running' && j.progress.current ? ` | ${j.progress.current}` : ''}
+                      </div>
+                    )}
+                    {j.wall_s != null && (
+                      <div className="text-[11px] text-white/50 mt-1">
+                        usage: wall {Number(j.wall_s).toFixed(1)}s | cpu{' '}
+                        {(Number(j.cpu_user_s || 0) + Number(j.cpu_sys_s || 0)).toFixed(1)}s
+                        {j.max_rss_mb != null ? ` | rss ${Math.round(Number(j.max_rss_mb))}MB` : ''}
+                      </div>
+                    )}
                     <div className="flex items-center gap-2 mt-2">
                       <button
                         className="px-2 py-1 text-xs rounded bg-white/10 hover:bg-white/20"
@@ -793,6 +857,15 @@ export function AdminPage() {
                       >
                         Tail log
                       </button>
+                      {(j.status === 'queued' || j.status === 'running') && (
+                        <button
+                          className="px-2 py-1 text-xs rounded bg-red-500/20 hover:bg-red-500/30"
+                          onClick={() => cancelJob(Number(j.id))}
+                          disabled={loading || !!j.cancel_requested_at}
+                        >
+                          {j.cancel_requested_at ? 'Stopping…' : 'Cancel'}
+                        </button>
+                      )}
                       {j.error && <div className="text-[11px] text-red-200/80 truncate">{j.error}</div>}
                     </div>
                   </div>
@@ -805,7 +878,18 @@ export function AdminPage() {
           </div>
 
           <div className="border border-white/10 rounded p-3 space-y-2">
-            <div className="text-sm font-semibold">Job Log (tail)</div>
+            <div className="flex items-center justify-between gap-2">
+              <div className="text-sm font-semibold">Job Log (tail)</div>
+              {jobLogWin && jobLogWin.start > 0 && (
+                <button
+                  className="px-2 py-0.5 text-[11px] rounded bg-white/10 hover:bg-white/20 disabled:opacity-50"
+                  disabled={loading}
+                  onClick={loadOlderJobLog}
+                >
+                  Load older
+                </button>
+              )}
+            </div>
             <pre className="text-xs text-white/70 whitespace-pre-wrap break-words max-h-[60vh] overflow-auto">
               {jobLog || '(select a job)'}
             </pre>
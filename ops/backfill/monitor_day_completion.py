@@ -60,6 +60,88 @@ def _save_state(p: Path, st: dict) -> None:
         pass
 
 
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "select 1 from sqlite_master where type='table' and name=?;",
+        (name,),
+    ).fetchone()
+    return bool(row)
+
+
+def _text_counts_from_columns(conn: sqlite3.Connection, day: str):
+    """Legacy per-day counts probing the text columns on papers (pre paper_stage_state DBs)."""
+
+    return conn.execute(
+        """
+        select
+          count(*) as papers,
+          sum(case when raw_text_path is not null then 1 else 0 end) as mineru,
+          sum(case when one_liner is not null and one_liner!='' then 1 else 0 end) as zh_liner,
+          sum(case when one_liner_en is not null and one_liner_en!='' then 1 else 0 end) as en_liner,
+          sum(case when content_explain_cn is not null and content_explain_cn!='' then 1 else 0 end) as zh_exp,
+          sum(case when content_explain_en is not null and content_explain_en!='' then 1 else 0 end) as en_exp,
+          sum(case when image_captions_json is not null and image_captions_json!='' and image_captions_json!='{}' then 1 else 0 end) as zh_cap,
+          sum(case when image_captions_en_json is not null and image_captions_en_json!='' and image_captions_en_json!='{}' then 1 else 0 end) as en_cap
+        from papers
+        where source='hf_daily' and day=?;
+        """,
+        (day,),
+    ).fetchone()
+
+
+def _text_counts_from_stage_state(conn: sqlite3.Connection, day: str) -> dict | None:
+    """Per-day counts from paper_stage_state (indexed lookups, no text column scans)."""
+
+    row = conn.execute(
+        """
+        select
+          count(*) as papers,
+          sum(case when raw_text_path is not null then 1 else 0 end) as mineru
+        from papers
+        where source='hf_daily' and day=?;
+        """,
+        (day,),
+    ).fetchone()
+    if not row:
+        return None
+
+    out = {
+        "papers": int(row["papers"] or 0),
+        "mineru": int(row["mineru"] or 0),
+        "zh_liner": 0,
+        "en_liner": 0,
+        "zh_exp": 0,
+        "en_exp": 0,
+        "zh_cap": 0,
+        "en_cap": 0,
+    }
+    keys = {
+        ("one_liner", "zh"): "zh_liner",
+        ("one_liner", "en"): "en_liner",
+        ("explain", "zh"): "zh_exp",
+        ("explain", "en"): "en_exp",
+        ("caption", "zh"): "zh_cap",
+        ("caption", "en"): "en_cap",
+    }
+    for r in conn.execute(
+        """
+        select s.stage, s.lang, count(*) as n
+        from paper_stage_state s
+        join papers p on p.id=s.paper_id
+        where p.source='hf_daily'
+          and p.day=?
+          and s.stage in ('one_liner', 'explain', 'caption')
+          and s.status='success'
+        group by s.stage, s.lang;
+        """,
+        (day,),
+    ).fetchall():
+        k = keys.get((str(r["stage"]), str(r["lang"])))
+        if k:
+            out[k] = int(r["n"] or 0)
+    return out
+
+
 def main() -> None:
     db_path = _db_path()
     if not os.path.exists(db_path):
@@ -93,24 +175,14 @@ def main() -> None:
 
     reports: list[str] = []
 
+    use_stage_state = _has_table(conn, "paper_stage_state")
+
     for day in days:
         # papers & text fields
-        row = conn.execute(
-            """
-            select
-              count(*) as papers,
-              sum(case when raw_text_path is not null then 1 else 0 end) as mineru,
-              sum(case when one_liner is not null and one_liner!='' then 1 else 0 end) as zh_liner,
-              sum(case when one_liner_en is not null and one_liner_en!='' then 1 else 0 end) as en_liner,
-              sum(case when content_explain_cn is not null and content_explain_cn!='' then 1 else 0 end) as zh_exp,
-              sum(case when content_explain_en is not null and content_explain_en!='' then 1 else 0 end) as en_exp,
-              sum(case when image_captions_json is not null and image_captions_json!='' and image_captions_json!='{}' then 1 else 0 end) as zh_cap,
-              sum(case when image_captions_en_json is not null and image_captions_en_json!='' and image_captions_en_json!='{}' then 1 else 0 end) as en_cap
-            from papers
-            where source='hf_daily' and day=?;
-            """,
-            (day,),
-        ).fetchone()
+        if use_stage_state:
+            row = _text_counts_from_stage_state(conn, day)
+        else:
+            row = _text_counts_from_columns(conn, day)
         if not row:
             continue
 
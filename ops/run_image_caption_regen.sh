@@ -24,7 +24,12 @@ from sqlalchemy import text
 from app.db.engine import engine
 
 with engine.connect() as conn:
-    conn.execute(text("UPDATE papers SET image_captions_json=NULL WHERE raw_text_path IS NOT NULL"))
+    conn.execute(
+        text(
+            "UPDATE paper_content SET image_captions_json=NULL "
+            "WHERE paper_id IN (SELECT id FROM papers WHERE raw_text_path IS NOT NULL)"
+        )
+    )
     conn.commit()
 print('OK: cleared image_captions_json for papers with raw_text_path')
 PY
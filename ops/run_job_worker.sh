@@ -18,7 +18,12 @@ set +a
 
 export PYTHONUNBUFFERED=1
 
-# Process up to N jobs per run
+# Default: long-lived daemon (launchd KeepAlive). JOB_WORKER_DAEMON=0 restores the
+# one-shot mode that processes up to N jobs per run.
+if [ "${JOB_WORKER_DAEMON:-1}" = "1" ]; then
+  exec .venv/bin/python -m scripts.job_worker --daemon
+fi
+
 MAX_JOBS=${JOB_WORKER_MAX_JOBS:-3}
 
 exec .venv/bin/python -m scripts.job_worker "$MAX_JOBS"